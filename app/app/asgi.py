@@ -0,0 +1,19 @@
+"""
+ASGI config for app project.
+
+Django 2.1 has no ASGI handler of its own, so the WSGI application is
+served through asgiref's adapter, which runs each request on a thread pool.
+This lets ASGI servers such as uvicorn (both are in requirements.txt) host
+the app:
+
+    gunicorn app.asgi:application -k uvicorn.workers.UvicornWorker
+"""
+
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+application = WsgiToAsgi(get_wsgi_application())
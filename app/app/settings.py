@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -23,9 +24,12 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = '$*8ukw7dn#+@5-2a$tt%ru$-gx45pg@xn8zq@w(+z@03hjq!c9'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# DEBUG also records every SQL query in memory, see app/settings_production.py
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host
+]
 
 
 # Application definition
@@ -39,12 +43,15 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
-    'core',
+    'core.apps.CoreConfig',
     'user',
     'recipe'
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.AdmissionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,10 +91,21 @@ DATABASES = {
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        'PORT': os.environ.get('DB_PORT', ''),
+        # Keep connections open between requests instead of reconnecting
+        # every time; core.db checks them after they sat idle.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # pgbouncer in transaction mode cannot hold server-side cursors
+        # open across transactions; the recipe export pages by id instead.
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_POOLER') == 'pgbouncer',
     }
 }
 
+# Persistent connections idle longer than this many seconds are pinged
+# before the next request uses them, and dropped if the ping fails.
+CONN_HEALTH_CHECK_IDLE = int(os.environ.get('DB_HEALTH_CHECK_IDLE', 30))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -108,6 +126,36 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# PASSWORD_HASHER picks the hasher for new passwords: 'argon2' (memory-hard,
+# needs argon2-cffi, the default when it is installed) or 'pbkdf2'. Hashes
+# made by any hasher listed still verify and are rehashed with the
+# preferred one, at its current costs, on the next successful login.
+
+PASSWORD_HASHING = {
+    'HASHER': os.environ.get(
+        'PASSWORD_HASHER',
+        'argon2' if find_spec('argon2') else 'pbkdf2'
+    ),
+    'ARGON2_TIME_COST': int(os.environ.get('ARGON2_TIME_COST', 2)),
+    'ARGON2_MEMORY_COST': int(os.environ.get('ARGON2_MEMORY_COST', 19456)),
+    'ARGON2_PARALLELISM': int(os.environ.get('ARGON2_PARALLELISM', 1)),
+}
+
+PASSWORD_HASHER_CHOICES = {
+    'argon2': 'core.hashers.TunedArgon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CHOICES[PASSWORD_HASHING['HASHER']],
+    *(path for name, path in PASSWORD_HASHER_CHOICES.items()
+      if name != PASSWORD_HASHING['HASHER']),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
 
@@ -133,4 +181,134 @@ MEDIA_ROOT = '/vol/web/media'
 
 STATIC_ROOT = '/vol/web/static'
 
+# Media serving (core.media, defaults in core.media.DEFAULTS)
+# 'python' streams files from the worker (sendfile under gunicorn);
+# 'x-accel' hands them to nginx through an internal location mapping
+# ACCEL_PREFIX to MEDIA_ROOT, 'x-sendfile' to Apache or lighttpd.
+
+MEDIA_SERVING = {
+    'MODE': os.environ.get('MEDIA_SERVING_MODE', 'python'),
+    'ACCEL_PREFIX': os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/'),
+}
+
 AUTH_USER_MODEL = 'core.User'
+
+
+# Recipe image pipeline (core.images, defaults in core.images.DEFAULTS)
+# QUEUE is the dotted path of a class with enqueue(fn, *args); the built-in
+# choices are ThreadPoolQueue, ProcessPoolQueue and SyncQueue. QUALITY and
+# VARIANTS set the JPEG/WebP quality and the {name: (size, format)} output.
+
+IMAGE_PIPELINE = {
+    'QUEUE': os.environ.get('IMAGE_QUEUE', 'core.images.ThreadPoolQueue'),
+    'WORKERS': int(os.environ.get('IMAGE_WORKERS', 2)),
+}
+
+
+# Caches
+# The response cache keeps per-user data versions here, so deployments with
+# more than one process must point the default cache at a shared backend
+# (e.g. memcached) for writes in one process to invalidate the others.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+RESPONSE_CACHE = {
+    'BACKEND': 'default',
+    'TIMEOUT': 300,
+}
+
+
+# Token authentication cache (core.authentication.CachedTokenAuthentication)
+# BACKEND optionally names an entry in CACHES shared between processes.
+
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'BACKEND': os.environ.get('TOKEN_AUTH_CACHE_BACKEND'),
+}
+
+
+# Tag and ingredient autocomplete (recipe.autocomplete)
+# Per-process tries for up to MAX_USERS users and MAX_NODES trie nodes in
+# all, least recently used first out. A node costs about 450 bytes, so
+# each worker process spends up to some 45 MB here. Users with more than
+# MAX_NAMES tags or ingredients are looked up in the database instead.
+
+AUTOCOMPLETE = {
+    'MAX_USERS': 1000,
+    'MAX_NAMES': 2000,
+    'MAX_NODES': 100000,
+}
+
+
+# Recipe counts on tag and ingredient lists (?with_counts=1, ?assigned_only=1)
+# 'annotate' counts the links in the list query; 'counter' reads the
+# recipe_count columns kept by core.counts, for very large libraries.
+
+RECIPE_COUNT_SOURCE = os.environ.get('RECIPE_COUNT_SOURCE', 'annotate')
+
+
+# Response compression (core.middleware.CompressionMiddleware)
+# Brotli (the Brotli requirement, built with the Dockerfile's gcc) is
+# preferred when the client accepts it; gzip is always offered, and is the
+# only coding where the package is missing.
+# ROUTE_LEVELS overrides LEVELS per route name; None turns it off there.
+# The export streams large bodies on the fly, so it trades ratio for speed.
+# MIN_SIZE, LEVELS and CONTENT_TYPES default to core.compression.DEFAULTS.
+
+COMPRESSION = {
+    'ENABLED': os.environ.get('COMPRESSION_ENABLED', '1') == '1',
+    'ROUTE_LEVELS': {
+        'recipe:recipe-export': {'br': 1, 'gzip': 1},
+    },
+}
+
+
+# Admission control (core.middleware.AdmissionMiddleware)
+# Per process concurrency limits for each route class of the recipe and
+# user APIs, adapted between MIN_LIMIT and MAX_LIMIT to keep latency near
+# TARGET_MS. Requests over the limit wait up to MAX_WAIT_MS, then get a
+# 503 with Retry-After. ROUTES maps route names to classes; other routes
+# are 'read' or 'write' by method. MAX_BACKLOG_MS sheds requests that
+# waited longer than that in front of the app (X-Request-Start). Other
+# keys and per class values default to core.admission.
+
+ADMISSION = {
+    'ENABLED': os.environ.get('ADMISSION_ENABLED', '1') == '1',
+    'CLASSES': {
+        'read': {'LIMIT': 16, 'MAX_LIMIT': 64, 'TARGET_MS': 200},
+        'write': {'LIMIT': 8, 'MAX_LIMIT': 32, 'TARGET_MS': 500},
+        'heavy': {'LIMIT': 2, 'MAX_LIMIT': 4, 'TARGET_MS': 2000,
+                  'MAX_WAIT_MS': 0},
+    },
+    'ROUTES': {
+        'recipe:recipe-upload-image': 'heavy',
+        'recipe:recipe-export': 'heavy',
+        'recipe:recipe-bulk': 'heavy',
+        'recipe:tag-bulk': 'heavy',
+        'recipe:ingredient-bulk': 'heavy',
+    },
+    'MAX_BACKLOG_MS': int(os.environ['ADMISSION_MAX_BACKLOG_MS'])
+    if os.environ.get('ADMISSION_MAX_BACKLOG_MS') else None,
+}
+
+
+# Request instrumentation (core.middleware.InstrumentationMiddleware)
+# Metrics are served at /metrics, guarded by METRICS_TOKEN when set. A
+# PROFILE_SAMPLE_RATE fraction of requests runs under cProfile, and those
+# slower than PROFILE_SLOW_MS are dumped to PROFILE_DIR. Other keys
+# default to core.metrics.DEFAULTS.
+
+INSTRUMENTATION = {
+    'METRICS_TOKEN': os.environ.get('METRICS_TOKEN'),
+    'PROFILE_SAMPLE_RATE': float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+    'PROFILE_DIR': os.environ.get('PROFILE_DIR'),
+}
@@ -0,0 +1,48 @@
+"""
+Production settings: `DJANGO_SETTINGS_MODULE=app.settings_production`
+
+Everything not set here comes from app/settings.py and its environment
+variables. DEBUG must stay off in production: besides the error pages,
+it keeps every executed query in memory on each connection.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from app.settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+if not ALLOWED_HOSTS:  # noqa: F405
+    raise ImproperlyConfigured('Set ALLOWED_HOSTS for production')
+
+# /metrics is open to anyone without a token
+if not INSTRUMENTATION['METRICS_TOKEN']:  # noqa: F405
+    raise ImproperlyConfigured('Set METRICS_TOKEN for production')
+
+# Writes invalidate cached responses, ETags and autocomplete tries through
+# a per-user data version kept in this cache; with a per-process cache the
+# other workers would keep serving stale data.
+_response_cache = CACHES[RESPONSE_CACHE['BACKEND']]['BACKEND']  # noqa: F405
+if _response_cache.endswith('.LocMemCache'):
+    raise ImproperlyConfigured(
+        'RESPONSE_CACHE needs a cache shared by all workers in production, '
+        'e.g. CACHE_BACKEND=django.core.cache.backends.memcached.'
+        'MemcachedCache with CACHE_LOCATION=host:port'
+    )
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.environ.get('LOG_LEVEL', 'INFO'),
+    },
+    'loggers': {
+        'django.db.backends': {'level': 'WARNING'},
+    },
+}
@@ -1,13 +1,119 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import CharField, Value
+from django.db.models.functions import Lower
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 
 from core import models
 
 
-class UserAdmin(BaseUserAdmin):
+def estimated_count(queryset):
+	"""The planner's row estimate of an unfiltered queryset, else None"""
+	connection = connections[queryset.db]
+	if connection.vendor != 'postgresql' or queryset.query.where:
+		return None
+
+	with connection.cursor() as cursor:
+		cursor.execute(
+			'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+			[queryset.model._meta.db_table]
+		)
+		row = cursor.fetchone()
+
+	return row[0] if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+	"""Shows the table's estimated size on big unfiltered changelists
+
+	An exact COUNT(*) reads every row on Postgres. Filtered or searched
+	lists, and tables under `estimate_threshold` rows, are counted exactly.
+	"""
+
+	estimate_threshold = 100000
+
+	@cached_property
+	def count(self):
+		estimate = estimated_count(self.object_list)
+		if estimate is not None and estimate >= self.estimate_threshold:
+			return estimate
+
+		return super().count
+
+
+class ScalableAdminMixin:
+	"""Changelist defaults for tables with millions of rows
+
+	Searches match `prefix_search_field` by case-insensitive prefix, which
+	the lower(...) text_pattern_ops indexes from migration 0014 serve on
+	Postgres, instead of icontains over several columns. The second count
+	of the unfiltered table is skipped.
+	"""
+
+	prefix_search_field = None
+	paginator = EstimatedCountPaginator
+	show_full_result_count = False
+
+	def get_search_results(self, request, queryset, search_term):
+		term = search_term.strip().lower()
+		if not term or self.prefix_search_field is None:
+			return queryset, False
+
+		field = self.prefix_search_field
+		queryset = queryset.annotate(**{f'lower_{field}': Lower(field)}) \
+						   .filter(**{f'lower_{field}__startswith': term})
+
+		return queryset, False
+
+
+class OwnerFilter(admin.SimpleListFilter):
+	"""`?user=<id>`, served by the (user, ...) indexes
+
+	Listing every user as a choice would not scale, so the filter only
+	shows up once applied, e.g. from the owner links in the changelist.
+	"""
+
+	title = 'owner'
+	parameter_name = 'user'
+
+	def lookups(self, request, model_admin):
+		value = self.value()
+		if not value or not value.isdigit():
+			return []
+
+		user = get_user_model().objects.filter(pk=value).only('email').first()
+
+		return [(value, user.email if user else value)]
+
+	def queryset(self, request, queryset):
+		value = self.value()
+		if value and value.isdigit():
+			return queryset.filter(user_id=value)
+
+		return queryset
+
+
+def owner(obj):
+	return format_html(
+		'<a href="?{}={}">{}</a>', OwnerFilter.parameter_name, obj.user_id,
+		obj.user
+	)
+
+
+owner.short_description = 'owner'
+
+
+class UserAdmin(ScalableAdminMixin, BaseUserAdmin):
 
 	ordering = ['id']
 	list_display = ['email', 'name']
+	search_fields = ['email']
+	prefix_search_field = 'email'
 
 	fieldsets = (
 			(None, {'fields': ('email', 'password')}),
@@ -27,8 +133,82 @@ class UserAdmin(BaseUserAdmin):
 		)
 
 
+class NameAdminForm(forms.ModelForm):
+
+	def clean_name(self):
+		"""Names are unique per user ignoring case (migration 0013)"""
+		name = self.cleaned_data['name']
+		user = self.cleaned_data.get('user')
+		if user is None:
+			return name
+
+		# Folded by the database, as in the unique index
+		lower_name = Lower(Value(name, output_field=CharField()))
+		taken = self._meta.model.objects.filter(user=user) \
+										.annotate(lower_name=Lower('name')) \
+										.filter(lower_name=lower_name)
+		if self.instance.pk is not None:
+			taken = taken.exclude(pk=self.instance.pk)
+		if taken.exists():
+			raise forms.ValidationError(
+				f'{user} already has "{name}", ignoring case.'
+			)
+
+		return name
+
+
+class NameAdmin(ScalableAdminMixin, admin.ModelAdmin):
+	"""Tags and ingredients; also the autocomplete source for recipes"""
+
+	form = NameAdminForm
+	# The owner first, so clean_name sees it
+	fields = ['user', 'name', 'recipe_count']
+	list_display = ['name', owner, 'recipe_count']
+	list_select_related = ['user']
+	list_filter = [OwnerFilter]
+	raw_id_fields = ['user']
+	readonly_fields = ['recipe_count']
+	search_fields = ['name']
+	prefix_search_field = 'name'
+	ordering = ['-id']
+
+
+class RecipeAdminForm(forms.ModelForm):
+
+	def clean(self):
+		cleaned_data = super().clean()
+		user = cleaned_data.get('user')
+		if user is None:
+			return cleaned_data
+
+		for field in ('tags', 'ingredients'):
+			foreign = [
+				obj.name for obj in cleaned_data.get(field, ())
+				if obj.user_id != user.pk
+			]
+			if foreign:
+				self.add_error(
+					field, f'Not owned by {user}: {", ".join(foreign)}'
+				)
+
+		return cleaned_data
+
+
+class RecipeAdmin(ScalableAdminMixin, admin.ModelAdmin):
+
+	form = RecipeAdminForm
+	list_display = ['title', owner, 'time_minutes', 'price']
+	list_select_related = ['user']
+	list_filter = [OwnerFilter]
+	raw_id_fields = ['user']
+	autocomplete_fields = ['tags', 'ingredients']
+	exclude = ['image_variants']
+	search_fields = ['title']
+	prefix_search_field = 'title'
+	ordering = ['-id']
+
 
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
-admin.site.register(models.Recipe)
\ No newline at end of file
+admin.site.register(models.Tag, NameAdmin)
+admin.site.register(models.Ingredient, NameAdmin)
+admin.site.register(models.Recipe, RecipeAdmin)
@@ -0,0 +1,203 @@
+"""Admission control: per route class concurrency limits that adapt
+
+AdmissionMiddleware (core.middleware) sorts every API request into a
+route class (cheap reads, writes, image uploads, ...) and lets it run only
+while its class has a free slot. A request that finds its class full waits
+at most MAX_WAIT_MS in a queue of at most MAX_QUEUE, and is otherwise
+turned away at once with a 503 and a Retry-After, rather than holding a
+worker until everything times out. As each class has its own slots,
+uploads stuck behind a slow disk cannot starve profile reads.
+
+Limits move AIMD style on the observed latency: every request finishing
+within the class's TARGET_MS adds 1/limit (about one slot per full window)
+and a slower one cuts the limit by BACKOFF, at most once per TARGET_MS so a
+single slow episode is not punished once per request. A streamed body
+(the export) holds its slot until it is fully sent, and its latency
+includes the sending.
+
+Counters are per process. Sync gunicorn workers run one request at a time,
+so in-process queueing needs GUNICORN_THREADS > 1, as in the production
+profile; requests that already spent longer than MAX_BACKLOG_MS in front of
+the worker, according to the X-Request-Start header nginx adds there, are
+shed in either case.
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+
+DEFAULT_CLASS = {
+	'LIMIT': 8,
+	'MIN_LIMIT': 1,
+	'MAX_LIMIT': 32,
+	'TARGET_MS': 250,
+	'BACKOFF': 0.9,
+	'MAX_WAIT_MS': 100,
+	'MAX_QUEUE': 16,
+}
+
+DEFAULTS = {
+	'ENABLED': True,
+	'NAMESPACES': ('recipe', 'user'),
+	'CLASSES': {'read': {}, 'write': {}},
+	'ROUTES': {},
+	'MAX_BACKLOG_MS': None,
+}
+
+# Weight of the latest request in the smoothed latency
+SMOOTHING = 0.2
+
+
+def admission_settings():
+	return dict(DEFAULTS, **getattr(settings, 'ADMISSION', {}))
+
+
+class AdaptiveLimit:
+	"""The in-flight requests and the adaptive limit of one route class"""
+
+	def __init__(self, name, options=None):
+		options = dict(DEFAULT_CLASS, **(options or {}))
+		self.name = name
+		self.limit = float(options['LIMIT'])
+		self.min_limit = options['MIN_LIMIT']
+		self.max_limit = options['MAX_LIMIT']
+		self.target = options['TARGET_MS'] / 1000
+		self.backoff = options['BACKOFF']
+		self.max_wait = options['MAX_WAIT_MS'] / 1000
+		self.max_queue = options['MAX_QUEUE']
+
+		self.in_flight = 0
+		self.waiting = 0
+		self.admitted = 0
+		self.rejected = 0
+		self.latency = None
+		self._last_cut = None
+		self._cond = threading.Condition()
+
+	def _free(self):
+		return self.in_flight < max(int(self.limit), 1)
+
+	def acquire(self):
+		"""Take a slot, waiting up to MAX_WAIT_MS; False when shed"""
+		with self._cond:
+			if not self._free():
+				if self.waiting >= self.max_queue or self.max_wait <= 0:
+					self.rejected += 1
+					return False
+
+				deadline = time.monotonic() + self.max_wait
+				self.waiting += 1
+				try:
+					while not self._free():
+						remaining = deadline - time.monotonic()
+						if remaining <= 0:
+							self.rejected += 1
+							return False
+						self._cond.wait(remaining)
+				finally:
+					self.waiting -= 1
+
+			self.in_flight += 1
+			self.admitted += 1
+
+			return True
+
+	def release(self, latency):
+		"""Give the slot back and adapt the limit to `latency` seconds"""
+		with self._cond:
+			self.in_flight -= 1
+			if self.latency is None:
+				self.latency = latency
+			else:
+				self.latency += SMOOTHING * (latency - self.latency)
+
+			now = time.monotonic()
+			if latency <= self.target:
+				self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+			elif self._last_cut is None or now - self._last_cut >= self.target:
+				self.limit = max(self.min_limit, self.limit * self.backoff)
+				self._last_cut = now
+
+			self._cond.notify_all()
+
+	def retry_after(self):
+		"""Whole seconds until the queue ahead is likely drained, at least 1"""
+		latency = self.latency or self.target
+		slots = max(int(self.limit), 1)
+
+		return max(1, math.ceil(latency * (self.waiting + 1) / slots))
+
+	def stats(self):
+		with self._cond:
+			return {
+				'limit': int(self.limit),
+				'in_flight': self.in_flight,
+				'waiting': self.waiting,
+				'admitted': self.admitted,
+				'rejected': self.rejected,
+			}
+
+
+class Admission:
+	"""Route classification and the AdaptiveLimit of every class"""
+
+	def __init__(self, options):
+		self.options = options
+		self.limits = {
+			name: AdaptiveLimit(name, class_options)
+			for name, class_options in options['CLASSES'].items()
+		}
+
+	@classmethod
+	def from_settings(cls):
+		return cls(admission_settings())
+
+	def route_class(self, request):
+		"""The limit for `request`, or None for routes that are not limited"""
+		match = request.resolver_match
+		if not self.options['ENABLED'] or match is None or \
+				match.namespace not in self.options['NAMESPACES']:
+			return None
+
+		name = self.options['ROUTES'].get(match.view_name)
+		if name is None:
+			name = 'read' if request.method in SAFE_METHODS else 'write'
+
+		return self.limits.get(name)
+
+	def backlog(self, request):
+		"""Seconds since the proxy's X-Request-Start, or None"""
+		header = request.META.get('HTTP_X_REQUEST_START', '')
+		try:
+			start = float(header[2:] if header.startswith('t=') else header)
+		except ValueError:
+			return None
+
+		# Seconds, milliseconds or microseconds since the epoch
+		while start > 1e11:
+			start /= 1000
+
+		return max(time.time() - start, 0)
+
+	def too_late(self, request):
+		max_backlog = self.options['MAX_BACKLOG_MS']
+		if max_backlog is None:
+			return False
+
+		backlog = self.backlog(request)
+
+		return backlog is not None and backlog * 1000 > max_backlog
+
+	def stats(self):
+		"""{'<class>_<counter>': value} gauges for /metrics"""
+		return {
+			f'{name}_{counter}': value
+			for name, limit in self.limits.items()
+			for counter, value in limit.stats().items()
+		}
+
+
+admission = Admission.from_settings()
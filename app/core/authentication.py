@@ -0,0 +1,153 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+	"""Process-local LRU of token key -> (user, token) with a TTL
+
+	When `backend` names a Django cache alias, entries are also stored
+	there so other processes can skip the database. Local entries live for
+	at most `ttl` seconds, which bounds how long another process can serve
+	an entry after it was invalidated elsewhere.
+	"""
+
+	prefix = 'auth-token:'
+
+	def __init__(self, max_size=10000, ttl=60, backend=None):
+		self.max_size = max_size
+		self.ttl = ttl
+		self.backend = backend
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.shared_hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	@classmethod
+	def from_settings(cls):
+		options = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+
+		return cls(
+			max_size=options.get('MAX_SIZE', 10000),
+			ttl=options.get('TTL', 60),
+			backend=options.get('BACKEND')
+		)
+
+	def cache_key(self, key):
+		# Keep raw tokens out of shared cache keys.
+		return self.prefix + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+	@property
+	def shared(self):
+		return caches[self.backend] if self.backend else None
+
+	def get(self, key):
+		cache_key = self.cache_key(key)
+		now = time.monotonic()
+
+		with self._lock:
+			entry = self._entries.get(cache_key)
+			if entry is not None and entry[0] > now:
+				self._entries.move_to_end(cache_key)
+				self.hits += 1
+				return entry[1]
+			if entry is not None:
+				del self._entries[cache_key]
+
+		value = self.shared.get(cache_key) if self.shared else None
+		with self._lock:
+			if value is None:
+				self.misses += 1
+				return None
+			self.shared_hits += 1
+
+		self._store(cache_key, value, now)
+
+		return value
+
+	def set(self, key, value):
+		cache_key = self.cache_key(key)
+		self._store(cache_key, value, time.monotonic())
+
+		if self.shared:
+			self.shared.set(cache_key, value, self.ttl)
+
+	def _store(self, cache_key, value, now):
+		with self._lock:
+			self._entries[cache_key] = (now + self.ttl, value)
+			self._entries.move_to_end(cache_key)
+			while len(self._entries) > self.max_size:
+				self._entries.popitem(last=False)
+				self.evictions += 1
+
+	def delete(self, key):
+		cache_key = self.cache_key(key)
+
+		with self._lock:
+			self._entries.pop(cache_key, None)
+
+		if self.shared:
+			self.shared.delete(cache_key)
+
+	def invalidate_user(self, user_id):
+		for key in Token.objects.filter(user_id=user_id) \
+								.values_list('key', flat=True):
+			self.delete(key)
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+			self.hits = self.shared_hits = self.misses = self.evictions = 0
+
+	def stats(self):
+		with self._lock:
+			return {
+				'size': len(self._entries),
+				'hits': self.hits,
+				'shared_hits': self.shared_hits,
+				'misses': self.misses,
+				'evictions': self.evictions,
+			}
+
+
+token_cache = TokenCache.from_settings()
+
+
+def detach(instance, **related):
+	"""Shallow copy a model instance without sharing its state or relations"""
+	clone = copy.copy(instance)
+	clone._state = copy.copy(instance._state)
+	clone._state.fields_cache = dict(related)
+
+	return clone
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+	"""TokenAuthentication that skips the Token + User join on cache hits
+
+	Only active users are cached. Entries are dropped when the token is
+	deleted or the user is saved (password change, is_active flip), see
+	core.signals.
+	"""
+
+	def authenticate_credentials(self, key):
+		cached = token_cache.get(key)
+		if cached is None:
+			user, token = super().authenticate_credentials(key)
+			token_cache.set(key, (detach(user), detach(token)))
+
+			return (user, token)
+
+		# Copies keep per-request changes to request.user out of the cache.
+		user = detach(cached[0])
+
+		return (user, detach(cached[1], user=user))
@@ -0,0 +1,158 @@
+"""Helpers shared by the benchmark management commands"""
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from core.counts import refresh_recipe_counts
+from core.models import Tag, Ingredient, Recipe
+from core.search import reindex_recipes
+
+
+TITLE_WORDS = (
+	'adobo', 'baked', 'beef', 'braised', 'bread', 'broth', 'chicken',
+	'chili', 'coconut', 'creamy', 'crispy', 'curry', 'fish', 'fried',
+	'garlic', 'ginger', 'grilled', 'lemon', 'mango', 'noodle', 'pasta',
+	'pork', 'quick', 'rice', 'roasted', 'salad', 'smoked', 'soup', 'spicy',
+	'steamed', 'stew', 'sweet', 'tofu', 'tomato', 'vegan', 'vegetable',
+)
+
+
+class Rollback(Exception):
+	pass
+
+
+@contextmanager
+def rolled_back():
+	"""Run the block in a transaction that is always rolled back
+
+	Benchmarks seed and time against the real database this way without
+	leaving their rows behind.
+	"""
+	try:
+		with transaction.atomic():
+			yield
+			raise Rollback
+	except Rollback:
+		pass
+
+
+def percentile(samples, pct):
+	ordered = sorted(samples)
+	index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+
+	return ordered[index]
+
+
+def measure(fn, repeat=20, warmup=2):
+	"""Call `fn` repeatedly and return latency stats in milliseconds"""
+	for _ in range(warmup):
+		fn()
+
+	samples = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		fn()
+		samples.append((time.perf_counter() - start) * 1000)
+
+	return {
+		'p50': percentile(samples, 50),
+		'p99': percentile(samples, 99),
+		'mean': statistics.mean(samples),
+	}
+
+
+def seed_library(user, recipes, tags=50, ingredients=200,
+				 tags_per_recipe=3, ingredients_per_recipe=6, seed=0):
+	"""Bulk insert a realistic recipe library for `user`
+
+	Tag and ingredient popularity is skewed so a few are on most recipes
+	and the long tail is rare, like a real cookbook. Their recipe counts are
+	filled in at the end. Returns the ids of the created tags, ingredients
+	and recipes.
+	"""
+	rng = random.Random(seed)
+
+	bulk_insert(Tag, (Tag(user=user, name=f'Tag {i}') for i in range(tags)))
+	bulk_insert(Ingredient, (
+		Ingredient(user=user, name=f'Ingredient {i}')
+		for i in range(ingredients)
+	))
+	bulk_insert(Recipe, (
+		Recipe(
+			user=user,
+			title=' '.join(rng.sample(TITLE_WORDS, 3)),
+			time_minutes=rng.randint(5, 180),
+			price=rng.randint(100, 9999) / 100
+		)
+		for i in range(recipes)
+	))
+
+	# Postgres returns ids from bulk_create but SQLite does not, so read
+	# them back rather than relying on the instances.
+	tag_ids = list(
+		Tag.objects.filter(user=user).order_by('id').values_list('id', flat=True)
+	)
+	ingredient_ids = list(
+		Ingredient.objects.filter(user=user).order_by('id')
+						  .values_list('id', flat=True)
+	)
+	recipe_ids = list(
+		Recipe.objects.filter(user=user).order_by('id')
+					  .values_list('id', flat=True)
+	)
+
+	link(Recipe.tags.through, 'tag_id', recipe_ids, tag_ids,
+		 tags_per_recipe, rng)
+	link(Recipe.ingredients.through, 'ingredient_id', recipe_ids,
+		 ingredient_ids, ingredients_per_recipe, rng)
+	refresh_recipe_counts(Tag, tag_ids)
+	refresh_recipe_counts(Ingredient, ingredient_ids)
+
+	return tag_ids, ingredient_ids, recipe_ids
+
+
+def seed_users(users, recipes, password='password1234', **options):
+	"""Create `users` users, each with a seeded library of `recipes`
+
+	Seeding skips model signals, so the search index is built here. Returns
+	[(user, (tag_ids, ingredient_ids, recipe_ids))].
+	"""
+	seeded = []
+	for i in range(users):
+		user = get_user_model().objects.create_user(
+			f'bench-user-{i}@bench.local', password
+		)
+		ids = seed_library(user, recipes, seed=i, **options)
+		reindex_recipes(ids[2])
+		seeded.append((user, ids))
+
+	return seeded
+
+
+def bulk_insert(model, objs, chunk_size=500):
+	"""bulk_create in fixed chunks, within SQLite's compound SELECT limit"""
+	chunk = []
+	for obj in objs:
+		chunk.append(obj)
+		if len(chunk) == chunk_size:
+			model.objects.bulk_create(chunk)
+			chunk = []
+
+	if chunk:
+		model.objects.bulk_create(chunk)
+
+
+def link(through, column, recipe_ids, target_ids, per_recipe, rng):
+	weights = [1 / (rank + 1) for rank in range(len(target_ids))]
+
+	def rows():
+		for recipe_id in recipe_ids:
+			chosen = set(rng.choices(target_ids, weights=weights, k=per_recipe))
+			for target_id in chosen:
+				yield through(recipe_id=recipe_id, **{column: target_id})
+
+	bulk_insert(through, rows())
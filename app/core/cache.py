@@ -0,0 +1,155 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+
+
+def _cache():
+	options = getattr(settings, 'RESPONSE_CACHE', {})
+
+	return caches[options.get('BACKEND', 'default')]
+
+
+def _timeout():
+	return getattr(settings, 'RESPONSE_CACHE', {}).get('TIMEOUT', 300)
+
+
+def _version_key(user_id):
+	return f'data-version:{user_id}'
+
+
+def user_data_version(user_id):
+	"""Current version of everything `user_id` owns
+
+	A missing version (first use or evicted) starts from the clock rather
+	than 1, so entries cached under an older version are never reused.
+	"""
+	cache = _cache()
+	key = _version_key(user_id)
+	version = cache.get(key)
+
+	if version is None:
+		version = int(time.time() * 1000000)
+		if not cache.add(key, version, None):
+			version = cache.get(key, version)
+
+	return version
+
+
+def _bump(user_id):
+	cache = _cache()
+	try:
+		cache.incr(_version_key(user_id))
+	except ValueError:
+		user_data_version(user_id)
+
+
+def bump_user_data_version(user_id):
+	"""Invalidate every cached response for `user_id`
+
+	Inside a transaction the version is bumped again on commit, otherwise a
+	reader could cache pre-commit rows under the already bumped version.
+	"""
+	_bump(user_id)
+
+	if transaction.get_connection().in_atomic_block:
+		transaction.on_commit(lambda: _bump(user_id))
+
+
+def etag_matches(header, etag):
+	"""Whether an If-None-Match `header` lists `etag`, compared weakly
+
+	Weak comparison, as RFC 7232 asks for If-None-Match; the compression
+	middleware sends these ETags weakened.
+	"""
+	tags = parse_etags(header)
+
+	return '*' in tags or etag in (
+		tag[2:] if tag.startswith('W/') else tag for tag in tags
+	)
+
+
+class CachedResponseMixin:
+	"""Serve repeat reads from the response cache
+
+	Viewsets route read actions through `cached_response`. Rendered
+	responses are cached per (user, path, query params, media type, user
+	data version), so a hit skips the database and the serializer.
+	Any write bumps the version (see core.signals), which both orphans the
+	old entries and changes the ETags used for conditional requests. An
+	ETag is the version plus the digest of the path, query params and media
+	type, so it only matches the representation it came from. Both hits
+	and misses carry `response_cache_key`, under which the compression
+	middleware keeps the encoded body (see `encoded_content`).
+	"""
+
+	def get_response_digest(self, request):
+		"""Digest of what selects the representation besides the user"""
+		params = sorted(request.query_params.lists())
+		raw = f'{request.path}:{params}:{request.accepted_media_type}'
+
+		return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+	def cached_response(self, handler, request, *args, **kwargs):
+		version = user_data_version(request.user.pk)
+		digest = self.get_response_digest(request)
+		etag = f'"{version}-{digest[:16]}"'
+
+		if etag_matches(request.META.get('HTTP_IF_NONE_MATCH', ''), etag):
+			return self.tag_response(HttpResponseNotModified(), etag)
+
+		key = f'response:{request.user.pk}:{version}:{digest}'
+		cached = _cache().get(key)
+		if cached is not None:
+			content, content_type = cached
+			response = HttpResponse(content, content_type=content_type)
+			response['X-Cache'] = 'HIT'
+			response.response_cache_key = key
+			return self.tag_response(response, etag)
+
+		request.response_cache = (key, etag)
+
+		return handler(request, *args, **kwargs)
+
+	def tag_response(self, response, etag):
+		response['ETag'] = etag
+		patch_cache_control(response, private=True, no_cache=True)
+		patch_vary_headers(response, ('Authorization',))
+
+		return response
+
+	def finalize_response(self, request, response, *args, **kwargs):
+		response = super().finalize_response(request, response, *args, **kwargs)
+		key, etag = getattr(request, 'response_cache', (None, None))
+
+		if key and response.status_code == 200:
+			response.render()
+			_cache().set(
+				key, (response.content, response['Content-Type']), _timeout()
+			)
+			response['X-Cache'] = 'MISS'
+			response.response_cache_key = key
+			self.tag_response(response, etag)
+
+		return response
+
+
+def encoded_content(key, encoding, encode):
+	"""The body cached under `key` as encoded by `encoding`
+
+	Encoded once per cache entry with `encode()` and kept next to it for
+	the same time, so a new data version orphans both.
+	"""
+	cache = _cache()
+	encoded_key = f'{key}:{encoding}'
+	content = cache.get(encoded_key)
+	if content is None:
+		content = encode()
+		cache.set(encoded_key, content, _timeout())
+
+	return content
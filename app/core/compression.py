@@ -0,0 +1,128 @@
+"""Negotiated brotli and gzip compression of API responses
+
+CompressionMiddleware picks the coding from Accept-Encoding, preferring
+brotli when the `brotli` package is installed, and the level from
+COMPRESSION, per route where ROUTE_LEVELS says so. Bodies under MIN_SIZE
+are sent as they are. Streamed responses such as the recipe export are
+compressed chunk by chunk as they are sent. Responses served by the
+response cache (core.cache) keep their compressed bytes next to the cache
+entry, so a hit is not compressed again.
+"""
+import zlib
+
+from django.conf import settings
+
+try:
+	import brotli
+except ImportError:
+	brotli = None
+
+
+BROTLI = 'br'
+GZIP = 'gzip'
+
+# The gzip container, as zlib's wbits
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+DEFAULTS = {
+	'ENABLED': True,
+	'MIN_SIZE': 1024,
+	'LEVELS': {BROTLI: 4, GZIP: 6},
+	'ROUTE_LEVELS': {},
+	'CONTENT_TYPES': ('application/json', 'application/x-ndjson', 'text/'),
+}
+
+
+def compression_settings():
+	return dict(DEFAULTS, **getattr(settings, 'COMPRESSION', {}))
+
+
+def available_codings():
+	"""Supported codings, the preferred one first"""
+	return (BROTLI, GZIP) if brotli is not None else (GZIP,)
+
+
+def accepted_codings(header):
+	"""{coding: q} from an Accept-Encoding header"""
+	codings = {}
+	for part in header.split(','):
+		coding, *params = [item.strip() for item in part.split(';')]
+		if not coding:
+			continue
+		q = 1.0
+		for param in params:
+			name, _, value = param.partition('=')
+			if name.strip() == 'q':
+				try:
+					q = float(value)
+				except ValueError:
+					q = 0.0
+		codings[coding.lower()] = q
+
+	return codings
+
+
+def negotiate(header, available=None):
+	"""The best of `available` the client accepts, or None for identity"""
+	accepted = accepted_codings(header)
+	best, best_q = None, 0.0
+	for coding in available or available_codings():
+		q = accepted.get(coding, accepted.get('*', 0.0))
+		if q > best_q:
+			best, best_q = coding, q
+
+	return best
+
+
+def route_level(route, coding, options):
+	"""Level for `coding` on `route`; None turns compression off there"""
+	levels = dict(options['LEVELS'])
+	if route in options['ROUTE_LEVELS']:
+		levels.update(options['ROUTE_LEVELS'][route] or
+					  {name: None for name in levels})
+
+	return levels.get(coding)
+
+
+def compressor(coding, level):
+	"""An object with compress(data) and flush(), whatever the coding"""
+	if coding == BROTLI:
+		return BrotliCompressor(level)
+
+	return zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+
+
+class BrotliCompressor:
+
+	def __init__(self, quality):
+		self.compressor = brotli.Compressor(
+			mode=brotli.MODE_TEXT, quality=quality
+		)
+
+	def compress(self, data):
+		return self.compressor.process(data)
+
+	def flush(self):
+		return self.compressor.finish()
+
+
+def compress(content, coding, level):
+	compressobj = compressor(coding, level)
+
+	return compressobj.compress(content) + compressobj.flush()
+
+
+def compress_stream(chunks, coding, level):
+	"""Compress an iterable of byte strings incrementally
+
+	Output is yielded as the compressor emits it rather than per chunk, so
+	small chunks do not each cost a flush.
+	"""
+	compressobj = compressor(coding, level)
+	for chunk in chunks:
+		data = compressobj.compress(chunk)
+		if data:
+			yield data
+
+	yield compressobj.flush()
@@ -0,0 +1,63 @@
+"""Denormalized recipe counts on Tag and Ingredient
+
+`recipe_count` is recomputed from the link table for the rows a write
+touched, rather than incremented, so clears, replacements and repeated
+signals all leave it exact. core.signals covers the ORM paths and
+recipe.bulk the bulk writes.
+"""
+from django.conf import settings
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from core.models import Ingredient, Recipe, Tag
+from core.search import chunks
+
+
+RELATIONS = {
+	Tag: Recipe.tags,
+	Ingredient: Recipe.ingredients,
+}
+
+
+def uses_counter():
+	"""Whether reads take recipe counts from the column (RECIPE_COUNT_SOURCE)"""
+	return getattr(settings, 'RECIPE_COUNT_SOURCE', 'annotate') == 'counter'
+
+
+def linked_ids(model, recipe_ids):
+	"""Ids of `model` rows linked to any of `recipe_ids`"""
+	relation = RELATIONS[model]
+	column = relation.field.m2m_reverse_name()
+	ids = set()
+	for batch in chunks(recipe_ids):
+		ids.update(
+			relation.through.objects.filter(recipe_id__in=batch)
+									.values_list(column, flat=True)
+		)
+
+	return ids
+
+
+def count_links(model, through, column, ids):
+	"""Set `recipe_count` of `model` rows `ids` to their rows in `through`
+
+	Takes the link table explicitly so migrations can pass historical models.
+	"""
+	links = through.objects.filter(**{column: OuterRef('pk')}) \
+						   .order_by() \
+						   .values(column) \
+						   .annotate(total=Count('*')) \
+						   .values('total')
+	count = Coalesce(
+		Subquery(links, output_field=IntegerField()),
+		Value(0)
+	)
+
+	for batch in chunks(ids):
+		model.objects.filter(pk__in=batch).update(recipe_count=count)
+
+
+def refresh_recipe_counts(model, ids):
+	"""Recount `recipe_count` of `model` rows `ids` in one UPDATE per chunk"""
+	relation = RELATIONS[model]
+	count_links(model, relation.through, relation.field.m2m_reverse_name(), ids)
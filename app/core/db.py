@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+def check_idle_connections(**kwargs):
+	"""request_started receiver dropping persistent connections that died
+
+	CONN_MAX_AGE reuses a connection across requests, but a connection left
+	idle may have been closed by the server, a pooler or a firewall in the
+	meantime. Those idle for longer than CONN_HEALTH_CHECK_IDLE seconds are
+	pinged first and closed if the ping fails, so Django reconnects instead
+	of failing the request. Busy connections skip the extra round trip.
+	"""
+	idle_limit = getattr(settings, 'CONN_HEALTH_CHECK_IDLE', 30)
+	now = time.monotonic()
+
+	for connection in connections.all():
+		if connection.connection is None:
+			continue
+
+		last_used = getattr(connection, 'last_request_finished', now)
+		if now - last_used >= idle_limit and not connection.is_usable():
+			connection.close()
+
+
+def mark_connections_used(**kwargs):
+	"""request_finished receiver recording when each connection was last used"""
+	now = time.monotonic()
+	for connection in connections.all():
+		if connection.connection is not None:
+			connection.last_request_finished = now
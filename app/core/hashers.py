@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+def hashing_option(name, default):
+	return getattr(settings, 'PASSWORD_HASHING', {}).get(name, default)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+	"""Argon2 with its costs taken from settings.PASSWORD_HASHING
+
+	Hashes stored with other costs still verify, and must_update() tells
+	Django to rehash them with the current costs on the next successful
+	login, so costs can be raised or lowered without a migration.
+	"""
+
+	@property
+	def time_cost(self):
+		return hashing_option('ARGON2_TIME_COST', 2)
+
+	@property
+	def memory_cost(self):
+		return hashing_option('ARGON2_MEMORY_COST', 19456)
+
+	@property
+	def parallelism(self):
+		return hashing_option('ARGON2_PARALLELISM', 1)
@@ -0,0 +1,204 @@
+import atexit
+import io
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from PIL import Image, features
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+from core.cache import bump_user_data_version
+from core.models import Recipe
+
+
+logger = logging.getLogger(__name__)
+
+
+# EXIF orientation -> transpose that brings the pixels upright
+ORIENTATION_TRANSPOSE = {
+	2: Image.FLIP_LEFT_RIGHT,
+	3: Image.ROTATE_180,
+	4: Image.FLIP_TOP_BOTTOM,
+	5: Image.TRANSPOSE,
+	6: Image.ROTATE_270,
+	7: Image.TRANSVERSE,
+	8: Image.ROTATE_90,
+}
+
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+DEFAULTS = {
+	'QUEUE': 'core.images.ThreadPoolQueue',
+	'WORKERS': 2,
+	'QUALITY': 82,
+	'VARIANTS': {
+		'thumb': (200, 'JPEG'),
+		'thumb_webp': (200, 'WEBP'),
+		'medium': (800, 'JPEG'),
+		'medium_webp': (800, 'WEBP'),
+	},
+}
+
+
+def pipeline_settings():
+	return dict(DEFAULTS, **getattr(settings, 'IMAGE_PIPELINE', {}))
+
+
+def open_upright(fp, max_size):
+	"""Open an image, decoding JPEGs at a reduced scale and fixing rotation"""
+	image = Image.open(fp)
+	# Draft mode lets libjpeg decode at 1/2, 1/4 or 1/8 scale directly.
+	image.draft('RGB', (max_size, max_size))
+
+	exif = image._getexif() if hasattr(image, '_getexif') else None
+	transpose = ORIENTATION_TRANSPOSE.get((exif or {}).get(0x0112))
+	if transpose is not None:
+		image = image.transpose(transpose)
+
+	return image
+
+
+def render_variant(image, size, image_format, quality):
+	variant = image.copy()
+	variant.thumbnail((size, size), Image.LANCZOS)
+
+	if image_format == 'JPEG' or variant.mode not in ('RGB', 'RGBA'):
+		variant = variant.convert('RGB')
+
+	# Saving a fresh image without an exif argument strips the metadata.
+	buffer = io.BytesIO()
+	variant.save(buffer, format=image_format, quality=quality, optimize=True)
+
+	return buffer.getvalue()
+
+
+def generate_variants(name, options=None):
+	"""Write every configured variant of the stored image `name`
+
+	Returns {variant name: storage path}. WebP variants are skipped when
+	Pillow was built without WebP support.
+	"""
+	options = options or pipeline_settings()
+	variants = {
+		key: spec for key, spec in options['VARIANTS'].items()
+		if spec[1] != 'WEBP' or features.check('webp')
+	}
+	if not variants:
+		return {}
+
+	base = os.path.splitext(name)[0]
+	largest = max(size for size, _ in variants.values())
+	paths = {}
+
+	with default_storage.open(name, 'rb') as fp:
+		image = open_upright(fp, largest)
+		image.load()
+
+	for key, (size, image_format) in variants.items():
+		content = render_variant(image, size, image_format, options['QUALITY'])
+		path = f'{base}_{key}.{FORMAT_EXTENSIONS[image_format]}'
+		if default_storage.exists(path):
+			default_storage.delete(path)
+		paths[key] = default_storage.save(path, ContentFile(content))
+
+	return paths
+
+
+def process_recipe_image(recipe_id, stale_paths=()):
+	"""Worker entry point: build variants for the recipe's current image"""
+	close_old_connections()
+	try:
+		for path in stale_paths:
+			default_storage.delete(path)
+
+		recipe = Recipe.objects.filter(pk=recipe_id) \
+							   .values('user_id', 'image').first()
+		if not recipe or not recipe['image']:
+			return
+
+		paths = generate_variants(recipe['image'])
+
+		# Only record the variants if the image was not replaced meanwhile.
+		updated = Recipe.objects.filter(pk=recipe_id, image=recipe['image']) \
+								.update(image_variants=json.dumps(paths))
+		if updated:
+			bump_user_data_version(recipe['user_id'])
+		else:
+			for path in paths.values():
+				default_storage.delete(path)
+	except Exception:
+		logger.exception('Image processing failed for recipe %s', recipe_id)
+	finally:
+		close_old_connections()
+
+
+class SyncQueue:
+	"""Runs jobs inline, for tests and single process debugging"""
+
+	def __init__(self, workers=None):
+		pass
+
+	def enqueue(self, fn, *args):
+		fn(*args)
+
+
+class ThreadPoolQueue:
+
+	def __init__(self, workers=2):
+		self.executor = ThreadPoolExecutor(
+			max_workers=workers,
+			thread_name_prefix='image-pipeline'
+		)
+		# Finish queued jobs when the process exits, e.g. a gunicorn worker
+		# recycling after max_requests. Jobs lost to a hard kill are picked
+		# up again by `manage.py requeue_images`.
+		atexit.register(self.executor.shutdown, wait=True)
+
+	def enqueue(self, fn, *args):
+		self.executor.submit(fn, *args)
+
+
+class ProcessPoolQueue(ThreadPoolQueue):
+	"""Spawned worker processes that set Django up on start
+
+	Spawning rather than forking keeps workers off the web process's
+	database sockets.
+	"""
+
+	def __init__(self, workers=2):
+		self.executor = ProcessPoolExecutor(
+			max_workers=workers,
+			mp_context=multiprocessing.get_context('spawn'),
+			initializer=django.setup
+		)
+		atexit.register(self.executor.shutdown, wait=True)
+
+
+_queue = None
+
+
+def get_queue():
+	global _queue
+	if _queue is None:
+		options = pipeline_settings()
+		_queue = import_string(options['QUEUE'])(options['WORKERS'])
+
+	return _queue
+
+
+def schedule_recipe_image(recipe, stale_paths=()):
+	"""Queue variant generation once the upload is committed"""
+	transaction.on_commit(
+		lambda: get_queue().enqueue(
+			process_recipe_image, recipe.pk, tuple(stale_paths)
+		)
+	)
@@ -0,0 +1,374 @@
+import io
+import json
+import statistics
+import time
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import get_resolver, reverse
+
+from rest_framework.test import APIClient
+
+from core.benchmark import bulk_insert, percentile, rolled_back, seed_users
+from core.cache import bump_user_data_version
+from core.metrics import RequestStats
+from core.models import Recipe
+
+
+class Case:
+	"""One request shape; `prepare(i)` runs untimed and returns its kwargs"""
+
+	def __init__(self, name, route, method, prepare):
+		self.name = name
+		self.route = route
+		self.method = method
+		self.prepare = prepare
+
+
+def jpeg(size=(640, 480)):
+	buffer = io.BytesIO()
+	Image.new('RGB', size, (200, 30, 30)).save(buffer, 'JPEG')
+
+	return buffer.getvalue()
+
+
+def route_names(*namespaces):
+	"""Every named route of the given URL namespaces"""
+	names = set()
+	for namespace in namespaces:
+		_, resolver = get_resolver().namespace_dict[namespace]
+		names.update(
+			f'{namespace}:{name}' for name in resolver.reverse_dict
+			if isinstance(name, str)
+		)
+
+	return names
+
+
+class Command(BaseCommand):
+	help = 'Benchmark every route of the recipe and user APIs on a seeded ' \
+		   'database, optionally failing on regressions against a baseline'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--users', type=int, default=3)
+		parser.add_argument('--recipes', type=int, default=1000,
+							help='Recipes per user')
+		parser.add_argument('--repeat', type=int, default=30)
+		parser.add_argument('--warmup', type=int, default=3)
+		parser.add_argument('--batch', type=int, default=100,
+							help='Items per bulk request')
+		parser.add_argument('--output', help='Write the results as JSON here')
+		parser.add_argument('--baseline', help='Compare against this JSON file')
+		parser.add_argument(
+			'--tolerance', type=float, default=0.25,
+			help='Allowed relative p50 slowdown against the baseline'
+		)
+		parser.add_argument(
+			'--slack-ms', type=float, default=1.0,
+			help='Absolute p50 slowdown always allowed, for very fast routes'
+		)
+
+	def handle(self, *args, **options):
+		self.uploads = []
+		with rolled_back():
+			results = self.run(options)
+			self.uploads.extend(
+				Recipe.objects.filter(user__email__startswith='bench-user-')
+							  .exclude(image='').exclude(image=None)
+							  .values_list('image', flat=True)
+			)
+			for name in set(self.uploads):
+				default_storage.delete(name)
+
+		self.report(results)
+
+		if options['output']:
+			with open(options['output'], 'w') as fp:
+				json.dump(results, fp, indent=2, sort_keys=True)
+
+		if options['baseline']:
+			with open(options['baseline']) as fp:
+				baseline = json.load(fp)
+			regressions = self.compare(results, baseline, options)
+			if regressions:
+				for line in regressions:
+					self.stderr.write(line)
+				raise CommandError(f'{len(regressions)} regressions')
+			self.stdout.write(self.style.SUCCESS('No regressions'))
+
+	def run(self, options):
+		self.stdout.write(
+			f"Seeding {options['users']} users x {options['recipes']} recipes..."
+		)
+		seeded = seed_users(options['users'], options['recipes'])
+		user, (tag_ids, ingredient_ids, recipe_ids) = seeded[0]
+		with connection.cursor() as cursor:
+			cursor.execute('ANALYZE')
+
+		client = APIClient()
+		client.force_authenticate(user)
+		cases = self.cases(user, tag_ids, ingredient_ids, recipe_ids, options)
+		testserver = override_settings(
+			ALLOWED_HOSTS=settings.ALLOWED_HOSTS + ['testserver']
+		)
+
+		missing = route_names('recipe', 'user') - {case.route for case in cases}
+		if missing:
+			self.stderr.write(f"Routes not benchmarked: {', '.join(sorted(missing))}")
+
+		results = {
+			'vendor': connection.vendor,
+			'users': options['users'],
+			'recipes': options['recipes'],
+			'cases': {},
+		}
+		with testserver:
+			for case in cases:
+				results['cases'][case.name] = self.run_case(client, case, options)
+
+		return results
+
+	def run_case(self, client, case, options):
+		samples, queries = [], []
+		for i in range(options['warmup'] + options['repeat']):
+			kwargs = case.prepare(i)
+			stats = RequestStats()
+
+			with connection.execute_wrapper(stats):
+				start = time.perf_counter()
+				res = getattr(client, case.method)(**kwargs)
+				if res.streaming:
+					b''.join(res.streaming_content)
+				elapsed = (time.perf_counter() - start) * 1000
+
+			if res.status_code >= 400:
+				raise CommandError(
+					f'{case.name}: HTTP {res.status_code} {res.content[:200]}'
+				)
+			if i >= options['warmup']:
+				samples.append(elapsed)
+				queries.append(stats.queries)
+
+		return {
+			'route': case.route,
+			'p50': percentile(samples, 50),
+			'p99': percentile(samples, 99),
+			'mean': statistics.mean(samples),
+			'queries': max(queries),
+			'rps': 1000 * len(samples) / sum(samples),
+		}
+
+	def cases(self, user, tag_ids, ingredient_ids, recipe_ids, options):
+		batch = options['batch']
+		image = jpeg()
+
+		def cold(**kwargs):
+			"""A read with the response cache invalidated first"""
+			def prepare(i):
+				bump_user_data_version(user.pk)
+				return kwargs
+			return prepare
+
+		def warm(**kwargs):
+			return lambda i: kwargs
+
+		def detail(i):
+			return reverse(
+				'recipe:recipe-detail', args=[recipe_ids[i % len(recipe_ids)]]
+			)
+
+		def scratch_recipes(count, i):
+			"""Recipes made outside the timed request, for deletes"""
+			title = f'scratch {i}'
+			bulk_insert(Recipe, (
+				Recipe(user=user, title=title, time_minutes=5, price=1)
+				for _ in range(count)
+			))
+			return list(Recipe.objects.filter(user=user, title=title)
+									  .values_list('id', flat=True))
+
+		def upload(i):
+			recipe_id = recipe_ids[i % len(recipe_ids)]
+			# Remember the file this upload replaces, to delete it afterwards.
+			self.uploads.extend(
+				Recipe.objects.filter(pk=recipe_id).exclude(image='')
+							  .exclude(image=None).values_list('image', flat=True)
+			)
+			return {
+				'path': reverse('recipe:recipe-upload-image', args=[recipe_id]),
+				'data': {'image': ContentFile(image, name='bench.jpg')},
+				'format': 'multipart',
+			}
+
+		def recipe_payload(i):
+			return {
+				'title': f'Bench recipe {i}',
+				'time_minutes': 30,
+				'price': '5.00',
+				'tags': tag_ids[:3],
+				'ingredients': ingredient_ids[:6],
+			}
+
+		tags_url = reverse('recipe:tag-list')
+		ingredients_url = reverse('recipe:ingredient-list')
+		recipes_url = reverse('recipe:recipe-list')
+		recipes_bulk_url = reverse('recipe:recipe-bulk')
+		me_url = reverse('user:me')
+
+		return [
+			Case('api root', 'recipe:api-root', 'get',
+				 warm(path=reverse('recipe:api-root'))),
+			Case('tag list', 'recipe:tag-list', 'get', cold(path=tags_url)),
+			Case('tag list cached', 'recipe:tag-list', 'get', warm(path=tags_url)),
+			Case('tag list assigned with counts', 'recipe:tag-list', 'get', cold(
+				path=tags_url, data={'assigned_only': '1', 'with_counts': '1'}
+			)),
+			Case('tag create', 'recipe:tag-list', 'post',
+				 lambda i: {'path': tags_url, 'data': {'name': f'New tag {i}'}}),
+			Case('tag bulk create', 'recipe:tag-bulk', 'post', lambda i: {
+				'path': reverse('recipe:tag-bulk'),
+				'data': [{'name': f'Bulk tag {i}-{n}'} for n in range(batch)],
+				'format': 'json',
+			}),
+			Case('tag autocomplete', 'recipe:tag-autocomplete', 'get', cold(
+				path=reverse('recipe:tag-autocomplete'), data={'prefix': 'tag 1'}
+			)),
+			Case('tag autocomplete cached', 'recipe:tag-autocomplete', 'get',
+				 warm(
+					 path=reverse('recipe:tag-autocomplete'),
+					 data={'prefix': 'tag 2'}
+				 )),
+			Case('ingredient list', 'recipe:ingredient-list', 'get',
+				 cold(path=ingredients_url)),
+			Case('ingredient autocomplete', 'recipe:ingredient-autocomplete',
+				 'get', cold(
+					 path=reverse('recipe:ingredient-autocomplete'),
+					 data={'prefix': 'ingredient 1'}
+				 )),
+			Case('ingredient create', 'recipe:ingredient-list', 'post',
+				 lambda i: {
+					 'path': ingredients_url,
+					 'data': {'name': f'New ingredient {i}'},
+				 }),
+			Case('ingredient bulk create', 'recipe:ingredient-bulk', 'post',
+				 lambda i: {
+					 'path': reverse('recipe:ingredient-bulk'),
+					 'data': [{'name': f'Bulk ingredient {i}-{n}'}
+							  for n in range(batch)],
+					 'format': 'json',
+				 }),
+			Case('recipe list', 'recipe:recipe-list', 'get', cold(path=recipes_url)),
+			Case('recipe list cached', 'recipe:recipe-list', 'get',
+				 warm(path=recipes_url)),
+			Case('recipe list by tags', 'recipe:recipe-list', 'get', cold(
+				path=recipes_url,
+				data={'tags': ','.join(str(pk) for pk in tag_ids[-3:])}
+			)),
+			Case('recipe search', 'recipe:recipe-list', 'get', cold(
+				path=recipes_url, data={'search': 'spicy chicken'}
+			)),
+			Case('recipe stats', 'recipe:recipe-stats', 'get',
+				 cold(path=reverse('recipe:recipe-stats'))),
+			Case('recipe stats cached', 'recipe:recipe-stats', 'get',
+				 warm(path=reverse('recipe:recipe-stats'))),
+			Case('recipe detail', 'recipe:recipe-detail', 'get',
+				 lambda i: bump_user_data_version(user.pk) or {'path': detail(i)}),
+			Case('recipe create', 'recipe:recipe-list', 'post', lambda i: {
+				'path': recipes_url, 'data': recipe_payload(i), 'format': 'json',
+			}),
+			Case('recipe update', 'recipe:recipe-detail', 'patch', lambda i: {
+				'path': detail(i),
+				'data': {'title': f'Renamed {i}'},
+				'format': 'json',
+			}),
+			Case('recipe replace', 'recipe:recipe-detail', 'put', lambda i: {
+				'path': detail(i), 'data': recipe_payload(i), 'format': 'json',
+			}),
+			Case('recipe delete', 'recipe:recipe-detail', 'delete', lambda i: {
+				'path': reverse(
+					'recipe:recipe-detail', args=scratch_recipes(1, i)
+				),
+			}),
+			Case('recipe upload image', 'recipe:recipe-upload-image', 'post',
+				 upload),
+			Case('recipe export', 'recipe:recipe-export', 'get',
+				 warm(path=reverse('recipe:recipe-export'))),
+			Case('recipe bulk create', 'recipe:recipe-bulk', 'post', lambda i: {
+				'path': recipes_bulk_url,
+				'data': [recipe_payload(n) for n in range(batch)],
+				'format': 'json',
+			}),
+			Case('recipe bulk update', 'recipe:recipe-bulk', 'patch', lambda i: {
+				'path': recipes_bulk_url,
+				'data': [{'id': pk, 'title': f'Bulk renamed {i}'}
+						 for pk in recipe_ids[:batch]],
+				'format': 'json',
+			}),
+			Case('recipe bulk delete', 'recipe:recipe-bulk', 'delete', lambda i: {
+				'path': recipes_bulk_url,
+				'data': scratch_recipes(batch, i),
+				'format': 'json',
+			}),
+			Case('user create', 'user:create', 'post', lambda i: {
+				'path': reverse('user:create'),
+				'data': {
+					'email': f'new-{i}@bench.local',
+					'password': 'password1234',
+					'name': 'Bench',
+				},
+			}),
+			Case('user token', 'user:token', 'post', warm(
+				path=reverse('user:token'),
+				data={'email': user.email, 'password': 'password1234'}
+			)),
+			Case('user me', 'user:me', 'get', warm(path=me_url)),
+			Case('user me update', 'user:me', 'patch', lambda i: {
+				'path': me_url, 'data': {'name': f'Bench {i}'},
+			}),
+		]
+
+	def report(self, results):
+		self.stdout.write(
+			f"\n{results['vendor']}, {results['users']} users x "
+			f"{results['recipes']} recipes"
+		)
+		self.stdout.write(
+			'case                      p50 ms   p99 ms  queries      rps'
+		)
+		for name, row in results['cases'].items():
+			self.stdout.write(
+				f"{name:<24} {row['p50']:>8.2f} {row['p99']:>8.2f} "
+				f"{row['queries']:>8} {row['rps']:>8.1f}"
+			)
+
+	def compare(self, results, baseline, options):
+		"""Lines describing each case that got slower or runs more queries"""
+		if (baseline.get('vendor'), baseline.get('recipes')) != \
+				(results['vendor'], results['recipes']):
+			self.stderr.write(
+				'Baseline was recorded on a different database or library size'
+			)
+
+		regressions = []
+		for name, row in results['cases'].items():
+			base = baseline.get('cases', {}).get(name)
+			if base is None:
+				continue
+
+			if row['queries'] > base['queries']:
+				regressions.append(
+					f"{name}: {base['queries']} -> {row['queries']} queries"
+				)
+			limit = base['p50'] * (1 + options['tolerance']) + options['slack_ms']
+			if row['p50'] > limit:
+				regressions.append(
+					f"{name}: p50 {base['p50']:.2f} -> {row['p50']:.2f} ms"
+				)
+
+		return regressions
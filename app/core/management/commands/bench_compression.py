@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import compression
+from core.benchmark import measure, rolled_back, seed_users
+
+
+class Command(BaseCommand):
+	help = 'Compressed size and cost of real recipe API payloads per coding ' \
+		   'and level, with the time to send them over a given link'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--recipes', type=int, default=1000)
+		parser.add_argument('--repeat', type=int, default=20)
+		parser.add_argument('--warmup', type=int, default=2)
+		parser.add_argument(
+			'--mbps', type=float, nargs='+', default=[5.0, 50.0],
+			help='Link speeds in megabits per second to estimate sends for'
+		)
+		parser.add_argument('--gzip-levels', type=int, nargs='+',
+							default=[1, 6, 9])
+		parser.add_argument('--brotli-levels', type=int, nargs='+',
+							default=[1, 4, 6, 11])
+
+	def handle(self, *args, **options):
+		testserver = override_settings(
+			ALLOWED_HOSTS=settings.ALLOWED_HOSTS + ['testserver']
+		)
+		with rolled_back(), testserver:
+			payloads = self.payloads(options)
+
+		codings = [('gzip', level) for level in options['gzip_levels']]
+		if compression.brotli is not None:
+			codings += [('br', level) for level in options['brotli_levels']]
+		else:
+			self.stderr.write('brotli is not installed, skipping br')
+
+		for name, content in payloads:
+			self.report(name, content, codings, options)
+
+		self.stdout.write(self.style.SUCCESS(
+			'Done (cached responses pay the compression once per data version)'
+		))
+
+	def payloads(self, options):
+		self.stdout.write(f"Seeding {options['recipes']} recipes...")
+		user, _ = seed_users(1, options['recipes'])[0]
+		client = APIClient()
+		client.force_authenticate(user)
+		recipes_url = reverse('recipe:recipe-list')
+
+		requests = [
+			('recipe list', recipes_url, {}),
+			('recipe list 1000 expanded', recipes_url,
+			 {'page_size': 1000, 'expand': 'tags,ingredients'}),
+			('tag list', reverse('recipe:tag-list'), {'with_counts': 1}),
+			('recipe stats', reverse('recipe:recipe-stats'), {}),
+			('recipe export', reverse('recipe:recipe-export'), {}),
+		]
+
+		payloads = []
+		for name, path, params in requests:
+			res = client.get(path, params)
+			if res.status_code != 200:
+				raise CommandError(f'{name}: HTTP {res.status_code}')
+			content = b''.join(res.streaming_content) if res.streaming \
+				else res.content
+			payloads.append((name, content))
+
+		return payloads
+
+	def report(self, name, content, codings, options):
+		speeds = options['mbps']
+		size = len(content)
+		header = f"{'coding':<10} {'bytes':>10} {'ratio':>6} {'p50 ms':>8}"
+		header += ''.join(f" {f'@{mbps:g}Mbps':>11}" for mbps in speeds)
+		self.stdout.write(f'\n{name} ({size} bytes)\n{header}')
+
+		rows = [('identity', size, 0.0)]
+		for coding, level in codings:
+			compressed = compression.compress(content, coding, level)
+			stats = measure(
+				lambda: compression.compress(content, coding, level),
+				repeat=options['repeat'],
+				warmup=options['warmup']
+			)
+			rows.append((f'{coding}-{level}', len(compressed), stats['p50']))
+
+		for label, length, cost in rows:
+			line = f'{label:<10} {length:>10} {size / length:>6.1f} {cost:>8.2f}'
+			for mbps in speeds:
+				# Compression plus time on the wire, ignoring latency
+				total = cost + length * 8 / (mbps * 1000)
+				line += f' {total:>9.1f}ms'
+			self.stdout.write(line)
@@ -0,0 +1,153 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.benchmark import percentile, rolled_back
+
+
+PASSWORD = 'password1234'
+
+PBKDF2 = 'django.contrib.auth.hashers.PBKDF2PasswordHasher'
+ARGON2 = 'core.hashers.TunedArgon2PasswordHasher'
+
+
+class Command(BaseCommand):
+	help = 'Login throughput of the token route for each password hashing ' \
+		   'policy, with token reuse and first-login hash upgrades'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--users', type=int, default=10)
+		parser.add_argument('--repeat', type=int, default=30)
+		parser.add_argument('--warmup', type=int, default=2)
+		parser.add_argument(
+			'--argon2-costs', default='',
+			help='Comma separated time:memory_kib:parallelism Argon2 costs to '
+				 'compare, e.g. 1:19456:1,2:65536:1 (default: the settings)'
+		)
+
+	def handle(self, *args, **options):
+		self.client = APIClient()
+		self.url = reverse('user:token')
+		self.rows = []
+		self.users = 0
+		testserver = override_settings(
+			ALLOWED_HOSTS=settings.ALLOWED_HOSTS + ['testserver']
+		)
+
+		with rolled_back(), testserver:
+			for name, hashers, hashing in self.policies(options):
+				with override_settings(PASSWORD_HASHERS=hashers,
+									   PASSWORD_HASHING=hashing):
+					self.run_policy(name, options)
+
+		self.report()
+
+	def policies(self, options):
+		policies = [('pbkdf2', [PBKDF2], settings.PASSWORD_HASHING)]
+
+		try:
+			import argon2  # noqa: F401
+		except ImportError:
+			self.stderr.write('argon2-cffi is not installed, skipping Argon2')
+			return policies
+
+		costs = [
+			part.split(':') for part in options['argon2_costs'].split(',')
+			if part
+		] or [(
+			settings.PASSWORD_HASHING['ARGON2_TIME_COST'],
+			settings.PASSWORD_HASHING['ARGON2_MEMORY_COST'],
+			settings.PASSWORD_HASHING['ARGON2_PARALLELISM'],
+		)]
+		for time_cost, memory_cost, parallelism in costs:
+			hashing = dict(
+				settings.PASSWORD_HASHING,
+				ARGON2_TIME_COST=int(time_cost),
+				ARGON2_MEMORY_COST=int(memory_cost),
+				ARGON2_PARALLELISM=int(parallelism)
+			)
+			policies.append((
+				f'argon2 t={time_cost} m={memory_cost} p={parallelism}',
+				[ARGON2, PBKDF2],
+				hashing
+			))
+
+		return policies
+
+	def create_users(self, count):
+		users = []
+		for _ in range(count):
+			self.users += 1
+			users.append(get_user_model().objects.create_user(
+				f'bench-login-{self.users}@bench.local', PASSWORD
+			))
+
+		return users
+
+	def run_policy(self, name, options):
+		users = self.create_users(options['users'])
+		tokens = [Token.objects.get_or_create(user=user)[0] for user in users]
+
+		def password(i):
+			return {'email': users[i % len(users)].email, 'password': PASSWORD}, {}
+
+		def reuse(i):
+			token = tokens[i % len(tokens)]
+			return (
+				{'email': token.user.email, 'password': PASSWORD},
+				{'HTTP_AUTHORIZATION': f'Token {token.key}'}
+			)
+
+		self.measure(f'{name}: password', password, options)
+		self.measure(f'{name}: token reuse', reuse, options)
+
+		if PBKDF2 not in settings.PASSWORD_HASHERS[1:]:
+			return
+
+		# Hashes from the old policy are rehashed on their first login
+		with override_settings(PASSWORD_HASHERS=[PBKDF2]):
+			stale = self.create_users(options['repeat'] + options['warmup'])
+		self.measure(
+			f'{name}: upgrade from pbkdf2',
+			lambda i: ({'email': stale[i].email, 'password': PASSWORD}, {}),
+			options
+		)
+
+	def measure(self, name, prepare, options):
+		samples = []
+		for i in range(options['warmup'] + options['repeat']):
+			data, headers = prepare(i)
+			start = time.perf_counter()
+			res = self.client.post(self.url, data, **headers)
+			elapsed = (time.perf_counter() - start) * 1000
+
+			if res.status_code != 200:
+				raise CommandError(f'{name}: HTTP {res.status_code} {res.content}')
+			if i >= options['warmup']:
+				samples.append(elapsed)
+
+		self.rows.append((
+			name,
+			percentile(samples, 50),
+			percentile(samples, 99),
+			1000 / statistics.mean(samples),
+		))
+
+	def report(self):
+		self.stdout.write(
+			f"\n{'case':<40} {'p50 ms':>8} {'p99 ms':>8} {'logins/s':>9}"
+		)
+		for name, p50, p99, rate in self.rows:
+			self.stdout.write(f'{name:<40} {p50:>8.2f} {p99:>8.2f} {rate:>9.1f}')
+
+		self.stdout.write(self.style.SUCCESS(
+			'Done (one process, one core; multiply by workers for capacity)'
+		))
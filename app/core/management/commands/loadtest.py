@@ -0,0 +1,131 @@
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import percentile
+
+
+class Worker(threading.Thread):
+	"""Sends requests over one keep-alive connection until the deadline"""
+
+	def __init__(self, url, paths, headers, deadline):
+		super().__init__(daemon=True)
+		self.url = url
+		self.paths = paths
+		self.headers = headers
+		self.deadline = deadline
+		self.samples = []
+		self.errors = 0
+
+	def connect(self):
+		connection_class = http.client.HTTPSConnection \
+			if self.url.scheme == 'https' else http.client.HTTPConnection
+
+		return connection_class(self.url.netloc, timeout=30)
+
+	def run(self):
+		connection = self.connect()
+		sent = 0
+		while time.monotonic() < self.deadline:
+			path = self.paths[sent % len(self.paths)]
+			sent += 1
+			start = time.perf_counter()
+			try:
+				connection.request('GET', path, headers=self.headers)
+				response = connection.getresponse()
+				response.read()
+			except (OSError, http.client.HTTPException):
+				self.errors += 1
+				connection.close()
+				connection = self.connect()
+				continue
+
+			if response.status >= 400:
+				self.errors += 1
+			else:
+				self.samples.append((time.perf_counter() - start) * 1000)
+
+		connection.close()
+
+
+class Command(BaseCommand):
+	help = 'Measure throughput of one or more running servers, e.g. ' \
+		   'runserver against gunicorn: loadtest dev=http://localhost:8000 ' \
+		   'prod=http://localhost:8001 --token <token>'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'targets', nargs='+',
+			help='Base URLs to compare, optionally named as name=url'
+		)
+		parser.add_argument(
+			'--path', action='append', dest='paths',
+			help='Path to request, repeat for a mix (default: recipe list)'
+		)
+		parser.add_argument('--token', help='API token sent with each request')
+		parser.add_argument('--concurrency', type=int, default=16)
+		parser.add_argument(
+			'--duration', type=float, default=10,
+			help='Seconds to load each target for'
+		)
+
+	def handle(self, *args, **options):
+		paths = options['paths'] or ['/api/recipe/recipes/']
+		headers = {'Accept': 'application/json'}
+		if options['token']:
+			headers['Authorization'] = f"Token {options['token']}"
+
+		results = []
+		for target in options['targets']:
+			name, _, url = target.rpartition('=')
+			url = urlsplit(url)
+			if url.scheme not in ('http', 'https'):
+				raise CommandError(f'Not an http(s) URL: {target}')
+
+			self.stdout.write(f'Loading {name or url.netloc} for '
+							  f"{options['duration']:.0f}s...")
+			results.append((name or url.netloc, self.run_target(
+				url, paths, headers, options
+			)))
+
+		self.report(results)
+
+	def run_target(self, url, paths, headers, options):
+		prefix = url.path.rstrip('/')
+		deadline = time.monotonic() + options['duration']
+		workers = [
+			Worker(url, [prefix + path for path in paths], headers, deadline)
+			for _ in range(options['concurrency'])
+		]
+
+		start = time.monotonic()
+		for worker in workers:
+			worker.start()
+		for worker in workers:
+			worker.join()
+		elapsed = time.monotonic() - start
+
+		samples = [sample for worker in workers for sample in worker.samples]
+
+		return {
+			'requests': len(samples),
+			'errors': sum(worker.errors for worker in workers),
+			'rps': len(samples) / elapsed,
+			'p50': percentile(samples, 50) if samples else 0,
+			'p99': percentile(samples, 99) if samples else 0,
+		}
+
+	def report(self, results):
+		self.stdout.write(
+			'\ntarget           requests  errors      rps   p50 ms   p99 ms  vs first'
+		)
+		base = results[0][1]['rps'] or 1
+		for name, row in results:
+			self.stdout.write(
+				f"{name:<16} {row['requests']:>8} {row['errors']:>7} "
+				f"{row['rps']:>8.1f} {row['p50']:>8.2f} {row['p99']:>8.2f} "
+				f"{row['rps'] / base:>8.2f}x"
+			)
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.cache import bump_user_data_version
+from core.models import Ingredient, Recipe, Tag
+from core.names import find_duplicates, merge_duplicates
+from core.search import chunks, reindex_recipes
+
+
+class Command(BaseCommand):
+	help = 'Merge tags and ingredients whose names differ only in case'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--dry-run', action='store_true',
+			help='Report the duplicates without changing anything'
+		)
+
+	def handle(self, *args, **options):
+		for model, relation in ((Tag, Recipe.tags), (Ingredient, Recipe.ingredients)):
+			duplicates = find_duplicates(model)
+			label = model._meta.verbose_name_plural
+
+			if options['dry_run'] or not duplicates:
+				self.stdout.write(f'{len(duplicates)} duplicate {label}')
+				continue
+
+			users = set()
+			for batch in chunks(list(set(duplicates.values()))):
+				users.update(
+					model.objects.filter(id__in=batch)
+								 .values_list('user_id', flat=True)
+				)
+			with transaction.atomic():
+				recipe_ids = merge_duplicates(
+					model,
+					relation.through,
+					relation.field.m2m_reverse_name(),
+					duplicates
+				)
+				reindex_recipes(recipe_ids)
+				for user_id in users:
+					bump_user_data_version(user_id)
+
+			self.stdout.write(self.style.SUCCESS(
+				f'Merged {len(duplicates)} duplicate {label} '
+				f'across {len(recipe_ids)} recipes'
+			))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from core.search import chunks, reindex_recipes
+
+
+class Command(BaseCommand):
+	help = 'Rebuild the recipe search index, e.g. after migrating existing data'
+
+	def handle(self, *args, **options):
+		ids = list(Recipe.objects.order_by('id').values_list('id', flat=True))
+		start = time.perf_counter()
+		done = 0
+
+		for batch in chunks(ids):
+			reindex_recipes(batch)
+			done += len(batch)
+
+		self.stdout.write(self.style.SUCCESS(
+			f'Indexed {done} recipes in {time.perf_counter() - start:.1f}s'
+		))
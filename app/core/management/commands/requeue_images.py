@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.images import get_queue, process_recipe_image
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+	help = 'Queue variant generation for recipes whose image has none yet, ' \
+		   'e.g. after a worker was killed with jobs still queued'
+
+	def handle(self, *args, **options):
+		ids = Recipe.objects.exclude(image__isnull=True) \
+							.exclude(image='') \
+							.filter(image_variants='') \
+							.order_by('id') \
+							.values_list('id', flat=True)
+		queue = get_queue()
+		queued = 0
+
+		for recipe_id in ids.iterator():
+			queue.enqueue(process_recipe_image, recipe_id)
+			queued += 1
+
+		# The queue finishes its jobs before the command exits.
+		self.stdout.write(self.style.SUCCESS(f'Queued {queued} recipes'))
@@ -1,20 +1,101 @@
+import random
 import time
 
-from django.db import connections
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
+	"""Block until the database accepts connections, then check it is usable
+
+	Connection attempts back off exponentially with full jitter, so a fleet
+	of containers starting together does not hammer a booting database, and
+	the whole wait is bounded by `--timeout`. Each stage is timed so slow
+	cold starts show where the time goes.
+	"""
+	help = 'Wait for the database, optionally check migrations, and warm up'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+		parser.add_argument(
+			'--timeout', type=float, default=60,
+			help='Give up after this many seconds in total'
+		)
+		parser.add_argument(
+			'--initial-delay', type=float, default=0.1,
+			help='Longest sleep after the first failed attempt, in seconds'
+		)
+		parser.add_argument(
+			'--max-delay', type=float, default=5,
+			help='Cap on the sleep between attempts, in seconds'
+		)
+		parser.add_argument(
+			'--check-migrations', action='store_true',
+			help='Fail if there are unapplied migrations'
+		)
 
 	def handle(self, *args, **options):
-		self.stdout.write("Waiting for database...")
-		db_conn = None
-		while not db_conn:
+		connection = connections[options['database']]
+		self.stdout.write('Waiting for database...')
+		start = time.monotonic()
+		deadline = start + options['timeout']
+		timings = []
+
+		attempts = self.connect(connection, deadline, options)
+		timings.append((f'connect ({attempts} attempts)', time.monotonic() - start))
+
+		if options['check_migrations']:
+			stage = time.monotonic()
+			self.check_migrations(connection)
+			timings.append(('migrations', time.monotonic() - stage))
+
+		stage = time.monotonic()
+		self.warm_up(connection)
+		timings.append(('warm up', time.monotonic() - stage))
+
+		for name, seconds in timings:
+			self.stdout.write(f'  {name}: {seconds * 1000:.0f} ms')
+		self.stdout.write(self.style.SUCCESS(
+			f'Database available! ({(time.monotonic() - start) * 1000:.0f} ms)'
+		))
+
+	def connect(self, connection, deadline, options):
+		"""Open a real connection, retrying until `deadline`"""
+		attempt = 0
+		while True:
+			attempt += 1
 			try:
-				db_conn = connections['default']
-			except OperationalError:
-				self.stdout.write("Database unavailable, waiting 1 second")
-				time.sleep(1)
-				
-		self.stdout.write(self.style.SUCCESS('Database available!'))				
\ No newline at end of file
+				connection.ensure_connection()
+				return attempt
+			except OperationalError as error:
+				remaining = deadline - time.monotonic()
+				if remaining <= 0:
+					raise CommandError(
+						f'Database unavailable after {attempt} attempts: {error}'
+					)
+
+				delay = min(
+					options['max_delay'],
+					options['initial_delay'] * 2 ** (attempt - 1)
+				)
+				delay = min(random.uniform(0, delay), remaining)
+				self.stdout.write(
+					f'Database unavailable, retrying in {delay:.2f} seconds'
+				)
+				time.sleep(delay)
+
+	def check_migrations(self, connection):
+		executor = MigrationExecutor(connection)
+		plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+		if plan:
+			raise CommandError(
+				f'{len(plan)} unapplied migrations, run `manage.py migrate`'
+			)
+
+	def warm_up(self, connection):
+		"""Run a first query so the round trip and session setup are paid here"""
+		with connection.cursor() as cursor:
+			cursor.execute('SELECT 1')
+			cursor.fetchone()
@@ -0,0 +1,197 @@
+"""Serving MEDIA_ROOT files: recipe images and their variants
+
+Every request is answered from a stat() of the file. With MEDIA_SERVING
+MODE 'python' the worker streams the body itself, through the server's
+wsgi.file_wrapper (os.sendfile under gunicorn) when there is one. With
+'x-accel' (nginx) or 'x-sendfile' (Apache, lighttpd) it only returns a
+header naming the file and the front server sends it, ranges included.
+Conditional GETs (ETag, Last-Modified) are answered before any of that.
+
+Uploads are named by UUID (core.models.recipe_image_file_path) and never
+rewritten in place, so those files are cacheable for a year as immutable.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, \
+								   SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+
+MODES = ('python', 'x-accel', 'x-sendfile')
+
+UUID_NAME = re.compile(
+	r'(^|/)[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}[_.][^/]*$'
+)
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+DEFAULTS = {
+	'MODE': 'python',
+	'ACCEL_PREFIX': '/protected-media/',
+	'IMMUTABLE_MAX_AGE': 365 * 24 * 60 * 60,
+	'MAX_AGE': 0,
+}
+
+
+def media_settings():
+	options = dict(DEFAULTS, **getattr(settings, 'MEDIA_SERVING', {}))
+	if options['MODE'] not in MODES:
+		raise ImproperlyConfigured(
+			f'MEDIA_SERVING MODE must be one of {", ".join(MODES)}'
+		)
+
+	return options
+
+
+def media_file(path):
+	"""(absolute path, os.stat_result) of a MEDIA_ROOT file, else Http404"""
+	try:
+		full_path = safe_join(settings.MEDIA_ROOT, path)
+		stat = os.stat(full_path)
+	except (SuspiciousFileOperation, OSError, ValueError):
+		raise Http404('No such file')
+
+	if not os.path.isfile(full_path):
+		raise Http404('No such file')
+
+	return full_path, stat
+
+
+def file_etag(stat):
+	return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def byte_range(request, size, etag, last_modified):
+	"""(start, end inclusive) of a satisfiable single range, else None
+
+	Returns False for an unsatisfiable range. Multiple ranges and ranges
+	made stale by If-Range are ignored, so the whole file is sent.
+	"""
+	header = request.META.get('HTTP_RANGE', '')
+	match = RANGE.match(header.replace(' ', ''))
+	if not match or match.groups() == ('', ''):
+		return None
+
+	if_range = request.META.get('HTTP_IF_RANGE')
+	if if_range and if_range != etag and \
+			parse_http_date_safe(if_range) != last_modified:
+		return None
+
+	first, last = match.groups()
+	if not first:
+		# A suffix range: the last `last` bytes
+		start, end = max(size - int(last), 0), size - 1
+	else:
+		start = int(first)
+		end = min(int(last), size - 1) if last else size - 1
+
+	if start >= size or start > end:
+		return False
+
+	return start, end
+
+
+class FileRange:
+	"""`length` bytes of `fp` from `start`, readable like a file
+
+	It keeps fileno() so gunicorn can still sendfile() it, starting from
+	the current offset and stopping at Content-Length.
+	"""
+
+	def __init__(self, fp, start, length):
+		fp.seek(start)
+		self.fp = fp
+		self.remaining = length
+
+	def read(self, size=-1):
+		if size < 0 or size > self.remaining:
+			size = self.remaining
+		data = self.fp.read(size)
+		self.remaining -= len(data)
+
+		return data
+
+	def fileno(self):
+		return self.fp.fileno()
+
+	def close(self):
+		self.fp.close()
+
+
+def cache_headers(response, path, etag, last_modified, options):
+	response['ETag'] = etag
+	response['Last-Modified'] = http_date(last_modified)
+	response['Accept-Ranges'] = 'bytes'
+	if UUID_NAME.search(path):
+		response['Cache-Control'] = \
+			f'public, max-age={options["IMMUTABLE_MAX_AGE"]}, immutable'
+	else:
+		response['Cache-Control'] = f'public, max-age={options["MAX_AGE"]}'
+
+	return response
+
+
+def offload(path, full_path, options):
+	"""An empty response telling the front server which file to send"""
+	response = HttpResponse()
+	if options['MODE'] == 'x-accel':
+		response['X-Accel-Redirect'] = options['ACCEL_PREFIX'] + quote(path)
+	else:
+		response['X-Sendfile'] = full_path
+	# The front server fills these in from the file it sends.
+	del response['Content-Type']
+
+	return response
+
+
+def serve_media(request, path):
+	options = media_settings()
+	full_path, stat = media_file(path)
+	etag = file_etag(stat)
+	last_modified = int(stat.st_mtime)
+
+	response = get_conditional_response(
+		request, etag=etag, last_modified=last_modified
+	)
+	if response is not None:
+		return cache_headers(response, path, etag, last_modified, options)
+
+	if options['MODE'] != 'python':
+		response = offload(path, full_path, options)
+		return cache_headers(response, path, etag, last_modified, options)
+
+	# Like FileResponse, no Content-Encoding, so .gz files stay compressed
+	content_type = mimetypes.guess_type(full_path)[0] or \
+		'application/octet-stream'
+	size = stat.st_size
+
+	span = byte_range(request, size, etag, last_modified)
+	if span is False:
+		response = HttpResponse(status=416)
+		response['Content-Range'] = f'bytes */{size}'
+		return cache_headers(response, path, etag, last_modified, options)
+
+	fp = open(full_path, 'rb')
+	if span is None:
+		response = FileResponse(fp, content_type=content_type)
+	else:
+		start, end = span
+		response = FileResponse(
+			FileRange(fp, start, end - start + 1),
+			status=206,
+			content_type=content_type
+		)
+		response['Content-Range'] = f'bytes {start}-{end}/{size}'
+		size = end - start + 1
+
+	response['Content-Length'] = size
+
+	return cache_headers(response, path, etag, last_modified, options)
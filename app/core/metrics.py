@@ -0,0 +1,224 @@
+"""Per-route request metrics kept in process memory
+
+InstrumentationMiddleware (core.middleware) records one RequestStats per
+request and adds it to `registry` under the resolved route name. The
+registry renders in the Prometheus text format at /metrics. Each worker
+process keeps its own counters, so scrape every worker (or sum over the
+`pid` label) when running several.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+# Upper bounds in seconds of the request duration histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+DEFAULTS = {
+	'ENABLED': True,
+	'SERVER_TIMING': True,
+	'METRICS_TOKEN': None,
+	'PROFILE_SAMPLE_RATE': 0,
+	'PROFILE_SLOW_MS': 500,
+	'PROFILE_DIR': None,
+}
+
+
+def instrumentation_settings():
+	return dict(DEFAULTS, **getattr(settings, 'INSTRUMENTATION', {}))
+
+
+class RequestStats:
+	"""Timings of the request being handled on this thread"""
+
+	__slots__ = ('queries', 'db_time', 'stages', 'depth')
+
+	def __init__(self):
+		self.queries = 0
+		self.db_time = 0.0
+		self.stages = defaultdict(float)
+		self.depth = 0
+
+	def __call__(self, execute, sql, params, many, context):
+		"""Database execute wrapper counting queries and their time"""
+		start = time.perf_counter()
+		try:
+			return execute(sql, params, many, context)
+		finally:
+			self.db_time += time.perf_counter() - start
+			self.queries += 1
+
+
+_local = threading.local()
+
+
+def current_stats():
+	return getattr(_local, 'stats', None)
+
+
+@contextmanager
+def recording(stats):
+	_local.stats = stats
+	try:
+		yield stats
+	finally:
+		_local.stats = None
+
+
+@contextmanager
+def timed(stage):
+	"""Add the time spent in the block to `stage` of the current request
+
+	Nested blocks only count once, at the outermost level.
+	"""
+	stats = current_stats()
+	if stats is None or stats.depth:
+		yield
+		return
+
+	stats.depth += 1
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		stats.stages[stage] += time.perf_counter() - start
+		stats.depth -= 1
+
+
+class TimedSerializerMixin:
+	"""Counts time spent turning instances into data as `serializer`"""
+
+	def to_representation(self, instance):
+		with timed('serializer'):
+			return super().to_representation(instance)
+
+
+class RouteMetrics:
+
+	__slots__ = ('count', 'duration', 'buckets', 'queries', 'db_time', 'stages')
+
+	def __init__(self):
+		self.count = 0
+		self.duration = 0.0
+		self.buckets = [0] * len(BUCKETS)
+		self.queries = 0
+		self.db_time = 0.0
+		self.stages = defaultdict(float)
+
+
+class Registry:
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._routes = defaultdict(RouteMetrics)
+		self._statuses = defaultdict(int)
+
+	def record(self, route, method, status, duration, stats):
+		bucket = bisect_left(BUCKETS, duration)
+		with self._lock:
+			metrics = self._routes[route]
+			metrics.count += 1
+			metrics.duration += duration
+			if bucket < len(BUCKETS):
+				metrics.buckets[bucket] += 1
+			metrics.queries += stats.queries
+			metrics.db_time += stats.db_time
+			for stage, seconds in stats.stages.items():
+				metrics.stages[stage] += seconds
+			self._statuses[(route, method, status)] += 1
+
+	def reset(self):
+		with self._lock:
+			self._routes.clear()
+			self._statuses.clear()
+
+	def snapshot(self):
+		with self._lock:
+			routes = {}
+			for route, metrics in self._routes.items():
+				copy = RouteMetrics()
+				copy.count = metrics.count
+				copy.duration = metrics.duration
+				copy.buckets = list(metrics.buckets)
+				copy.queries = metrics.queries
+				copy.db_time = metrics.db_time
+				copy.stages = dict(metrics.stages)
+				routes[route] = copy
+
+			return routes, dict(self._statuses)
+
+
+registry = Registry()
+
+
+def escape(value):
+	return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+					 .replace('\n', '\\n')
+
+
+def labels(**values):
+	pairs = ','.join(f'{key}="{escape(value)}"' for key, value in values.items())
+
+	return '{' + pairs + '}'
+
+
+def render_prometheus(extra=None):
+	"""The registry, plus `extra` {name: value} gauges, as exposition text"""
+	routes, statuses = registry.snapshot()
+	pid = os.getpid()
+	lines = []
+
+	lines.append('# TYPE http_requests_total counter')
+	for (route, method, status), count in sorted(statuses.items()):
+		lines.append('http_requests_total' + labels(
+			route=route, method=method, status=status, pid=pid
+		) + f' {count}')
+
+	lines.append('# TYPE http_request_duration_seconds histogram')
+	for route, metrics in sorted(routes.items()):
+		cumulative = 0
+		for bound, count in zip(BUCKETS, metrics.buckets):
+			cumulative += count
+			lines.append('http_request_duration_seconds_bucket' + labels(
+				route=route, le=bound, pid=pid
+			) + f' {cumulative}')
+		lines.append('http_request_duration_seconds_bucket' + labels(
+			route=route, le='+Inf', pid=pid
+		) + f' {metrics.count}')
+		lines.append('http_request_duration_seconds_sum' + labels(
+			route=route, pid=pid
+		) + f' {metrics.duration:.6f}')
+		lines.append('http_request_duration_seconds_count' + labels(
+			route=route, pid=pid
+		) + f' {metrics.count}')
+
+	lines.append('# TYPE http_request_db_queries_total counter')
+	for route, metrics in sorted(routes.items()):
+		lines.append('http_request_db_queries_total' + labels(
+			route=route, pid=pid
+		) + f' {metrics.queries}')
+
+	lines.append('# TYPE http_request_db_seconds_total counter')
+	for route, metrics in sorted(routes.items()):
+		lines.append('http_request_db_seconds_total' + labels(
+			route=route, pid=pid
+		) + f' {metrics.db_time:.6f}')
+
+	lines.append('# TYPE http_request_stage_seconds_total counter')
+	for route, metrics in sorted(routes.items()):
+		for stage, seconds in sorted(metrics.stages.items()):
+			lines.append('http_request_stage_seconds_total' + labels(
+				route=route, stage=stage, pid=pid
+			) + f' {seconds:.6f}')
+
+	for name, value in sorted((extra or {}).items()):
+		lines.append(f'# TYPE {name} gauge')
+		lines.append(f'{name}{labels(pid=pid)} {value}')
+
+	return '\n'.join(lines) + '\n'
@@ -0,0 +1,226 @@
+import cProfile
+import logging
+import os
+import random
+import tempfile
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+
+from core.admission import admission
+from core.cache import encoded_content
+from core.compression import compress, compress_stream, \
+							 compression_settings, negotiate, route_level
+from core.metrics import RequestStats, instrumentation_settings, recording, \
+						 registry, timed
+
+
+logger = logging.getLogger(__name__)
+
+
+def route_name(request):
+	match = getattr(request, 'resolver_match', None)
+
+	return match.view_name if match else 'unmatched'
+
+
+class InstrumentationMiddleware:
+	"""Time every request and record it under its route
+
+	Records wall time, the number and duration of database queries (via an
+	execute wrapper, so DEBUG is not needed) and named stages such as
+	`serializer` (core.metrics.timed), then adds them to the per-route
+	registry and to a `Server-Timing` header. With PROFILE_SAMPLE_RATE set,
+	that fraction of requests runs under cProfile and the ones slower than
+	PROFILE_SLOW_MS get their stats dumped, named in `X-Profile`. It must
+	come first in MIDDLEWARE so the times include the other middleware.
+	"""
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		self.options = instrumentation_settings()
+
+	def __call__(self, request):
+		if not self.options['ENABLED']:
+			return self.get_response(request)
+
+		profiler = None
+		if random.random() < self.options['PROFILE_SAMPLE_RATE']:
+			profiler = cProfile.Profile()
+
+		start = time.perf_counter()
+		with recording(RequestStats()) as stats, ExitStack() as stack:
+			for connection in connections.all():
+				stack.enter_context(connection.execute_wrapper(stats))
+			if profiler:
+				profiler.enable()
+			try:
+				response = self.get_response(request)
+			finally:
+				if profiler:
+					profiler.disable()
+		duration = time.perf_counter() - start
+
+		route = route_name(request)
+		registry.record(route, request.method, response.status_code,
+						duration, stats)
+
+		if self.options['SERVER_TIMING']:
+			response['Server-Timing'] = self.server_timing(duration, stats)
+
+		if profiler and duration * 1000 >= self.options['PROFILE_SLOW_MS']:
+			response['X-Profile'] = self.dump_profile(profiler, route)
+
+		return response
+
+	def server_timing(self, duration, stats):
+		metrics = [
+			f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"'
+		]
+		metrics.extend(
+			f'{stage};dur={seconds * 1000:.1f}'
+			for stage, seconds in sorted(stats.stages.items())
+		)
+		metrics.append(f'total;dur={duration * 1000:.1f}')
+
+		return ', '.join(metrics)
+
+	def dump_profile(self, profiler, route):
+		directory = self.options['PROFILE_DIR'] or tempfile.gettempdir()
+		name = f'{route.replace(":", "-")}-{int(time.time() * 1000)}.prof'
+		path = os.path.join(directory, name)
+		profiler.dump_stats(path)
+		logger.info('Profiled slow request to %s: %s', route, path)
+
+		return name
+
+
+class CompressionMiddleware:
+	"""Compress API responses with the best coding the client accepts
+
+	See core.compression. Only 200 responses of the COMPRESSION content
+	types without a Content-Encoding are touched; media files, ranges and
+	`Cache-Control: no-transform` are left alone. Like Django's
+	GZipMiddleware it weakens strong ETags. It belongs right after
+	InstrumentationMiddleware, whose `compress` stage then shows the cost.
+	"""
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		self.options = compression_settings()
+
+	def __call__(self, request):
+		response = self.get_response(request)
+		if not self.options['ENABLED'] or not self.compressible(response):
+			return response
+		if not response.streaming and \
+				len(response.content) < self.options['MIN_SIZE']:
+			return response
+
+		patch_vary_headers(response, ('Accept-Encoding',))
+		coding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+		level = route_level(route_name(request), coding, self.options)
+		if coding is None or level is None:
+			return response
+
+		if response.streaming:
+			response.streaming_content = compress_stream(
+				response.streaming_content, coding, level
+			)
+			del response['Content-Length']
+		else:
+			with timed('compress'):
+				content = self.compress(response, coding, level)
+			if len(content) >= len(response.content):
+				return response
+			response.content = content
+			response['Content-Length'] = str(len(content))
+
+		etag = response.get('ETag')
+		if etag and etag.startswith('"'):
+			response['ETag'] = 'W/' + etag
+		response['Content-Encoding'] = coding
+
+		return response
+
+	def compressible(self, response):
+		content_type = response.get('Content-Type', '').split(';')[0].strip()
+
+		return response.status_code == 200 and \
+			not response.has_header('Content-Encoding') and \
+			not response.has_header('Content-Range') and \
+			'no-transform' not in response.get('Cache-Control', '') and \
+			content_type.startswith(tuple(self.options['CONTENT_TYPES']))
+
+	def compress(self, response, coding, level):
+		key = getattr(response, 'response_cache_key', None)
+		if key is None:
+			return compress(response.content, coding, level)
+
+		return encoded_content(
+			key, f'{coding}:{level}',
+			lambda: compress(response.content, coding, level)
+		)
+
+
+class AdmissionSlot:
+	"""An admitted request's slot, given back once with its latency"""
+
+	def __init__(self, limit, start):
+		self.limit = limit
+		self.start = start
+
+	def close(self):
+		if self.limit is not None:
+			self.limit.release(time.perf_counter() - self.start)
+			self.limit = None
+
+
+class AdmissionMiddleware:
+	"""Shed API requests over their route class's limit, see core.admission
+
+	The slot is taken in process_view, once the route is resolved, and given
+	back when the response comes out; a streamed response (the export) holds
+	it until the server closes the response after the last chunk. It goes
+	after InstrumentationMiddleware so shed requests are still recorded.
+	"""
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+
+	def __call__(self, request):
+		response = None
+		try:
+			response = self.get_response(request)
+			return response
+		finally:
+			admitted = getattr(request, 'admission', None)
+			if admitted is not None:
+				slot = AdmissionSlot(*admitted)
+				if response is not None and response.streaming:
+					response._closable_objects.append(slot)
+				else:
+					slot.close()
+
+	def process_view(self, request, view_func, view_args, view_kwargs):
+		limit = admission.route_class(request)
+		if limit is None:
+			return None
+
+		if admission.too_late(request) or not limit.acquire():
+			return self.shed(limit)
+
+		request.admission = (limit, time.perf_counter())
+
+		return None
+
+	def shed(self, limit):
+		response = JsonResponse(
+			{'detail': 'The server is busy, please retry later.'}, status=503
+		)
+		response['Retry-After'] = str(limit.retry_after())
+
+		return response
@@ -0,0 +1,29 @@
+# Generated by Django 2.1.3 on 2026-10-18 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_auto_20200311_0327'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+        ),
+        # The auto-created through tables only index (recipe_id, tag_id);
+        # filtering by tag needs the reverse order to stay an index scan.
+        migrations.RunSQL(
+            ['CREATE INDEX recipe_tags_tag_recipe_idx '
+             'ON core_recipe_tags (tag_id, recipe_id)'],
+            reverse_sql=['DROP INDEX recipe_tags_tag_recipe_idx'],
+        ),
+        migrations.RunSQL(
+            ['CREATE INDEX recipe_ingredients_ingredient_recipe_idx '
+             'ON core_recipe_ingredients (ingredient_id, recipe_id)'],
+            reverse_sql=['DROP INDEX recipe_ingredients_ingredient_recipe_idx'],
+        ),
+    ]
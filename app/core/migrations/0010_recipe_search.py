@@ -0,0 +1,143 @@
+# Generated by Django 2.1.3 on 2026-10-18 02:34
+
+import re
+from collections import defaultdict
+
+from django.conf import settings
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Copied from core.search as of this migration, so later changes there do
+# not change what it does.
+WORD_RE = re.compile(r'\w+')
+TITLE_WEIGHT, TAG_WEIGHT, INGREDIENT_WEIGHT = 3, 2, 1
+BATCH_SIZE = 500
+
+
+def names_sql(table, through, column):
+    return (
+        f"COALESCE((SELECT string_agg(t.name, ' ') FROM {table} t "
+        f"JOIN {through} l ON l.{column} = t.id "
+        f"WHERE l.recipe_id = r.id), '')"
+    )
+
+
+def index_vectors(schema_editor):
+    schema_editor.execute(
+        'INSERT INTO core_recipesearchvector (recipe_id, vector) '
+        "SELECT r.id, "
+        "setweight(to_tsvector('english'::regconfig, r.title), 'A') || "
+        "setweight(to_tsvector('english'::regconfig, "
+        f"{names_sql('core_tag', 'core_recipe_tags', 'tag_id')}), 'B') || "
+        "setweight(to_tsvector('english'::regconfig, "
+        f"{names_sql('core_ingredient', 'core_recipe_ingredients', 'ingredient_id')}"
+        "), 'C') "
+        'FROM core_recipe r'
+    )
+
+
+def index_terms(apps):
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeSearchTerm = apps.get_model('core', 'RecipeSearchTerm')
+    last = 0
+    while True:
+        recipes = list(
+            Recipe.objects.filter(id__gt=last).order_by('id')
+                          .values_list('id', 'user_id', 'title')[:BATCH_SIZE]
+        )
+        if not recipes:
+            return
+        last = recipes[-1][0]
+        ids = [pk for pk, _, _ in recipes]
+        weights = defaultdict(dict)
+
+        def add(recipe_id, text, weight):
+            for term in WORD_RE.findall(text.lower()):
+                if weights[recipe_id].get(term, 0) < weight:
+                    weights[recipe_id][term] = weight
+
+        for pk, _, title in recipes:
+            add(pk, title, TITLE_WEIGHT)
+        for relation, name, weight in (('tags', 'tag', TAG_WEIGHT),
+                                       ('ingredients', 'ingredient',
+                                        INGREDIENT_WEIGHT)):
+            rows = getattr(Recipe, relation).through.objects \
+                .filter(recipe_id__in=ids) \
+                .values_list('recipe_id', f'{name}__name')
+            for recipe_id, label in rows:
+                add(recipe_id, label, weight)
+
+        RecipeSearchTerm.objects.bulk_create([
+            RecipeSearchTerm(
+                user_id=user_id, recipe_id=pk, term=term[:255], weight=weight
+            )
+            for pk, user_id, _ in recipes
+            for term, weight in weights[pk].items()
+        ], batch_size=BATCH_SIZE)
+
+
+def index_existing_recipes(apps, schema_editor):
+    # Without this, recipes created before the index stay unsearchable.
+    if schema_editor.connection.vendor == 'postgresql':
+        index_vectors(schema_editor)
+    else:
+        index_terms(apps)
+
+
+def create_vector_index(apps, schema_editor):
+    # GIN needs Postgres; elsewhere search runs on RecipeSearchTerm.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX recipe_search_vector_gin_idx '
+            'ON core_recipesearchvector USING gin (vector)'
+        )
+
+
+def drop_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS recipe_search_vector_gin_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=255)),
+                ('weight', models.PositiveSmallIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeSearchVector',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_vector', serialize=False, to='core.Recipe')),
+                ('vector', django.contrib.postgres.search.SearchVectorField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recipesearchterm',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='core.Recipe'),
+        ),
+        migrations.AddField(
+            model_name='recipesearchterm',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='recipesearchterm',
+            index=models.Index(fields=['user', 'term', 'recipe'], name='recipe_search_term_idx'),
+        ),
+        migrations.RunPython(create_vector_index, drop_vector_index),
+        migrations.RunPython(
+            index_existing_recipes, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+INDEXES = (
+    ('tag_user_lower_name_idx', 'core_tag'),
+    ('ingredient_user_lower_name_idx', 'core_ingredient'),
+)
+
+
+def create_prefix_indexes(apps, schema_editor):
+    # text_pattern_ops lets `lower(name) LIKE 'abc%'` use the index whatever
+    # the collation. Elsewhere the prefix match scans the user's rows.
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, table in INDEXES:
+            schema_editor.execute(
+                f'CREATE INDEX {name} '
+                f'ON {table} (user_id, lower(name) text_pattern_ops)'
+            )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, table in INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.1.3 on 2026-10-18 02:52
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_recipes(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    for name, relation in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        through = getattr(Recipe, relation).through
+        column = f'{name.lower()}_id'
+        links = through.objects.filter(**{column: OuterRef('pk')}) \
+                               .order_by().values(column) \
+                               .annotate(total=Count('*')).values('total')
+        apps.get_model('core', name).objects.update(recipe_count=Coalesce(
+            Subquery(links, output_field=IntegerField()), Value(0)
+        ))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_name_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_recipes, migrations.RunPython.noop),
+    ]
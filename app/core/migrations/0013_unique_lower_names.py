@@ -0,0 +1,120 @@
+from django.db import migrations
+from django.db.models import (Count, IntegerField, Min, OuterRef, Q, Subquery,
+                              Value)
+from django.db.models.functions import Coalesce, Lower
+
+
+# Copies of core.names.find_duplicates/merge_duplicates and
+# core.counts.count_links as of this migration, on historical models only.
+BATCH_SIZE = 250
+
+INDEXES = (
+    ('tag_user_lower_name_uniq', 'core_tag', 'Tag', 'tags'),
+    ('ingredient_user_lower_name_uniq', 'core_ingredient', 'Ingredient',
+     'ingredients'),
+)
+
+
+def chunks(ids, size=BATCH_SIZE):
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def find_duplicates(model):
+    """{duplicate id: id of the oldest row with the same user and name}"""
+    groups = list(
+        model.objects.annotate(lower_name=Lower('name'))
+                     .values('user_id', 'lower_name')
+                     .annotate(keep=Min('id'), rows=Count('id'))
+                     .filter(rows__gt=1)
+                     .order_by()
+                     .values_list('user_id', 'lower_name', 'keep')
+    )
+
+    duplicates = {}
+    for start in range(0, len(groups), 100):
+        batch = groups[start:start + 100]
+        keep = {(user_id, lower_name): pk for user_id, lower_name, pk in batch}
+        condition = Q()
+        for user_id, lower_name, _ in batch:
+            condition |= Q(user_id=user_id, lower_name=lower_name)
+
+        rows = model.objects.annotate(lower_name=Lower('name')) \
+                            .filter(condition) \
+                            .values_list('id', 'user_id', 'lower_name')
+        for pk, user_id, lower_name in rows:
+            target = keep[(user_id, lower_name)]
+            if pk != target:
+                duplicates[pk] = target
+
+    return duplicates
+
+
+def count_links(model, through, column, ids):
+    links = through.objects.filter(**{column: OuterRef('pk')}) \
+                           .order_by() \
+                           .values(column) \
+                           .annotate(total=Count('*')) \
+                           .values('total')
+    count = Coalesce(Subquery(links, output_field=IntegerField()), Value(0))
+
+    for batch in chunks(ids):
+        model.objects.filter(pk__in=batch).update(recipe_count=count)
+
+
+def merge_duplicates(model, through, column, duplicates):
+    """Move links of the `duplicates` rows to their keepers and delete them"""
+    for batch in chunks(duplicates):
+        keepers = {duplicates[pk] for pk in batch}
+        links = through.objects.filter(
+            **{f'{column}__in': list(keepers) + batch}
+        ).values_list('recipe_id', column)
+
+        current, wanted = set(), set()
+        for recipe_id, pk in links:
+            if pk in keepers:
+                current.add((recipe_id, pk))
+            else:
+                wanted.add((recipe_id, duplicates[pk]))
+
+        through.objects.bulk_create([
+            through(**{'recipe_id': recipe_id, column: pk})
+            for recipe_id, pk in sorted(wanted - current)
+        ])
+        through.objects.filter(**{f'{column}__in': batch}).delete()
+        model.objects.filter(id__in=batch).delete()
+        count_links(model, through, column, keepers)
+
+
+def create_unique_indexes(apps, schema_editor):
+    # Postgres and SQLite both index expressions; existing duplicates are
+    # merged first or the index could not be built.
+    Recipe = apps.get_model('core', 'Recipe')
+    for index, table, model_name, relation in INDEXES:
+        model = apps.get_model('core', model_name)
+        merge_duplicates(
+            model,
+            getattr(Recipe, relation).through,
+            f'{model_name.lower()}_id',
+            find_duplicates(model)
+        )
+        schema_editor.execute(
+            f'CREATE UNIQUE INDEX {index} ON {table} (user_id, lower(name))'
+        )
+
+
+def drop_unique_indexes(apps, schema_editor):
+    for index, _, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_unique_indexes, drop_unique_indexes),
+    ]
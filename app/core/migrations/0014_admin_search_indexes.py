@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+INDEXES = (
+    ('user_lower_email_idx', 'core_user', 'email'),
+    ('tag_lower_name_idx', 'core_tag', 'name'),
+    ('ingredient_lower_name_idx', 'core_ingredient', 'name'),
+    ('recipe_lower_title_idx', 'core_recipe', 'title'),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    # The admin searches across all users by prefix, which the per-user
+    # indexes from 0011 cannot serve.
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, table, column in INDEXES:
+            schema_editor.execute(
+                f'CREATE INDEX {name} '
+                f'ON {table} (lower({column}) text_pattern_ops)'
+            )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, table, column in INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_unique_lower_names'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,6 +1,8 @@
 import uuid
 import os
+import json
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 
 from django.conf import settings
@@ -53,6 +55,16 @@ class Tag(models.Model):
 					settings.AUTH_USER_MODEL, 
 					on_delete=models.CASCADE
 			)
+	# Recipes linked to the tag, kept up to date by core.counts
+	recipe_count = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		indexes = [
+			models.Index(
+				fields=['user', '-name', 'id'],
+				name='tag_user_name_id_idx'
+			),
+		]
 
 	def __str__(self):
 		return self.name
@@ -64,6 +76,16 @@ class Ingredient(models.Model):
 				settings.AUTH_USER_MODEL,
 				on_delete=models.CASCADE
 		)
+	# Recipes using the ingredient, kept up to date by core.counts
+	recipe_count = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		indexes = [
+			models.Index(
+				fields=['user', '-name', 'id'],
+				name='ingredient_user_name_id_idx'
+			),
+		]
 
 	def __str__(self):
 		return self.name
@@ -80,8 +102,65 @@ class Recipe(models.Model):
 	ingredients = models.ManyToManyField('Ingredient')
 	tags = models.ManyToManyField('Tag')
 	image = models.ImageField(null=True, upload_to=recipe_image_file_path)
-	
+	image_variants = models.TextField(blank=True, default='')
+
+	# Title as loaded, so saves that leave it alone skip the search reindex
+	_loaded_title = None
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+		]
 
 	def __str__(self):
 		return self.title
 
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		instance._loaded_title = instance.__dict__.get('title')
+
+		return instance
+
+	@property
+	def variants(self):
+		"""Resized copies of `image` as {variant name: storage path}"""
+		return json.loads(self.image_variants) if self.image_variants else {}
+
+
+
+class RecipeSearchVector(models.Model):
+	"""Weighted tsvector of a recipe's title, tag and ingredient names
+
+	Only written on Postgres, where it carries a GIN index (see core.search).
+	"""
+	recipe = models.OneToOneField(
+				Recipe,
+				primary_key=True,
+				on_delete=models.CASCADE,
+				related_name='search_vector'
+		)
+	vector = SearchVectorField()
+
+
+class RecipeSearchTerm(models.Model):
+	"""Inverted index entry used for search on databases without tsvector"""
+	user = models.ForeignKey(
+				settings.AUTH_USER_MODEL,
+				on_delete=models.CASCADE
+		)
+	recipe = models.ForeignKey(
+				Recipe,
+				on_delete=models.CASCADE,
+				related_name='search_terms'
+		)
+	term = models.CharField(max_length=255)
+	weight = models.PositiveSmallIntegerField()
+
+	class Meta:
+		indexes = [
+			models.Index(
+				fields=['user', 'term', 'recipe'],
+				name='recipe_search_term_idx'
+			),
+		]
@@ -0,0 +1,207 @@
+"""Case-insensitive unique tag and ingredient names
+
+Migration 0013 adds a unique index on (user_id, lower(name)) to both
+tables. Creates go through `upsert_names`, an INSERT ... ON CONFLICT DO
+NOTHING followed by a read back, so concurrent requests for the same name
+end up with the same row instead of an IntegrityError. `merge_duplicates`
+folds rows that predate the index into the oldest one.
+"""
+import sqlite3
+
+from django.db import connection
+from django.db.models import Count, Min, Q
+from django.db.models.functions import Lower
+
+from core.cache import bump_user_data_version
+from core.counts import count_links
+from core.search import chunks
+
+
+# Names per statement; each costs two parameters, within SQLite's 999
+BATCH_SIZE = 250
+
+
+def name_keys(names):
+	"""{name: lower(name)}, with the case folded by the database
+
+	The unique index is on SQL lower(name), which does not always agree with
+	str.lower(): SQLite folds ASCII letters only, and Postgres differs on
+	letters such as 'İ' or 'ẞ'. Rows are therefore matched by these keys,
+	never by keys derived in Python. One query per batch.
+	"""
+	names = list(dict.fromkeys(names))
+	keys = {}
+	for batch in chunks(names, BATCH_SIZE):
+		with connection.cursor() as cursor:
+			cursor.execute(
+				'SELECT ' + ', '.join(['lower(CAST(%s AS text))'] * len(batch)),
+				batch
+			)
+			keys.update(zip(batch, cursor.fetchone()))
+
+	return keys
+
+
+def upsert_names(model, user, names, keys=None):
+	"""Get or create `user`'s `model` rows called `names`, ignoring case
+
+	Returns ({name: obj} for every name, ids of the rows this call created).
+	`keys` are the name_keys() of `names` when the caller already has them.
+	Where the database can return the inserted rows, new names cost one
+	query per batch and existing ones one more; otherwise it is three per
+	batch.
+	"""
+	if keys is None:
+		keys = name_keys(names)
+	wanted = {}
+	for name in names:
+		wanted.setdefault(keys[name], name)
+
+	found, created = {}, set()
+	for batch in chunks(list(wanted), BATCH_SIZE):
+		if can_return_rows():
+			inserted = insert_names(model, user, [wanted[key] for key in batch])
+		else:
+			found.update(read_names(model, user, batch))
+			missing = [key for key in batch if key not in found]
+			insert_names(model, user, [wanted[key] for key in missing])
+			inserted = read_names(model, user, missing)
+
+		created.update(obj.pk for obj in inserted.values())
+		found.update(inserted)
+
+		existing = [key for key in batch if key not in found]
+		if existing:
+			found.update(read_names(model, user, existing))
+
+	if created:
+		# Raw inserts send no post_save.
+		bump_user_data_version(user.pk)
+
+	return {name: found[keys[name]] for name in names}, created
+
+
+def can_return_rows():
+	"""INSERT ... RETURNING: Postgres, and SQLite from 3.35"""
+	if connection.vendor == 'sqlite':
+		return sqlite3.sqlite_version_info >= (3, 35)
+
+	return connection.vendor == 'postgresql'
+
+
+def read_names(model, user, keys):
+	"""{key: obj} of `user`'s rows whose lower(name) is one of `keys`"""
+	if not keys:
+		return {}
+
+	objs = model.objects.filter(user=user) \
+						.annotate(lower_name=Lower('name')) \
+						.filter(lower_name__in=keys) \
+						.order_by('id')
+
+	found = {}
+	for obj in objs:
+		found.setdefault(obj.lower_name, obj)
+
+	return found
+
+
+def insert_names(model, user, names):
+	"""Insert the rows, skipping any another writer got to first
+
+	A bare ON CONFLICT DO NOTHING is understood by Postgres and by SQLite
+	3.24 and later. Returns {lower(name): obj} of the inserted rows when the
+	database supports RETURNING, else nothing.
+	"""
+	if not names:
+		return {}
+
+	table = model._meta.db_table
+	values = ', '.join(['(%s, %s, 0)'] * len(names))
+	params = [value for name in names for value in (user.pk, name)]
+	returning = ' RETURNING id, name, lower(name)' if can_return_rows() else ''
+
+	with connection.cursor() as cursor:
+		cursor.execute(
+			f'INSERT INTO {table} (user_id, name, recipe_count) '
+			f'VALUES {values} ON CONFLICT DO NOTHING{returning}',
+			params
+		)
+		if not returning:
+			return None
+
+		return {
+			key: saved(model(id=pk, user=user, name=name))
+			for pk, name, key in cursor.fetchall()
+		}
+
+
+def saved(obj):
+	"""Mark `obj` as loaded from the database, as from_db() would"""
+	obj._state.adding = False
+	obj._state.db = connection.alias
+
+	return obj
+
+
+def find_duplicates(model):
+	"""{duplicate id: id of the oldest row with the same user and name}"""
+	groups = model.objects.annotate(lower_name=Lower('name')) \
+						  .values('user_id', 'lower_name') \
+						  .annotate(keep=Min('id'), rows=Count('id')) \
+						  .filter(rows__gt=1) \
+						  .order_by() \
+						  .values_list('user_id', 'lower_name', 'keep')
+
+	duplicates = {}
+	groups = list(groups)
+	for start in range(0, len(groups), 100):
+		batch = groups[start:start + 100]
+		keep = {(user_id, lower_name): pk for user_id, lower_name, pk in batch}
+		condition = Q()
+		for user_id, lower_name, _ in batch:
+			condition |= Q(user_id=user_id, lower_name=lower_name)
+
+		rows = model.objects.annotate(lower_name=Lower('name')) \
+							.filter(condition) \
+							.values_list('id', 'user_id', 'lower_name')
+		for pk, user_id, lower_name in rows:
+			target = keep[(user_id, lower_name)]
+			if pk != target:
+				duplicates[pk] = target
+
+	return duplicates
+
+
+def merge_duplicates(model, through, column, duplicates):
+	"""Move links of the `duplicates` rows to their keepers and delete them
+
+	`through` is the recipe link table and `column` its column pointing at
+	`model`; both are passed in so migrations can use historical models.
+	Links are rewritten per batch with one read, one multi-row insert and
+	one delete. Returns the ids of the recipes whose links changed.
+	"""
+	recipe_ids = set()
+	for batch in chunks(list(duplicates), BATCH_SIZE):
+		keepers = {duplicates[pk] for pk in batch}
+		links = through.objects.filter(
+			**{f'{column}__in': list(keepers) + batch}
+		).values_list('recipe_id', column)
+
+		current, wanted = set(), set()
+		for recipe_id, pk in links:
+			if pk in keepers:
+				current.add((recipe_id, pk))
+			else:
+				wanted.add((recipe_id, duplicates[pk]))
+				recipe_ids.add(recipe_id)
+
+		through.objects.bulk_create([
+			through(**{'recipe_id': recipe_id, column: pk})
+			for recipe_id, pk in sorted(wanted - current)
+		])
+		through.objects.filter(**{f'{column}__in': batch}).delete()
+		model.objects.filter(id__in=batch).delete()
+		count_links(model, through, column, keepers)
+
+	return recipe_ids
@@ -0,0 +1,35 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+	"""JSONRenderer that encodes with orjson when it is installed
+
+	The output is byte for byte what JSONRenderer produces with the default
+	settings: compact separators, UTF-8 instead of \\u escapes, and U+2028
+	and U+2029 escaped. Values orjson does not handle natively go through
+	the DRF encoder, and anything orjson refuses (pretty printing, huge
+	ints, non-string keys) is rendered by JSONRenderer itself.
+	"""
+
+	def render(self, data, accepted_media_type=None, renderer_context=None):
+		if orjson is None or data is None or not self.compact \
+				or self.ensure_ascii or self.get_indent(
+					accepted_media_type, renderer_context or {}) is not None:
+			return super().render(data, accepted_media_type, renderer_context)
+
+		try:
+			ret = orjson.dumps(
+				data,
+				default=self.encoder_class().default,
+				option=orjson.OPT_PASSTHROUGH_DATETIME
+			)
+		except TypeError:
+			return super().render(data, accepted_media_type, renderer_context)
+
+		return ret.replace(b'\xe2\x80\xa8', b'\\u2028') \
+				  .replace(b'\xe2\x80\xa9', b'\\u2029')
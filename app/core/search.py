@@ -0,0 +1,194 @@
+"""Full text search over recipe titles, tag names and ingredient names
+
+On Postgres each recipe has a weighted tsvector in RecipeSearchVector,
+matched with plainto_tsquery through a GIN index and ranked by ts_rank.
+Other databases (SQLite in tests and local runs) get a small inverted index
+in RecipeSearchTerm instead: one row per distinct word of a recipe, ranked
+by the summed weight of the matched words. Either way the index is rebuilt
+for the affected recipes whenever a title, a link or a linked name changes,
+see core.signals and recipe.bulk.
+"""
+import re
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, \
+							 Subquery, Sum, Value
+from django.db.models.functions import Cast
+
+from core.models import Ingredient, Recipe, RecipeSearchTerm, \
+						RecipeSearchVector, Tag
+
+
+SEARCH_CONFIG = 'english'
+
+# Title words outrank tag names, which outrank ingredient names; the
+# fallback weights mirror the A, B and C labels used on Postgres.
+TITLE_WEIGHT = 3
+TAG_WEIGHT = 2
+INGREDIENT_WEIGHT = 1
+
+# ts_rank is a float4; scaled to an integer it compares exactly, which the
+# keyset pagination cursor relies on.
+RANK_SCALE = 1000000
+
+CHUNK_SIZE = 500
+
+WORD_RE = re.compile(r'\w+')
+
+
+def uses_tsvector():
+	return connection.vendor == 'postgresql'
+
+
+def tokenize(text):
+	return WORD_RE.findall(text.lower())
+
+
+def chunks(ids, size=CHUNK_SIZE):
+	ids = list(ids)
+	for start in range(0, len(ids), size):
+		yield ids[start:start + size]
+
+
+def names_sql(model, relation):
+	"""Correlated subquery joining a recipe's linked names with spaces"""
+	through = relation.through._meta.db_table
+	target = model._meta.db_table
+	column = relation.field.m2m_reverse_name()
+	recipe_column = relation.field.m2m_column_name()
+
+	return (
+		f"COALESCE((SELECT string_agg(t.name, ' ') FROM {target} t "
+		f"JOIN {through} l ON l.{column} = t.id "
+		f"WHERE l.{recipe_column} = r.id), '')"
+	)
+
+
+def _reindex_vectors(ids):
+	sql = (
+		f'INSERT INTO {RecipeSearchVector._meta.db_table} (recipe_id, vector) '
+		f"SELECT r.id, "
+		f"setweight(to_tsvector(%s::regconfig, r.title), 'A') || "
+		f"setweight(to_tsvector(%s::regconfig, "
+		f"{names_sql(Tag, Recipe.tags)}), 'B') || "
+		f"setweight(to_tsvector(%s::regconfig, "
+		f"{names_sql(Ingredient, Recipe.ingredients)}), 'C') "
+		f'FROM {Recipe._meta.db_table} r WHERE r.id = ANY(%s) '
+		f'ON CONFLICT (recipe_id) DO UPDATE SET vector = EXCLUDED.vector'
+	)
+	with connection.cursor() as cursor:
+		for batch in chunks(ids):
+			cursor.execute(sql, [SEARCH_CONFIG] * 3 + [batch])
+
+
+def _reindex_terms(ids):
+	for batch in chunks(ids):
+		owners = {}
+		weights = defaultdict(dict)
+
+		def add(recipe_id, text, weight):
+			for term in tokenize(text):
+				if weights[recipe_id].get(term, 0) < weight:
+					weights[recipe_id][term] = weight
+
+		for pk, user_id, title in Recipe.objects.filter(id__in=batch) \
+												 .values_list('id', 'user_id', 'title'):
+			owners[pk] = user_id
+			add(pk, title, TITLE_WEIGHT)
+
+		for relation, name, weight in (
+				(Recipe.tags, 'tag', TAG_WEIGHT),
+				(Recipe.ingredients, 'ingredient', INGREDIENT_WEIGHT)):
+			rows = relation.through.objects.filter(recipe_id__in=batch) \
+										   .values_list('recipe_id', f'{name}__name')
+			for recipe_id, label in rows:
+				add(recipe_id, label, weight)
+
+		RecipeSearchTerm.objects.filter(recipe_id__in=batch).delete()
+
+		rows = [
+			RecipeSearchTerm(
+				user_id=owners[recipe_id],
+				recipe_id=recipe_id,
+				term=term[:255],
+				weight=weight
+			)
+			for recipe_id in owners
+			for term, weight in weights[recipe_id].items()
+		]
+		for start in range(0, len(rows), CHUNK_SIZE):
+			RecipeSearchTerm.objects.bulk_create(rows[start:start + CHUNK_SIZE])
+
+
+def reindex_recipes(ids):
+	"""Rebuild the search index entries of the recipes in `ids`"""
+	ids = sorted(set(ids))
+	if not ids:
+		return
+
+	if uses_tsvector():
+		_reindex_vectors(ids)
+	else:
+		_reindex_terms(ids)
+
+
+def linked_recipe_ids(model, ids):
+	"""Recipes whose document includes the names of `model` rows `ids`"""
+	relation = Recipe.tags if model is Tag else Recipe.ingredients
+	column = relation.field.m2m_reverse_name()
+	recipe_ids = set()
+	for batch in chunks(ids):
+		recipe_ids.update(
+			relation.through.objects.filter(**{f'{column}__in': batch})
+									.values_list('recipe_id', flat=True)
+		)
+
+	return recipe_ids
+
+
+def reindex_for(model, ids):
+	"""Reindex after rows of Recipe, Tag or Ingredient were written"""
+	if model is Recipe:
+		reindex_recipes(ids)
+	else:
+		reindex_recipes(linked_recipe_ids(model, ids))
+
+
+def search_recipes(queryset, user, text):
+	"""Narrow `queryset` to recipes matching every word of `text`
+
+	Adds an integer `search_rank` annotation, higher is better.
+	"""
+	if uses_tsvector():
+		query = SearchQuery(text, config=SEARCH_CONFIG)
+		rank = SearchRank(F('search_vector__vector'), query)
+
+		return queryset.filter(search_vector__vector=query).annotate(
+			search_rank=Cast(
+				rank * Value(RANK_SCALE, output_field=FloatField()),
+				IntegerField()
+			)
+		)
+
+	terms = sorted(set(term[:255] for term in tokenize(text)))
+	if not terms:
+		# Still annotated, as callers order by the rank
+		return queryset.annotate(
+			search_rank=Value(0, output_field=IntegerField())
+		).none()
+
+	postings = RecipeSearchTerm.objects.filter(user=user, term__in=terms)
+	matches = postings.values('recipe_id') \
+					  .annotate(matched=Count('term')) \
+					  .filter(matched=len(terms)) \
+					  .values('recipe_id')
+	rank = postings.filter(recipe_id=OuterRef('pk')) \
+				   .values('recipe_id') \
+				   .annotate(rank=Sum('weight')) \
+				   .values('rank')
+
+	return queryset.filter(id__in=matches).annotate(
+		search_rank=Subquery(rank, output_field=IntegerField())
+	)
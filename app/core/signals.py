@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+									  pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.authentication import token_cache
+from core.cache import bump_user_data_version
+from core.counts import linked_ids, refresh_recipe_counts
+from core.db import check_idle_connections, mark_connections_used
+from core.models import Ingredient, Recipe, Tag
+from core.search import linked_recipe_ids, reindex_recipes
+
+
+# Connected after Django's close_old_connections, so expired connections
+# are already gone when the idle ones are checked.
+request_started.connect(check_idle_connections)
+request_finished.connect(mark_connections_used)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+	token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_saved_user(sender, instance, created, **kwargs):
+	"""Covers password changes and is_active flips from any code path"""
+	if created:
+		bump_user_data_version(instance.pk)
+	else:
+		token_cache.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def bump_owner_version(sender, instance, **kwargs):
+	bump_user_data_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_linked_owner_version(sender, instance, action, **kwargs):
+	if action.startswith('post_'):
+		bump_user_data_version(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+def reindex_saved_recipe(sender, instance, created, update_fields, **kwargs):
+	if update_fields is not None and 'title' not in update_fields:
+		return
+
+	title = instance.__dict__.get('title')
+	if created or (title is not None and title != instance._loaded_title):
+		reindex_recipes([instance.pk])
+		instance._loaded_title = title
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def reindex_renamed_recipes(sender, instance, created, **kwargs):
+	if not created:
+		reindex_recipes(linked_recipe_ids(sender, [instance.pk]))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_unlinked_recipes(sender, instance, **kwargs):
+	# The links are gone by post_delete, so remember who to reindex.
+	instance._search_recipe_ids = linked_recipe_ids(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def reindex_unlinked_recipes(sender, instance, **kwargs):
+	reindex_recipes(getattr(instance, '_search_recipe_ids', ()))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def reindex_relinked_recipes(sender, instance, action, reverse, model,
+							 pk_set, **kwargs):
+	if not reverse:
+		if action.startswith('post_'):
+			reindex_recipes([instance.pk])
+	elif action == 'pre_clear':
+		instance._search_recipe_ids = linked_recipe_ids(
+			type(instance), [instance.pk]
+		)
+	elif action == 'post_clear':
+		reindex_recipes(getattr(instance, '_search_recipe_ids', ()))
+	elif action.startswith('post_'):
+		reindex_recipes(pk_set or ())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def refresh_relinked_counts(sender, instance, action, reverse, model,
+							pk_set, **kwargs):
+	if reverse:
+		if action.startswith('post_'):
+			refresh_recipe_counts(type(instance), [instance.pk])
+	elif action == 'pre_clear':
+		instance._count_ids = linked_ids(model, [instance.pk])
+	elif action == 'post_clear':
+		refresh_recipe_counts(model, getattr(instance, '_count_ids', ()))
+	elif action.startswith('post_'):
+		refresh_recipe_counts(model, pk_set or ())
+
+
+@receiver(pre_delete, sender=Recipe)
+def collect_counted_relations(sender, instance, **kwargs):
+	# Links are deleted with the recipe, without m2m_changed.
+	instance._count_ids = {
+		model: linked_ids(model, [instance.pk]) for model in (Tag, Ingredient)
+	}
+
+
+@receiver(post_delete, sender=Recipe)
+def refresh_unlinked_counts(sender, instance, **kwargs):
+	for model, ids in getattr(instance, '_count_ids', {}).items():
+		refresh_recipe_counts(model, ids)
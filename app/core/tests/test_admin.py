@@ -1,7 +1,14 @@
+from unittest.mock import patch
+
 from django.test import Client, TestCase
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from core.admin import EstimatedCountPaginator, estimated_count
+from core.models import Recipe, Tag
+
 
 class AdminSiteTests(TestCase):
 
@@ -40,3 +47,147 @@ class AdminSiteTests(TestCase):
 
 		self.client.get(url)
 		self.assertEqual(res.status_code, 200)
+
+
+class ScalableAdminTests(TestCase):
+
+	def setUp(self):
+		self.client = Client()
+		self.admin_user = get_user_model().objects.create_superuser(
+				email='admin@test.com',
+				password='pasword123'
+			)
+		self.client.force_login(self.admin_user)
+		self.user = get_user_model().objects.create_user(
+			email='test@test.com',
+			password='password123'
+			)
+		self.other = get_user_model().objects.create_user(
+			email='other@test.com',
+			password='password123'
+			)
+		self.soup = Tag.objects.create(user=self.user, name='Soup')
+		Tag.objects.create(user=self.user, name='Lentil soup')
+		self.foreign = Tag.objects.create(user=self.other, name='Foreign tag')
+		self.recipe = Recipe.objects.create(
+				user=self.user,
+				title='Tinola',
+				time_minutes=30,
+				price=5.00
+			)
+		self.recipe.tags.add(self.soup)
+
+	def add_recipes(self, count):
+		Recipe.objects.bulk_create(
+			Recipe(user=self.other, title=f'Recipe {i}', time_minutes=5, price=1)
+			for i in range(count)
+		)
+
+	def changelist_queries(self):
+		url = reverse('admin:core_recipe_changelist')
+		with CaptureQueriesContext(connection) as queries:
+			res = self.client.get(url)
+		self.assertEqual(res.status_code, 200)
+
+		return len(queries)
+
+	def test_recipe_changelist_queries_do_not_grow_with_rows(self):
+		few = self.changelist_queries()
+		self.add_recipes(20)
+
+		self.assertEqual(self.changelist_queries(), few)
+
+	def test_recipe_change_form_renders_only_selected_relations(self):
+		url = reverse('admin:core_recipe_change', args=[self.recipe.id])
+
+		res = self.client.get(url)
+
+		self.assertContains(res, 'Soup')
+		self.assertNotContains(res, 'Foreign tag')
+		self.assertNotContains(res, 'Lentil soup')
+
+	def test_recipe_form_rejects_other_users_tags(self):
+		url = reverse('admin:core_recipe_change', args=[self.recipe.id])
+
+		res = self.client.post(url, {
+			'user': self.user.id,
+			'title': 'Tinola',
+			'time_minutes': 30,
+			'price': '5.00',
+			'tags': [self.soup.id, self.foreign.id],
+		})
+
+		self.assertEqual(res.status_code, 200)
+		self.assertContains(res, 'Not owned by test@test.com: Foreign tag')
+		self.assertEqual(list(self.recipe.tags.all()), [self.soup])
+
+	def test_tag_form_rejects_duplicate_name_ignoring_case(self):
+		add_url = reverse('admin:core_tag_add')
+		change_url = reverse('admin:core_tag_change', args=[self.soup.id])
+
+		taken = self.client.post(add_url, {'user': self.user.id, 'name': 'SOUP'})
+		other_user = self.client.post(
+			add_url, {'user': self.other.id, 'name': 'SOUP'}
+		)
+		renamed = self.client.post(
+			change_url, {'user': self.user.id, 'name': 'soup'}
+		)
+
+		self.assertEqual(taken.status_code, 200)
+		self.assertContains(taken, 'already has &quot;SOUP&quot;, ignoring case')
+		self.assertEqual(other_user.status_code, 302)
+		self.assertEqual(renamed.status_code, 302)
+		self.soup.refresh_from_db()
+		self.assertEqual(self.soup.name, 'soup')
+
+	def test_tag_form_folds_non_ascii_names_like_the_database(self):
+		Tag.objects.create(user=self.user, name='Éclair')
+
+		res = self.client.post(
+			reverse('admin:core_tag_add'), {'user': self.user.id, 'name': 'ÉCLAIR'}
+		)
+
+		self.assertEqual(res.status_code, 200)
+		self.assertContains(res, 'ignoring case')
+
+	def test_tag_search_matches_prefix(self):
+		url = reverse('admin:core_tag_changelist')
+
+		res = self.client.get(url, {'q': 'SOU'})
+
+		self.assertContains(res, 'Soup')
+		self.assertNotContains(res, 'Lentil soup')
+
+	def test_owner_filter(self):
+		self.add_recipes(2)
+		url = reverse('admin:core_recipe_changelist')
+
+		res = self.client.get(url, {'user': self.user.id})
+
+		self.assertContains(res, 'Tinola')
+		self.assertNotContains(res, 'Recipe 1')
+		self.assertContains(res, f'?user={self.user.id}')
+
+	def test_tag_autocomplete_uses_prefix_search(self):
+		url = reverse('admin:core_tag_autocomplete')
+
+		res = self.client.get(url, {'term': 'lent'})
+
+		names = [result['text'] for result in res.json()['results']]
+		self.assertEqual(names, ['Lentil soup'])
+
+	def test_paginator_estimates_only_big_tables(self):
+		with patch('core.admin.estimated_count', return_value=5000000):
+			self.assertEqual(
+				EstimatedCountPaginator(Recipe.objects.order_by('id'), 10).count,
+				5000000
+			)
+		with patch('core.admin.estimated_count', return_value=10):
+			self.assertEqual(
+				EstimatedCountPaginator(Recipe.objects.order_by('id'), 10).count, 1
+			)
+
+	def test_estimates_need_postgres_and_no_filter(self):
+		self.assertIsNone(estimated_count(Recipe.objects.filter(user=self.user)))
+		if connection.vendor != 'postgresql':
+			self.assertIsNone(estimated_count(Recipe.objects.all()))
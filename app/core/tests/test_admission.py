@@ -0,0 +1,182 @@
+import threading
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.admission import AdaptiveLimit, Admission, admission_settings
+from core.models import Recipe
+
+
+ME_URL = reverse('user:me')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def upload_url(recipe_id):
+	return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+class AdaptiveLimitTests(SimpleTestCase):
+
+	def test_sheds_when_full_and_queue_disabled(self):
+		limit = AdaptiveLimit('heavy', {'LIMIT': 2, 'MAX_WAIT_MS': 0})
+
+		self.assertTrue(limit.acquire())
+		self.assertTrue(limit.acquire())
+		self.assertFalse(limit.acquire())
+
+		limit.release(0.01)
+		self.assertTrue(limit.acquire())
+		self.assertEqual(limit.stats()['rejected'], 1)
+
+	def test_waiting_is_bounded(self):
+		limit = AdaptiveLimit('read', {'LIMIT': 1, 'MAX_WAIT_MS': 20})
+		limit.acquire()
+
+		start = time.monotonic()
+		admitted = limit.acquire()
+
+		self.assertFalse(admitted)
+		self.assertGreaterEqual(time.monotonic() - start, 0.02)
+		self.assertEqual(limit.waiting, 0)
+
+	def test_waiter_takes_a_released_slot(self):
+		limit = AdaptiveLimit('read', {'LIMIT': 1, 'MAX_WAIT_MS': 5000})
+		limit.acquire()
+		results = []
+		waiter = threading.Thread(target=lambda: results.append(limit.acquire()))
+		waiter.start()
+		while not limit.waiting:
+			time.sleep(0.001)
+
+		limit.release(0.01)
+		waiter.join()
+
+		self.assertEqual(results, [True])
+		self.assertEqual(limit.in_flight, 1)
+
+	def test_full_queue_sheds_without_waiting(self):
+		limit = AdaptiveLimit('read', {
+			'LIMIT': 1, 'MAX_WAIT_MS': 5000, 'MAX_QUEUE': 0
+		})
+		limit.acquire()
+
+		self.assertFalse(limit.acquire())
+
+	def test_limit_adapts_to_latency(self):
+		limit = AdaptiveLimit('read', {
+			'LIMIT': 4, 'MAX_LIMIT': 5, 'TARGET_MS': 100, 'BACKOFF': 0.5
+		})
+
+		for _ in range(8):
+			limit.acquire()
+			limit.release(0.01)
+		self.assertEqual(limit.limit, 5)
+
+		for _ in range(3):
+			limit.acquire()
+			limit.release(1.0)
+		# Slow requests close together cut the limit once
+		self.assertEqual(limit.limit, 2.5)
+
+		limit._last_cut -= 1
+		limit.acquire()
+		limit.release(1.0)
+		self.assertEqual(limit.limit, 1.25)
+
+	def test_retry_after_grows_with_queue(self):
+		limit = AdaptiveLimit('read', {'LIMIT': 1, 'TARGET_MS': 1500})
+
+		self.assertEqual(limit.retry_after(), 2)
+		limit.waiting = 3
+		self.assertEqual(limit.retry_after(), 6)
+
+
+class AdmissionMiddlewareTests(TestCase):
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		self.recipe = Recipe.objects.create(
+				user=self.user,
+				title='Tinola',
+				time_minutes=30,
+				price=5.00
+			)
+
+		options = dict(admission_settings(), CLASSES={
+			'read': {'LIMIT': 2, 'MAX_WAIT_MS': 0},
+			'write': {'LIMIT': 2, 'MAX_WAIT_MS': 0},
+			'heavy': {'LIMIT': 1, 'MAX_WAIT_MS': 0},
+		}, ROUTES={
+			'recipe:recipe-upload-image': 'heavy',
+			'recipe:recipe-export': 'heavy',
+		}, MAX_BACKLOG_MS=1000)
+		self.admission = Admission(options)
+		patcher = patch('core.middleware.admission', self.admission)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def test_busy_heavy_class_does_not_starve_cheap_reads(self):
+		heavy = self.admission.limits['heavy']
+		heavy.acquire()
+
+		upload = self.client.post(upload_url(self.recipe.id), {})
+		me = self.client.get(ME_URL)
+
+		self.assertEqual(upload.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+		self.assertEqual(upload['Retry-After'], '1')
+		self.assertEqual(me.status_code, status.HTTP_200_OK)
+
+	def test_slots_are_returned(self):
+		for _ in range(5):
+			self.client.get(ME_URL)
+			self.client.patch(ME_URL, {'name': 'New name'})
+
+		read = self.admission.limits['read'].stats()
+		write = self.admission.limits['write'].stats()
+		self.assertEqual((read['in_flight'], read['admitted']), (0, 5))
+		self.assertEqual((write['in_flight'], write['admitted']), (0, 5))
+
+	def test_streamed_response_holds_its_slot_until_sent(self):
+		heavy = self.admission.limits['heavy']
+
+		export = self.client.get(EXPORT_URL)
+		while_streaming = self.client.get(EXPORT_URL)
+		self.assertEqual(heavy.stats()['in_flight'], 1)
+		b''.join(export.streaming_content)
+		after = self.client.get(EXPORT_URL)
+
+		self.assertEqual(export.status_code, status.HTTP_200_OK)
+		self.assertEqual(while_streaming.status_code,
+						 status.HTTP_503_SERVICE_UNAVAILABLE)
+		self.assertEqual(after.status_code, status.HTTP_200_OK)
+
+	def test_requests_queued_too_long_upstream_are_shed(self):
+		stale = f't={time.time() - 5:.3f}'
+		fresh = str(int(time.time() * 1000000))
+
+		shed = self.client.get(ME_URL, HTTP_X_REQUEST_START=stale)
+		served = self.client.get(ME_URL, HTTP_X_REQUEST_START=fresh)
+
+		self.assertEqual(shed.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+		self.assertEqual(served.status_code, status.HTTP_200_OK)
+
+	def test_other_routes_are_not_limited(self):
+		for limit in self.admission.limits.values():
+			limit.limit = 1
+			limit.acquire()
+
+		res = self.client.get(reverse('metrics'))
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertIn(b'admission_heavy_in_flight', res.content)
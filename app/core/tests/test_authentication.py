@@ -0,0 +1,121 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import TokenCache, token_cache
+
+
+ME_URL = reverse('user:me')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+	def setUp(self):
+		token_cache.clear()
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.token = Token.objects.create(user=self.user)
+		self.client = APIClient()
+		self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+	def tearDown(self):
+		token_cache.clear()
+
+	def test_repeat_requests_skip_token_lookup(self):
+		with self.assertNumQueries(1):
+			self.client.get(ME_URL)
+
+		with self.assertNumQueries(0):
+			res = self.client.get(ME_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(token_cache.stats()['hits'], 1)
+		self.assertEqual(token_cache.stats()['misses'], 1)
+
+	def test_invalid_token_rejected(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+		res = self.client.get(TAGS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+	def test_deleted_token_invalidated(self):
+		self.client.get(TAGS_URL)
+		self.token.delete()
+
+		res = self.client.get(TAGS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+	def test_password_change_invalidates(self):
+		self.client.get(ME_URL)
+		self.client.patch(ME_URL, {'password': 'newpassword1234'})
+
+		with self.assertNumQueries(1):
+			self.client.get(ME_URL)
+
+		self.assertEqual(token_cache.stats()['misses'], 2)
+
+	def test_deactivated_user_rejected(self):
+		self.client.get(TAGS_URL)
+		self.user.is_active = False
+		self.user.save()
+
+		res = self.client.get(TAGS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+	def test_request_changes_do_not_leak_into_cache(self):
+		self.client.get(ME_URL)
+		self.client.patch(ME_URL, {'name': 'Changed'})
+
+		res = self.client.get(ME_URL)
+
+		self.assertEqual(res.data['name'], 'Changed')
+
+
+class TokenCacheTests(TestCase):
+
+	def test_lru_eviction(self):
+		cache = TokenCache(max_size=2, ttl=60)
+		cache.set('a', 1)
+		cache.set('b', 2)
+		cache.get('a')
+		cache.set('c', 3)
+
+		self.assertEqual(cache.get('a'), 1)
+		self.assertIsNone(cache.get('b'))
+		self.assertEqual(cache.stats()['evictions'], 1)
+
+	@patch('core.authentication.time.monotonic')
+	def test_ttl_expiry(self, monotonic):
+		cache = TokenCache(max_size=2, ttl=60)
+		monotonic.return_value = 100
+		cache.set('a', 1)
+
+		monotonic.return_value = 159
+		self.assertEqual(cache.get('a'), 1)
+
+		monotonic.return_value = 161
+		self.assertIsNone(cache.get('a'))
+
+	def test_shared_backend(self):
+		writer = TokenCache(backend='default')
+		reader = TokenCache(backend='default')
+		writer.set('a', 1)
+
+		self.assertEqual(reader.get('a'), 1)
+		self.assertEqual(reader.stats()['shared_hits'], 1)
+
+		writer.delete('a')
+		reader.clear()
+		self.assertIsNone(reader.get('a'))
@@ -0,0 +1,67 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from core.models import Recipe
+
+
+class BenchApiCommandTests(TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.directory)
+		self.output = os.path.join(self.directory, 'results.json')
+		media = override_settings(MEDIA_ROOT=os.path.join(self.directory, 'media'))
+		media.enable()
+		self.addCleanup(media.disable)
+
+	def bench(self, *args):
+		out, err = StringIO(), StringIO()
+		call_command(
+			'bench_api', '--users', '1', '--recipes', '5', '--repeat', '1',
+			'--warmup', '0', '--batch', '2', '--output', self.output, *args,
+			stdout=out, stderr=err
+		)
+
+		return out.getvalue(), err.getvalue()
+
+	def test_every_route_benchmarked_and_rolled_back(self):
+		out, err = self.bench()
+
+		self.assertNotIn('Routes not benchmarked', err)
+		with open(self.output) as fp:
+			results = json.load(fp)
+		self.assertEqual(results['cases']['recipe list']['queries'], 3)
+		self.assertIn('user token', results['cases'])
+		self.assertFalse(Recipe.objects.exists())
+		self.assertEqual(os.listdir(os.path.join(self.directory, 'media',
+												 'uploads', 'recipe')), [])
+
+	def test_regression_against_baseline(self):
+		baseline = os.path.join(self.directory, 'baseline.json')
+		with open(baseline, 'w') as fp:
+			json.dump({
+				'vendor': 'sqlite',
+				'recipes': 5,
+				'cases': {
+					'recipe list': {'p50': 1000, 'queries': 2},
+				},
+			}, fp)
+
+		with self.assertRaises(CommandError):
+			self.bench('--baseline', baseline)
+
+	def test_no_regression_against_own_results(self):
+		self.bench()
+		baseline = os.path.join(self.directory, 'baseline.json')
+		os.rename(self.output, baseline)
+
+		out, _ = self.bench('--baseline', baseline, '--tolerance', '100')
+
+		self.assertIn('No regressions', out)
@@ -0,0 +1,127 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.cache import user_data_version
+from core.models import Ingredient, Recipe, Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+	return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ResponseCacheTests(TestCase):
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		self.recipe = Recipe.objects.create(
+				user=self.user,
+				title='Tinola',
+				time_minutes=30,
+				price=5.00
+			)
+
+	def test_repeat_read_skips_database(self):
+		first = self.client.get(RECIPES_URL)
+
+		with self.assertNumQueries(0):
+			second = self.client.get(RECIPES_URL)
+
+		self.assertEqual(first['X-Cache'], 'MISS')
+		self.assertEqual(second['X-Cache'], 'HIT')
+		self.assertEqual(first.content, second.content)
+
+	def test_query_params_cached_separately(self):
+		self.client.get(TAGS_URL)
+
+		res = self.client.get(TAGS_URL, {'page_size': 1})
+
+		self.assertEqual(res['X-Cache'], 'MISS')
+
+	def test_cache_is_per_user(self):
+		Tag.objects.create(user=self.user, name='Vegan')
+		self.client.get(TAGS_URL)
+
+		user2 = get_user_model().objects.create_user(
+				'test2@test.com',
+				'password1234'
+			)
+		self.client.force_authenticate(user2)
+		res = self.client.get(TAGS_URL)
+
+		self.assertEqual(res.data['results'], [])
+
+	def test_api_writes_invalidate(self):
+		self.client.get(TAGS_URL)
+		self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+		res = self.client.get(TAGS_URL)
+
+		self.assertEqual(res['X-Cache'], 'MISS')
+		self.assertEqual(len(res.data['results']), 1)
+
+	def test_model_and_m2m_writes_invalidate(self):
+		self.client.get(detail_url(self.recipe.id))
+		tag = Tag.objects.create(user=self.user, name='Soup')
+
+		version = user_data_version(self.user.pk)
+		self.recipe.tags.add(tag)
+		self.assertNotEqual(user_data_version(self.user.pk), version)
+
+		res = self.client.get(detail_url(self.recipe.id))
+		self.assertEqual(res.data['tags'], [{'id': tag.id, 'name': 'Soup'}])
+
+		self.client.delete(detail_url(self.recipe.id))
+		res = self.client.get(RECIPES_URL)
+		self.assertEqual(res.data['results'], [])
+
+	def test_admin_writes_invalidate(self):
+		ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+		version = user_data_version(self.user.pk)
+
+		request = RequestFactory().post('/')
+		request.user = self.user
+		admin.site._registry[Ingredient].delete_model(request, ingredient)
+
+		self.assertNotEqual(user_data_version(self.user.pk), version)
+
+	def test_conditional_get(self):
+		res = self.client.get(RECIPES_URL)
+		etag = res['ETag']
+
+		with self.assertNumQueries(0):
+			res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+		self.client.patch(detail_url(self.recipe.id), {'title': 'Adobo'})
+		res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertNotEqual(res['ETag'], etag)
+
+	def test_etag_only_matches_its_own_representation(self):
+		etag = self.client.get(TAGS_URL)['ETag']
+
+		other_url = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+		other_query = self.client.get(
+			TAGS_URL, {'assigned_only': 1}, HTTP_IF_NONE_MATCH=etag
+		)
+		listed = self.client.get(
+			TAGS_URL, HTTP_IF_NONE_MATCH=f'"other", W/{etag}'
+		)
+
+		self.assertEqual(other_url.status_code, status.HTTP_200_OK)
+		self.assertEqual(other_query.status_code, status.HTTP_200_OK)
+		self.assertEqual(listed.status_code, status.HTTP_304_NOT_MODIFIED)
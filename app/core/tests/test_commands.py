@@ -1,21 +1,92 @@
+from io import StringIO
 from unittest.mock import patch
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
 
+ENSURE_CONNECTION = \
+	'django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection'
+
+
+def fail_first(count):
+	"""ensure_connection side effect refusing the first `count` calls"""
+	calls = []
+
+	def ensure_connection():
+		calls.append(None)
+		if len(calls) <= count:
+			raise OperationalError('connection refused')
+
+	return ensure_connection
+
+
+class FakeClock:
+	"""time.monotonic and time.sleep sharing a clock that only sleep moves"""
+
+	def __init__(self):
+		self.now = 0.0
+		self.sleeps = []
+
+	def monotonic(self):
+		return self.now
+
+	def sleep(self, seconds):
+		self.sleeps.append(seconds)
+		self.now += seconds
+
+
 class CommandTests(TestCase):
 
+	def setUp(self):
+		self.clock = FakeClock()
+		for name in ('monotonic', 'sleep'):
+			patcher = patch(f'time.{name}', getattr(self.clock, name))
+			patcher.start()
+			self.addCleanup(patcher.stop)
+
+	def wait_for_db(self, *args):
+		out = StringIO()
+		call_command('wait_for_db', *args, stdout=out)
+
+		return out.getvalue()
+
 	def test_wait_for_db_ready(self):
-		with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-			gi.return_value = True
-			call_command('wait_for_db')			
-			self.assertEqual(gi.call_count, 1)
-    
-	@patch('time.sleep', return_value=True)
-	def test_wait_for_db(self, ts):
-		with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-			gi.side_effect = [OperationalError] * 5 + [True]
-			call_command('wait_for_db')
-			self.assertEqual(gi.call_count, 6)
\ No newline at end of file
+		with patch(ENSURE_CONNECTION):
+			out = self.wait_for_db()
+
+		self.assertEqual(self.clock.sleeps, [])
+		self.assertIn('connect (1 attempts)', out)
+		self.assertIn('warm up', out)
+
+	def test_wait_for_db(self):
+		with patch(ENSURE_CONNECTION, side_effect=fail_first(5)):
+			out = self.wait_for_db()
+
+		self.assertIn('connect (6 attempts)', out)
+		self.assertEqual(len(self.clock.sleeps), 5)
+
+	def test_backoff_is_exponential_and_capped(self):
+		with patch(ENSURE_CONNECTION, side_effect=fail_first(6)), \
+				patch('random.uniform', lambda low, high: high):
+			self.wait_for_db('--initial-delay', '1', '--max-delay', '10')
+
+		self.assertEqual(self.clock.sleeps, [1, 2, 4, 8, 10, 10])
+
+	def test_gives_up_at_deadline(self):
+		with patch(ENSURE_CONNECTION, side_effect=fail_first(1000)):
+			with self.assertRaises(CommandError):
+				self.wait_for_db('--timeout', '3')
+
+		self.assertLessEqual(self.clock.now, 3)
+
+	def test_check_migrations(self):
+		self.wait_for_db('--check-migrations')
+
+		with patch(
+				'django.db.migrations.executor.MigrationExecutor.migration_plan',
+				return_value=[('migration', False)]):
+			with self.assertRaises(CommandError):
+				self.wait_for_db('--check-migrations')
@@ -0,0 +1,156 @@
+import json
+import zlib
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import compression
+from core.models import Recipe, Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def gunzip(content):
+	return zlib.decompress(content, compression.GZIP_WBITS)
+
+
+class NegotiationTests(SimpleTestCase):
+
+	def test_accepted_codings_with_q_values(self):
+		codings = compression.accepted_codings('gzip;q=0.5, br, identity;q=0')
+
+		self.assertEqual(codings, {'gzip': 0.5, 'br': 1.0, 'identity': 0.0})
+
+	def test_negotiate_prefers_first_available_on_ties(self):
+		self.assertEqual(compression.negotiate('gzip, br', ('br', 'gzip')), 'br')
+		self.assertEqual(
+			compression.negotiate('gzip, br;q=0.1', ('br', 'gzip')), 'gzip'
+		)
+		self.assertEqual(compression.negotiate('*', ('br', 'gzip')), 'br')
+		self.assertEqual(
+			compression.negotiate('*;q=0, gzip', ('br', 'gzip')), 'gzip'
+		)
+		self.assertIsNone(compression.negotiate('', ('br', 'gzip')))
+		self.assertIsNone(compression.negotiate('gzip;q=0', ('gzip',)))
+
+	def test_route_levels(self):
+		options = {
+			'LEVELS': {'br': 4, 'gzip': 6},
+			'ROUTE_LEVELS': {'a': {'gzip': 1}, 'b': None},
+		}
+
+		self.assertEqual(compression.route_level('a', 'gzip', options), 1)
+		self.assertEqual(compression.route_level('a', 'br', options), 4)
+		self.assertIsNone(compression.route_level('b', 'gzip', options))
+		self.assertEqual(compression.route_level('c', 'gzip', options), 6)
+
+	def test_stream_matches_one_shot(self):
+		chunks = [b'{"id": %d}\n' % i for i in range(500)]
+
+		streamed = b''.join(compression.compress_stream(chunks, 'gzip', 6))
+
+		self.assertEqual(gunzip(streamed), b''.join(chunks))
+
+
+class CompressionMiddlewareTests(TestCase):
+
+	def setUp(self):
+		caches['default'].clear()
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		Tag.objects.bulk_create(
+			Tag(user=self.user, name=f'Tag with a longish name {i}')
+			for i in range(100)
+		)
+
+	def test_gzip_round_trip(self):
+		plain = self.client.get(TAGS_URL)
+		res = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+		self.assertEqual(res['Content-Encoding'], 'gzip')
+		self.assertIn('Accept-Encoding', res['Vary'])
+		self.assertEqual(res['Content-Length'], str(len(res.content)))
+		self.assertLess(len(res.content), len(plain.content))
+		self.assertEqual(gunzip(res.content), plain.content)
+
+	@skipIf(compression.brotli is None, 'brotli is not installed')
+	def test_brotli_preferred(self):
+		plain = self.client.get(TAGS_URL)
+		res = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip, br')
+
+		self.assertEqual(res['Content-Encoding'], 'br')
+		self.assertEqual(compression.brotli.decompress(res.content),
+						 plain.content)
+
+	def test_identity_and_small_bodies_untouched(self):
+		identity = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='identity')
+		Tag.objects.filter(user=self.user).delete()
+
+		small = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+		self.assertFalse(identity.has_header('Content-Encoding'))
+		self.assertIn('Accept-Encoding', identity['Vary'])
+		self.assertFalse(small.has_header('Content-Encoding'))
+		self.assertEqual(json.loads(small.content)['results'], [])
+
+	def test_route_level_none_disables(self):
+		options = dict(compression.compression_settings(),
+					   ROUTE_LEVELS={'recipe:tag-list': None})
+		with override_settings(COMPRESSION=options):
+			client = APIClient()
+			client.force_authenticate(self.user)
+			res = client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+		self.assertFalse(res.has_header('Content-Encoding'))
+
+	def test_cached_responses_reuse_compressed_bytes(self):
+		with patch('core.middleware.compress',
+				   wraps=compression.compress) as compress:
+			first = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+			second = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+		self.assertEqual(first['X-Cache'], 'MISS')
+		self.assertEqual(second['X-Cache'], 'HIT')
+		self.assertEqual(compress.call_count, 1)
+		self.assertEqual(first.content, second.content)
+
+	def test_etag_weakened_and_still_matches(self):
+		res = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+		again = self.client.get(
+			TAGS_URL,
+			HTTP_ACCEPT_ENCODING='gzip',
+			HTTP_IF_NONE_MATCH=res['ETag']
+		)
+
+		self.assertTrue(res['ETag'].startswith('W/"'))
+		self.assertEqual(again.status_code, 304)
+
+	def test_streamed_export_compressed_incrementally(self):
+		Recipe.objects.bulk_create(
+			Recipe(user=self.user, title=f'Recipe {i}', time_minutes=5, price=1)
+			for i in range(50)
+		)
+		plain = self.client.get(EXPORT_URL)
+
+		res = self.client.get(EXPORT_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+		self.assertTrue(res.streaming)
+		self.assertEqual(res['Content-Encoding'], 'gzip')
+		self.assertFalse(res.has_header('Content-Length'))
+		self.assertEqual(
+			gunzip(b''.join(res.streaming_content)),
+			b''.join(plain.streaming_content)
+		)
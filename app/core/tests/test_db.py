@@ -0,0 +1,57 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, override_settings
+
+from core import db
+
+
+def open_connection(usable=True, idle=0):
+	connection = MagicMock()
+	connection.is_usable.return_value = usable
+	connection.last_request_finished = 1000 - idle
+
+	return connection
+
+
+@override_settings(CONN_HEALTH_CHECK_IDLE=30)
+@patch('time.monotonic', return_value=1000)
+class IdleConnectionCheckTests(SimpleTestCase):
+
+	def check(self, *connections):
+		with patch('core.db.connections') as handler:
+			handler.all.return_value = connections
+			db.check_idle_connections()
+
+	def test_recently_used_connection_not_pinged(self, monotonic):
+		connection = open_connection(usable=False, idle=5)
+
+		self.check(connection)
+
+		connection.is_usable.assert_not_called()
+		connection.close.assert_not_called()
+
+	def test_idle_dead_connection_closed(self, monotonic):
+		dead = open_connection(usable=False, idle=60)
+		alive = open_connection(usable=True, idle=60)
+
+		self.check(dead, alive)
+
+		dead.close.assert_called_once_with()
+		alive.close.assert_not_called()
+
+	def test_closed_connection_skipped(self, monotonic):
+		connection = open_connection(usable=False, idle=60)
+		connection.connection = None
+
+		self.check(connection)
+
+		connection.is_usable.assert_not_called()
+
+	def test_request_finished_marks_connections(self, monotonic):
+		connection = open_connection()
+
+		with patch('core.db.connections') as handler:
+			handler.all.return_value = [connection]
+			db.mark_connections_used()
+
+		self.assertEqual(connection.last_request_finished, 1000)
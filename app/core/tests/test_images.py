@@ -0,0 +1,181 @@
+import io
+import shutil
+import struct
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import images
+from core.cache import user_data_version
+from core.models import Recipe
+
+
+def jpeg_bytes(size=(400, 200), orientation=None):
+	"""A JPEG, optionally carrying an EXIF orientation tag"""
+	buffer = io.BytesIO()
+	kwargs = {}
+	if orientation:
+		ifd = b'\x00\x01' + struct.pack('>HHIHH', 0x0112, 3, 1, orientation, 0)
+		kwargs['exif'] = b'Exif\x00\x00MM\x00*\x00\x00\x00\x08' + ifd + b'\x00' * 4
+	Image.new('RGB', size, (200, 30, 30)).save(buffer, 'JPEG', **kwargs)
+
+	return buffer.getvalue()
+
+
+class MediaRootMixin:
+
+	def setUp(self):
+		super().setUp()
+		self.media_root = tempfile.mkdtemp()
+		self.override = override_settings(MEDIA_ROOT=self.media_root)
+		self.override.enable()
+
+	def tearDown(self):
+		self.override.disable()
+		shutil.rmtree(self.media_root)
+		super().tearDown()
+
+
+class ImageVariantTests(MediaRootMixin, TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.recipe = Recipe.objects.create(
+				user=self.user,
+				title='Tinola',
+				time_minutes=30,
+				price=5.00
+			)
+
+	def store(self, content):
+		self.recipe.image.save('photo.jpg', ContentFile(content))
+
+		return self.recipe.image.name
+
+	def test_variants_resized_rotated_and_stripped(self):
+		name = self.store(jpeg_bytes(orientation=6))
+
+		paths = images.generate_variants(name)
+
+		self.assertEqual(
+				set(paths),
+				{'thumb', 'thumb_webp', 'medium', 'medium_webp'}
+			)
+		with default_storage.open(paths['thumb']) as fp:
+			thumb = Image.open(fp)
+			thumb.load()
+		self.assertEqual(thumb.format, 'JPEG')
+		# 400x200 rotated a quarter turn fits 200px as 100x200.
+		self.assertEqual(thumb.size, (100, 200))
+		self.assertNotIn('exif', thumb.info)
+
+		with default_storage.open(paths['medium_webp']) as fp:
+			self.assertEqual(Image.open(fp).format, 'WEBP')
+
+	def test_process_records_variants_and_bumps_version(self):
+		self.store(jpeg_bytes())
+		version = user_data_version(self.user.pk)
+
+		images.process_recipe_image(self.recipe.pk)
+
+		self.recipe.refresh_from_db()
+		self.assertEqual(len(self.recipe.variants), 4)
+		self.assertTrue(default_storage.exists(self.recipe.variants['thumb']))
+		self.assertNotEqual(user_data_version(self.user.pk), version)
+
+	def test_replaced_image_discards_variants(self):
+		self.store(jpeg_bytes())
+		real_generate = images.generate_variants
+
+		def replace_during_processing(name):
+			paths = real_generate(name)
+			Recipe.objects.filter(pk=self.recipe.pk).update(image='other.jpg')
+			return paths
+
+		with patch('core.images.generate_variants', replace_during_processing):
+			images.process_recipe_image(self.recipe.pk)
+
+		self.recipe.refresh_from_db()
+		self.assertEqual(self.recipe.variants, {})
+
+	def test_stale_variants_deleted(self):
+		stale = default_storage.save('uploads/recipe/old_thumb.jpg',
+									 ContentFile(jpeg_bytes()))
+
+		images.process_recipe_image(self.recipe.pk, (stale,))
+
+		self.assertFalse(default_storage.exists(stale))
+
+	def test_requeue_images_processes_recipes_without_variants(self):
+		self.store(jpeg_bytes())
+		Recipe.objects.create(
+			user=self.user, title='No image', time_minutes=5, price=1
+		)
+		Recipe.objects.create(
+			user=self.user, title='Null image', time_minutes=5, price=1
+		)
+		Recipe.objects.filter(title='Null image').update(image=None)
+		out = io.StringIO()
+
+		with patch('core.images._queue', images.SyncQueue()):
+			call_command('requeue_images', stdout=out)
+			call_command('requeue_images', stdout=out)
+
+		self.recipe.refresh_from_db()
+		self.assertEqual(len(self.recipe.variants), 4)
+		self.assertEqual(
+			out.getvalue().splitlines(), ['Queued 1 recipes', 'Queued 0 recipes']
+		)
+
+
+@override_settings(IMAGE_PIPELINE={'QUEUE': 'core.images.SyncQueue'})
+class ImagePipelineUploadTests(MediaRootMixin, TransactionTestCase):
+
+	def setUp(self):
+		super().setUp()
+		images._queue = None
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		self.recipe = Recipe.objects.create(
+				user=self.user,
+				title='Tinola',
+				time_minutes=30,
+				price=5.00
+			)
+
+	def tearDown(self):
+		images._queue = None
+		super().tearDown()
+
+	def test_upload_queues_variants_after_commit(self):
+		url = reverse('recipe:recipe-upload-image', args=[self.recipe.id])
+		upload = ContentFile(jpeg_bytes(), name='photo.jpg')
+
+		res = self.client.post(url, {'image': upload}, format='multipart')
+
+		self.assertEqual(res.status_code, 200)
+		self.recipe.refresh_from_db()
+		self.assertEqual(len(self.recipe.variants), 4)
+
+		res = self.client.get(reverse('recipe:recipe-detail', args=[self.recipe.id]))
+		self.assertTrue(
+			res.data['image_variants']['thumb'].startswith('http://testserver/media/')
+		)
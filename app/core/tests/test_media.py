@@ -0,0 +1,114 @@
+import os
+import uuid
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core.tests.test_images import MediaRootMixin
+
+
+CONTENT = bytes(range(256)) * 4
+
+
+def media_url(path):
+	return reverse('media', args=[path])
+
+
+class MediaServingTests(MediaRootMixin, SimpleTestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.path = f'uploads/recipe/{uuid.uuid4()}.jpg'
+		full_path = os.path.join(self.media_root, self.path)
+		os.makedirs(os.path.dirname(full_path))
+		with open(full_path, 'wb') as fp:
+			fp.write(CONTENT)
+
+	def get(self, path=None, **headers):
+		return self.client.get(media_url(path or self.path), **headers)
+
+	def test_serves_file_with_immutable_cache_headers(self):
+		res = self.get()
+
+		self.assertEqual(res.status_code, 200)
+		self.assertEqual(b''.join(res.streaming_content), CONTENT)
+		self.assertEqual(res['Content-Type'], 'image/jpeg')
+		self.assertEqual(res['Content-Length'], str(len(CONTENT)))
+		self.assertEqual(res['Accept-Ranges'], 'bytes')
+		self.assertIn('immutable', res['Cache-Control'])
+		self.assertTrue(res.has_header('ETag'))
+		self.assertTrue(res.has_header('Last-Modified'))
+
+	def test_files_not_named_by_uuid_are_revalidated(self):
+		with open(os.path.join(self.media_root, 'logo.png'), 'wb') as fp:
+			fp.write(CONTENT)
+
+		res = self.get('logo.png')
+
+		self.assertEqual(res['Cache-Control'], 'public, max-age=0')
+
+	def test_missing_and_escaping_paths_are_404(self):
+		self.assertEqual(self.get('uploads/recipe/nope.jpg').status_code, 404)
+		self.assertEqual(self.get('uploads/recipe').status_code, 404)
+		self.assertEqual(self.get('../etc/passwd').status_code, 404)
+
+	def test_conditional_get(self):
+		res = self.get()
+
+		by_etag = self.get(HTTP_IF_NONE_MATCH=res['ETag'])
+		by_date = self.get(HTTP_IF_MODIFIED_SINCE=res['Last-Modified'])
+
+		self.assertEqual(by_etag.status_code, 304)
+		self.assertEqual(by_date.status_code, 304)
+		self.assertEqual(by_etag['ETag'], res['ETag'])
+
+	def test_byte_ranges(self):
+		cases = {
+			'bytes=0-9': (0, 9),
+			'bytes=1000-': (1000, 1023),
+			'bytes=-24': (1000, 1023),
+			'bytes=1020-5000': (1020, 1023),
+		}
+		for header, (start, end) in cases.items():
+			res = self.get(HTTP_RANGE=header)
+
+			self.assertEqual(res.status_code, 206, header)
+			self.assertEqual(
+				b''.join(res.streaming_content), CONTENT[start:end + 1]
+			)
+			self.assertEqual(res['Content-Range'], f'bytes {start}-{end}/1024')
+			self.assertEqual(res['Content-Length'], str(end - start + 1))
+
+	def test_unsatisfiable_and_ignored_ranges(self):
+		unsatisfiable = self.get(HTTP_RANGE='bytes=2000-')
+		multiple = self.get(HTTP_RANGE='bytes=0-1,5-6')
+		stale = self.get(HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"other"')
+
+		self.assertEqual(unsatisfiable.status_code, 416)
+		self.assertEqual(unsatisfiable['Content-Range'], 'bytes */1024')
+		self.assertEqual(multiple.status_code, 200)
+		self.assertEqual(stale.status_code, 200)
+
+	def test_if_range_matching_etag_allows_range(self):
+		etag = self.get()['ETag']
+
+		res = self.get(HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE=etag)
+
+		self.assertEqual(res.status_code, 206)
+
+	def test_offload_modes_send_only_headers(self):
+		with override_settings(MEDIA_SERVING={'MODE': 'x-accel'}):
+			accel = self.get()
+		with override_settings(MEDIA_SERVING={'MODE': 'x-sendfile'}):
+			sendfile = self.get()
+
+		self.assertEqual(accel['X-Accel-Redirect'], f'/protected-media/{self.path}')
+		self.assertEqual(accel.content, b'')
+		self.assertFalse(accel.has_header('Content-Type'))
+		self.assertEqual(
+			sendfile['X-Sendfile'], os.path.join(self.media_root, self.path)
+		)
+		self.assertIn('immutable', sendfile['Cache-Control'])
+
+	def test_writes_are_not_allowed(self):
+		self.assertEqual(self.client.post(media_url(self.path)).status_code, 405)
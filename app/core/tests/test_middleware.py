@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.metrics import registry
+from core.models import Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+METRICS_URL = reverse('metrics')
+
+
+class InstrumentationMiddlewareTests(TestCase):
+
+	def setUp(self):
+		registry.reset()
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		recipe = Recipe.objects.create(
+				user=self.user,
+				title='Tinola',
+				time_minutes=30,
+				price=5.00
+			)
+		recipe.tags.add(Tag.objects.create(user=self.user, name='Soup'))
+
+	def test_server_timing_header(self):
+		res = self.client.get(RECIPES_URL)
+
+		timing = res['Server-Timing']
+		self.assertIn('db;dur=', timing)
+		self.assertIn('desc="3 queries"', timing)
+		self.assertIn('serializer;dur=', timing)
+		self.assertIn('total;dur=', timing)
+
+	def test_metrics_grouped_by_route(self):
+		self.client.get(RECIPES_URL)
+		self.client.get(RECIPES_URL, {'page_size': 1})
+		self.client.get('/no/such/page')
+
+		routes, statuses = registry.snapshot()
+
+		self.assertEqual(routes['recipe:recipe-list'].count, 2)
+		self.assertEqual(routes['recipe:recipe-list'].queries, 6)
+		self.assertGreater(routes['recipe:recipe-list'].stages['serializer'], 0)
+		self.assertEqual(statuses[('unmatched', 'GET', 404)], 1)
+
+	def test_prometheus_endpoint(self):
+		self.client.get(RECIPES_URL)
+
+		res = self.client.get(METRICS_URL)
+
+		self.assertEqual(res.status_code, 200)
+		text = res.content.decode('utf-8')
+		self.assertIn('http_requests_total{route="recipe:recipe-list",'
+					  'method="GET",status="200"', text)
+		self.assertIn('http_request_duration_seconds_count{'
+					  'route="recipe:recipe-list"', text)
+		self.assertIn('http_request_db_queries_total{'
+					  'route="recipe:recipe-list"', text)
+		self.assertIn('token_cache_hits{', text)
+
+	@override_settings(INSTRUMENTATION={'METRICS_TOKEN': 'secret'})
+	def test_metrics_token(self):
+		client = APIClient()
+
+		self.assertEqual(client.get(METRICS_URL).status_code, 403)
+		res = client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+		self.assertEqual(res.status_code, 200)
+
+	def test_slow_requests_profiled(self):
+		directory = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, directory)
+		options = {
+			'PROFILE_SAMPLE_RATE': 1,
+			'PROFILE_SLOW_MS': 0,
+			'PROFILE_DIR': directory,
+		}
+
+		with override_settings(INSTRUMENTATION=options):
+			client = APIClient()
+			client.force_authenticate(self.user)
+			res = client.get(RECIPES_URL)
+
+		self.assertTrue(res['X-Profile'].startswith('recipe-recipe-list-'))
+		self.assertEqual(os.listdir(directory), [res['X-Profile']])
+
+	def test_not_profiled_by_default(self):
+		res = self.client.get(RECIPES_URL)
+
+		self.assertFalse(res.has_header('X-Profile'))
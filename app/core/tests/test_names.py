@@ -0,0 +1,112 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Ingredient, Recipe, Tag
+from core import names
+from core.names import upsert_names
+
+
+class UpsertNamesTests(TestCase):
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+
+	def test_get_or_create_ignoring_case(self):
+		soup = Tag.objects.create(user=self.user, name='Soup')
+
+		found, created = upsert_names(Tag, self.user, ['SOUP', 'Quick', 'quick'])
+
+		self.assertEqual(set(found), {'SOUP', 'Quick', 'quick'})
+		self.assertEqual(found['SOUP'], soup)
+		self.assertEqual(found['quick'], found['Quick'])
+		self.assertEqual(created, {found['quick'].pk})
+		self.assertEqual(found['quick'].name, 'Quick')
+		self.assertEqual(Tag.objects.count(), 2)
+
+	def test_without_returning(self):
+		Tag.objects.create(user=self.user, name='Soup')
+
+		with patch.object(names, 'can_return_rows', lambda: False):
+			found, created = upsert_names(Tag, self.user, ['soup', 'Quick'])
+
+		self.assertEqual(created, {found['Quick'].pk})
+		self.assertEqual(Tag.objects.count(), 2)
+
+	def test_non_ascii_names_use_database_keys(self):
+		eclair = Tag.objects.create(user=self.user, name='Éclair')
+
+		for returning in (True, False):
+			with patch.object(names, 'can_return_rows', lambda: returning):
+				found, created = upsert_names(Tag, self.user, ['ÉCLAIR'])
+
+			self.assertEqual(found, {'ÉCLAIR': eclair})
+			self.assertEqual(created, set())
+
+
+class MergeDuplicateNamesTests(TestCase):
+
+	def setUp(self):
+		# Rows from before the unique index existed
+		with connection.cursor() as cursor:
+			cursor.execute('DROP INDEX tag_user_lower_name_uniq')
+
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.keep = Tag.objects.create(user=self.user, name='Soup')
+		self.dupes = [
+			Tag.objects.create(user=self.user, name=name)
+			for name in ('soup', 'SOUP')
+		]
+		self.other = Tag.objects.create(user=self.user, name='Quick')
+
+		self.both = Recipe.objects.create(
+				user=self.user,
+				title='Tinola',
+				time_minutes=30,
+				price=5
+			)
+		self.both.tags.add(self.keep, *self.dupes, self.other)
+		self.dupe_only = Recipe.objects.create(
+				user=self.user,
+				title='Sinigang',
+				time_minutes=30,
+				price=5
+			)
+		self.dupe_only.tags.add(*self.dupes)
+
+	def test_merge(self):
+		out = StringIO()
+		call_command('merge_duplicate_names', stdout=out)
+
+		self.assertIn('Merged 2 duplicate tags across 2 recipes', out.getvalue())
+		self.assertEqual(
+			set(Tag.objects.values_list('id', flat=True)),
+			{self.keep.id, self.other.id}
+		)
+		self.assertEqual(
+			list(self.both.tags.order_by('id')),
+			[self.keep, self.other]
+		)
+		self.assertEqual(list(self.dupe_only.tags.all()), [self.keep])
+
+		self.keep.refresh_from_db()
+		self.assertEqual(self.keep.recipe_count, 2)
+
+	def test_dry_run(self):
+		out = StringIO()
+		call_command('merge_duplicate_names', '--dry-run', stdout=out)
+
+		self.assertIn('2 duplicate tags', out.getvalue())
+		self.assertIn('0 duplicate ingredients', out.getvalue())
+		self.assertEqual(Tag.objects.count(), 4)
+		self.assertEqual(Ingredient.objects.count(), 0)
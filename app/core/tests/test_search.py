@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import search
+from core.models import Ingredient, Recipe, RecipeSearchTerm, Tag
+
+
+class SearchIndexTests(TestCase):
+	"""The fallback inverted index follows every change to a document"""
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.recipe = Recipe.objects.create(
+				user=self.user,
+				title='Chicken Tinola',
+				time_minutes=30,
+				price=5.00
+			)
+
+	def terms(self, recipe=None):
+		return dict(
+			RecipeSearchTerm.objects.filter(recipe=recipe or self.recipe)
+									.values_list('term', 'weight')
+		)
+
+	def test_title_indexed_on_create(self):
+		self.assertEqual(
+			self.terms(),
+			{'chicken': search.TITLE_WEIGHT, 'tinola': search.TITLE_WEIGHT}
+		)
+
+	def test_title_change_reindexes(self):
+		self.recipe.title = 'Pork Adobo'
+		self.recipe.save()
+
+		self.assertEqual(set(self.terms()), {'pork', 'adobo'})
+
+	def test_unchanged_title_skips_reindex(self):
+		recipe = Recipe.objects.get(pk=self.recipe.pk)
+		recipe.price = 7
+
+		with self.assertNumQueries(1):
+			recipe.save()
+
+	def test_links_and_renames_reindex(self):
+		tag = Tag.objects.create(user=self.user, name='Soup')
+		ginger = Ingredient.objects.create(user=self.user, name='Ginger')
+
+		self.recipe.tags.add(tag)
+		ginger.recipe_set.add(self.recipe)
+		self.assertEqual(self.terms()['soup'], search.TAG_WEIGHT)
+		self.assertEqual(self.terms()['ginger'], search.INGREDIENT_WEIGHT)
+
+		tag.name = 'Stew'
+		tag.save()
+		self.assertIn('stew', self.terms())
+		self.assertNotIn('soup', self.terms())
+
+		ginger.delete()
+		self.assertNotIn('ginger', self.terms())
+
+		tag.recipe_set.clear()
+		self.assertNotIn('stew', self.terms())
+
+	def test_highest_weight_kept(self):
+		self.recipe.tags.add(Tag.objects.create(user=self.user, name='Chicken'))
+
+		self.assertEqual(self.terms()['chicken'], search.TITLE_WEIGHT)
+
+	def test_search_matches_all_words_ranked(self):
+		tagged = Recipe.objects.create(
+				user=self.user,
+				title='Tinola',
+				time_minutes=30,
+				price=5.00
+			)
+		tagged.tags.add(Tag.objects.create(user=self.user, name='Chicken'))
+		Recipe.objects.create(
+				user=self.user,
+				title='Chicken Adobo',
+				time_minutes=30,
+				price=5.00
+			)
+
+		found = search.search_recipes(
+			Recipe.objects.all(), self.user, 'tinola CHICKEN'
+		).order_by('-search_rank')
+
+		self.assertEqual(
+			[(recipe, recipe.search_rank) for recipe in found],
+			[(self.recipe, 6), (tagged, 5)]
+		)
@@ -0,0 +1,41 @@
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_safe
+
+from core.admission import admission
+from core.authentication import token_cache
+from core.media import serve_media
+from core.metrics import instrumentation_settings, render_prometheus
+
+
+def metrics(request):
+	"""Prometheus scrape endpoint for this process's request metrics
+
+	When INSTRUMENTATION['METRICS_TOKEN'] is set the scraper must send it
+	as `Authorization: Bearer <token>`.
+	"""
+	token = instrumentation_settings()['METRICS_TOKEN']
+	if token:
+		header = request.META.get('HTTP_AUTHORIZATION', '')
+		if not constant_time_compare(header, f'Bearer {token}'):
+			return HttpResponseForbidden()
+
+	extra = {
+		f'token_cache_{name}': value
+		for name, value in token_cache.stats().items()
+	}
+	extra.update(
+		(f'admission_{name}', value)
+		for name, value in admission.stats().items()
+	)
+
+	return HttpResponse(
+		render_prometheus(extra),
+		content_type='text/plain; version=0.0.4; charset=utf-8'
+	)
+
+
+@require_safe
+def media(request, path):
+	"""Recipe images and other MEDIA_ROOT files, see core.media"""
+	return serve_media(request, path)
@@ -0,0 +1,32 @@
+"""
+Gunicorn settings for the production profile, see docker-compose.prod.yml
+
+    gunicorn app.wsgi:application
+
+Every value can be overridden from the environment.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Every worker thread holds one persistent database connection
+# (CONN_MAX_AGE), so `workers * threads` is also the number of connections
+# per container. The production profile runs gthread workers so admission
+# control (core.admission) has concurrent requests to limit in each worker.
+workers = int(os.environ.get(
+    'WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1
+))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then so slow leaks cannot build up, staggered so
+# they do not all restart at once.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+accesslog = '-'
@@ -0,0 +1,150 @@
+"""Case-insensitive prefix lookups on tag and ingredient names
+
+Each process keeps a small LRU of per-user tries, built from one ranked
+query and tagged with the user's data version (core.cache), so any write
+rebuilds it on the next keystroke. Every trie node holds the best ranked
+names below it, which makes a lookup one walk down the prefix. Users with
+more names than MAX_NAMES are not cached and go to the database, where
+the (user_id, lower(name) text_pattern_ops) index from migration 0011
+serves the prefix match.
+
+Memory is bounded by MAX_NODES trie nodes per process, about 450 bytes
+each on 64-bit CPython with the entries they share, so some 45 MB at the
+default of 100000; least recently used tries are evicted to stay under
+it, and a single trie over it is not cached. 2000 names of two words make
+about 22000 nodes.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+from core.cache import user_data_version
+
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Cached in place of a trie for users with too many names
+TOO_LARGE = object()
+
+
+def ranked_names(model, user, prefix=None):
+	"""{'id', 'name'} of `user`'s objects, the most used ones first"""
+	queryset = model.objects.filter(user=user)
+	if prefix:
+		queryset = queryset.annotate(lower_name=Lower('name')) \
+						   .filter(lower_name__startswith=prefix.lower())
+
+	return queryset.annotate(usage=Count('recipe')) \
+				   .order_by('-usage', Lower('name'), 'id') \
+				   .values('id', 'name')
+
+
+class PrefixTrie:
+	"""Lowercased names -> the first `keep` of `entries` under each prefix"""
+
+	def __init__(self, entries, keep=MAX_LIMIT):
+		# A node is [children by character, entries in rank order].
+		self.root = [{}, []]
+		self.nodes = 1
+		for entry in entries:
+			node = self.root
+			self._add(node, entry, keep)
+			for char in entry['name'].lower():
+				child = node[0].get(char)
+				if child is None:
+					child = node[0][char] = [{}, []]
+					self.nodes += 1
+				node = child
+				self._add(node, entry, keep)
+
+	@staticmethod
+	def _add(node, entry, keep):
+		if len(node[1]) < keep:
+			node[1].append(entry)
+
+	def search(self, prefix, limit):
+		node = self.root
+		for char in prefix.lower():
+			node = node[0].get(char)
+			if node is None:
+				return []
+
+		return node[1][:limit]
+
+
+def trie_nodes(trie):
+	return 0 if trie is TOO_LARGE else trie.nodes
+
+
+class AutocompleteCache:
+	"""Process-local LRU of (model, user) -> (data version, PrefixTrie)
+
+	Bounded by `max_users` tries and `max_nodes` trie nodes in total.
+	"""
+
+	def __init__(self, max_users=1000, max_names=2000, max_nodes=100000):
+		self.max_users = max_users
+		self.max_names = max_names
+		self.max_nodes = max_nodes
+		self.nodes = 0
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	@classmethod
+	def from_settings(cls):
+		options = getattr(settings, 'AUTOCOMPLETE', {})
+
+		return cls(
+			max_users=options.get('MAX_USERS', 1000),
+			max_names=options.get('MAX_NAMES', 2000),
+			max_nodes=options.get('MAX_NODES', 100000)
+		)
+
+	def trie(self, model, user):
+		key = (model._meta.label, user.pk)
+		version = user_data_version(user.pk)
+
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None and entry[0] == version:
+				self._entries.move_to_end(key)
+				return entry[1]
+
+		entries = list(ranked_names(model, user)[:self.max_names + 1])
+		trie = TOO_LARGE
+		if len(entries) <= self.max_names:
+			built = PrefixTrie(entries)
+			if built.nodes <= self.max_nodes:
+				trie = built
+
+		with self._lock:
+			old = self._entries.pop(key, None)
+			if old is not None:
+				self.nodes -= trie_nodes(old[1])
+			self._entries[key] = (version, trie)
+			self.nodes += trie_nodes(trie)
+			while len(self._entries) > self.max_users or \
+					self.nodes > self.max_nodes:
+				_, (_, evicted) = self._entries.popitem(last=False)
+				self.nodes -= trie_nodes(evicted)
+
+		return trie
+
+	def complete(self, model, user, prefix, limit=DEFAULT_LIMIT):
+		trie = self.trie(model, user)
+		if trie is TOO_LARGE:
+			return list(ranked_names(model, user, prefix)[:limit])
+
+		return trie.search(prefix, limit)
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+			self.nodes = 0
+
+
+autocomplete_cache = AutocompleteCache.from_settings()
@@ -0,0 +1,424 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Value, When, prefetch_related_objects
+from django.db.models.functions import Cast
+
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from core.cache import bump_user_data_version
+from core.counts import refresh_recipe_counts
+from core.names import upsert_names
+from core.search import reindex_for, reindex_recipes
+
+
+def batches(items, size):
+	items = list(items)
+	for start in range(0, len(items), size):
+		yield items[start:start + size]
+
+
+def batch_size(model, objs):
+	"""Largest insert batch the backend accepts, capped at 1000 rows"""
+	return min(1000, connection.ops.bulk_batch_size(
+		model._meta.concrete_fields, objs
+	))
+
+
+def insert_rows(model, objs):
+	"""Insert `objs` and make sure each ends up with a primary key
+
+	Postgres returns ids from a multi-row INSERT, SQLite does not, so there
+	the rows are saved one by one inside the surrounding transaction.
+	"""
+	if not objs:
+		return objs
+
+	if connection.features.can_return_ids_from_bulk_insert:
+		model.objects.bulk_create(objs, batch_size=batch_size(model, objs))
+	else:
+		for obj in objs:
+			obj.save(force_insert=True)
+
+	return objs
+
+
+def update_rows(model, objs, field_names):
+	"""UPDATE ... SET field = CASE id WHEN ... END, one statement per batch
+
+	The CASE is cast back to the column type since Postgres otherwise types
+	the parameters as text.
+	"""
+	fields = [model._meta.get_field(name) for name in field_names]
+	if not objs or not fields:
+		return
+
+	for batch in batches(objs, 500):
+		values = {
+			field.attname: Cast(
+				Case(
+					*[
+						When(
+							pk=obj.pk,
+							then=Value(getattr(obj, field.attname), output_field=field)
+						)
+						for obj in batch
+					],
+					output_field=field
+				),
+				output_field=field
+			)
+			for field in fields
+		}
+		model.objects.filter(pk__in=[obj.pk for obj in batch]).update(**values)
+
+
+def delete_rows(model, column, ids):
+	"""DELETE ... WHERE column IN ids, bypassing the ORM's collector
+
+	QuerySet.delete() sends pre/post_delete for every row once a receiver is
+	connected, and reads the rows first to do so.
+	"""
+	if not ids:
+		return 0
+
+	quote = connection.ops.quote_name
+	placeholders = ', '.join(['%s'] * len(ids))
+	with connection.cursor() as cursor:
+		cursor.execute(
+			f'DELETE FROM {quote(model._meta.db_table)} '
+			f'WHERE {quote(column)} IN ({placeholders})',
+			list(ids)
+		)
+		return cursor.rowcount
+
+
+def set_prefetched(obj, name, related):
+	"""Fill a many-to-many prefetch cache without querying"""
+	queryset = getattr(obj, name).get_queryset()
+	queryset._result_cache = list(related)
+	queryset._prefetch_done = True
+
+	if not hasattr(obj, '_prefetched_objects_cache'):
+		obj._prefetched_objects_cache = {}
+	obj._prefetched_objects_cache[name] = queryset
+
+
+class BulkWriter:
+	"""Set-based create, update and delete for one user's objects
+
+	Rows go in with multi-row INSERTs and CASE updates, and many-to-many
+	links are written straight into the through tables, all inside the
+	caller's transaction. Model signals are not sent for bulk writes, so
+	recipe counts and the search index are refreshed and the user's data
+	version bumped once at the end.
+	"""
+
+	def __init__(self, model, user):
+		self.model = model
+		self.user = user
+
+	def relations(self, names):
+		return [
+			field for field in self.model._meta.many_to_many
+			if field.name in names
+		]
+
+	def check_related_ids(self, relations, items):
+		"""Every linked id must exist and belong to the user, one query each"""
+		errors = {}
+		for field in relations:
+			ids = {pk for item in items for pk in item.get(field.name, ())}
+			found = set()
+			for batch in batches(ids, 500):
+				found.update(
+					field.related_model.objects.filter(user=self.user, id__in=batch)
+												 .values_list('id', flat=True)
+				)
+			missing = sorted(ids - found)
+			if missing:
+				errors[field.name] = [f'Invalid pk "{pk}" - object does not exist.'
+									  for pk in missing]
+
+		if errors:
+			raise serializers.ValidationError(errors)
+
+	def split(self, relations, item):
+		names = {field.name for field in relations}
+		values = {key: value for key, value in item.items() if key not in names}
+		links = {field.name: item[field.name] for field in relations
+				 if field.name in item}
+
+		return values, links
+
+	def link(self, relations, objs, links, replace=False):
+		"""Write the links in `links`, replacing existing ones if asked
+
+		Objects get their prefetch cache filled from the written links, so
+		serializing them afterwards runs no queries. Related rows that gained
+		or lost links get their recipe_count refreshed.
+		"""
+		for field in relations:
+			through = field.remote_field.through
+			source = field.m2m_column_name()
+			target = field.m2m_reverse_name()
+			changed = [obj for obj, obj_links in zip(objs, links)
+					   if field.name in obj_links]
+
+			touched = set()
+			if replace:
+				for batch in batches(changed, 500):
+					old = through.objects.filter(
+						**{f'{source}__in': [obj.pk for obj in batch]}
+					)
+					touched.update(old.values_list(target, flat=True))
+					old.delete()
+
+			rows = [
+				through(**{source: obj.pk, target: pk})
+				for obj, obj_links in zip(objs, links)
+				for pk in dict.fromkeys(obj_links.get(field.name, ()))
+			]
+			if rows:
+				through.objects.bulk_create(rows, batch_size=batch_size(through, rows))
+				touched.update(getattr(row, target) for row in rows)
+
+			refresh_recipe_counts(field.related_model, touched)
+
+			for obj, obj_links in zip(objs, links):
+				if field.name in obj_links:
+					set_prefetched(obj, field.name, [
+						field.related_model(pk=pk)
+						for pk in dict.fromkeys(obj_links[field.name])
+					])
+
+	def create(self, items, names, check=True):
+		relations = self.relations(names)
+		if check:
+			self.check_related_ids(relations, items)
+
+		objs, links = [], []
+		for item in items:
+			values, obj_links = self.split(relations, item)
+			objs.append(self.model(user=self.user, **values))
+			links.append(obj_links)
+
+		insert_rows(self.model, objs)
+		for obj, obj_links in zip(objs, links):
+			obj_links.update({
+				field.name: [] for field in relations if field.name not in obj_links
+			})
+		self.link(relations, objs, links)
+		reindex_for(self.model, [obj.pk for obj in objs])
+		bump_user_data_version(self.user.pk)
+
+		return objs
+
+	def update(self, instances, items, names, check=True):
+		relations = self.relations(names)
+		if check:
+			self.check_related_ids(relations, items)
+
+		links, fields = [], set()
+		for obj, item in zip(instances, items):
+			values, obj_links = self.split(relations, item)
+			for key, value in values.items():
+				setattr(obj, key, value)
+			fields.update(values)
+			links.append(obj_links)
+
+		update_rows(self.model, instances, sorted(fields))
+		self.link(relations, instances, links, replace=True)
+
+		# Untouched relations still need reading once for the response.
+		unchanged = [
+			field.name for field in relations
+			if any(field.name not in obj_links for obj_links in links)
+		]
+		for obj in instances:
+			for name in unchanged:
+				getattr(obj, '_prefetched_objects_cache', {}).pop(name, None)
+		prefetch_related_objects(instances, *unchanged)
+
+		reindex_for(self.model, [obj.pk for obj in instances])
+		bump_user_data_version(self.user.pk)
+
+		return instances
+
+	def delete(self, ids):
+		"""Delete the user's rows among `ids` along with their links
+
+		Per batch, the ids linked through each many-to-many table are read
+		with one query, then the link rows, the rows cascading from the
+		deleted ones (the search index) and the rows themselves go with one
+		DELETE each.
+		"""
+		deleted = 0
+		recounted = defaultdict(set)
+		reindexed = set()
+		for batch in batches(ids, 500):
+			pks = list(
+				self.model.objects.filter(user=self.user, id__in=batch)
+								  .values_list('id', flat=True)
+			)
+			if not pks:
+				continue
+
+			for field in self.model._meta.many_to_many:
+				through = field.remote_field.through
+				source = field.m2m_column_name()
+				target = field.m2m_reverse_name()
+				recounted[field.related_model].update(
+					through.objects.filter(**{f'{source}__in': pks})
+								   .values_list(target, flat=True)
+				)
+				delete_rows(through, source, pks)
+
+			for rel in self.model._meta.related_objects:
+				if rel.many_to_many:
+					through = rel.through
+					source = rel.field.m2m_reverse_name()
+					target = rel.field.m2m_column_name()
+					reindexed.update(
+						through.objects.filter(**{f'{source}__in': pks})
+									   .values_list(target, flat=True)
+					)
+					delete_rows(through, source, pks)
+				else:
+					delete_rows(rel.related_model, rel.field.column, pks)
+
+			deleted += delete_rows(self.model, self.model._meta.pk.column, pks)
+
+		for model, related_ids in recounted.items():
+			refresh_recipe_counts(model, related_ids)
+		reindex_recipes(reindexed)
+		bump_user_data_version(self.user.pk)
+
+		return deleted
+
+
+class NamedBulkWriter(BulkWriter):
+	"""BulkWriter for tags and ingredients, whose names are unique per user
+
+	Creates are upserts: names that already exist in any case return the
+	existing object. Renames onto a taken name fail validation.
+	"""
+
+	def create(self, items, names, check=True):
+		found, _ = upsert_names(
+			self.model, self.user, [item['name'] for item in items]
+		)
+
+		return [found[item['name']] for item in items]
+
+	def update(self, instances, items, names, check=True):
+		try:
+			with transaction.atomic():
+				return super().update(instances, items, names, check)
+		except IntegrityError:
+			raise serializers.ValidationError(
+				{'name': ['Names must be unique, ignoring case.']}
+			)
+
+
+class BulkModelMixin:
+	"""Adds `<prefix>/bulk/` taking a list body
+
+	POST creates, PUT/PATCH update (each item carries its `id`) and DELETE
+	removes a list of ids. The whole batch is validated before anything is
+	written, and everything runs in one transaction.
+	"""
+
+	bulk_writer_class = BulkWriter
+
+	def get_bulk_serializer(self, *args, **kwargs):
+		child = self.get_serializer_class()(context=self.get_serializer_context())
+		relations = {field.name for field in child.Meta.model._meta.many_to_many}
+
+		# Related ids are checked for the whole batch at once by BulkWriter
+		# instead of one query per id in PrimaryKeyRelatedField.
+		for name in relations & set(child.fields):
+			child.fields[name] = serializers.ListField(
+				child=serializers.IntegerField(),
+				required=False
+			)
+
+		return serializers.ListSerializer(*args, child=child, **kwargs)
+
+	def get_bulk_items(self, request):
+		data = request.data
+		max_items = getattr(settings, 'BULK_MAX_ITEMS', 5000)
+
+		if not isinstance(data, list):
+			raise serializers.ValidationError(
+				{'non_field_errors': ['Expected a list of items.']}
+			)
+		if len(data) > max_items:
+			raise serializers.ValidationError(
+				{'non_field_errors': [f'At most {max_items} items per request.']}
+			)
+
+		return data
+
+	def get_bulk_instances(self, ids):
+		instances = {}
+		for batch in batches(ids, 500):
+			instances.update(
+				(obj.pk, obj) for obj in
+				self.queryset.model.objects.filter(user=self.request.user, id__in=batch)
+			)
+
+		missing = [pk for pk in ids if pk not in instances]
+		if missing:
+			raise serializers.ValidationError(
+				{'id': [f'Invalid pk "{pk}" - object does not exist.' for pk in missing]}
+			)
+
+		return [instances[pk] for pk in ids]
+
+	@action(methods=['POST', 'PUT', 'PATCH', 'DELETE'], detail=False)
+	def bulk(self, request):
+		items = self.get_bulk_items(request)
+		writer = self.bulk_writer_class(self.queryset.model, request.user)
+
+		if request.method == 'DELETE':
+			ids = serializers.ListField(child=serializers.IntegerField()) \
+							 .run_validation(items)
+			with transaction.atomic():
+				writer.delete(ids)
+			return Response(status=status.HTTP_204_NO_CONTENT)
+
+		if request.method == 'POST':
+			serializer = self.get_bulk_serializer(data=items)
+			serializer.is_valid(raise_exception=True)
+			with transaction.atomic():
+				objs = writer.create(
+					serializer.validated_data, serializer.child.fields
+				)
+			return Response(
+				self.get_serializer(objs, many=True).data,
+				status=status.HTTP_201_CREATED
+			)
+
+		ids = serializers.ListField(child=serializers.IntegerField()).run_validation(
+			[item.get('id') if isinstance(item, dict) else None for item in items]
+		)
+		if len(set(ids)) != len(ids):
+			raise serializers.ValidationError({'id': ['Duplicate ids.']})
+
+		with transaction.atomic():
+			instances = self.get_bulk_instances(ids)
+			serializer = self.get_bulk_serializer(
+				instances,
+				data=items,
+				partial=request.method == 'PATCH'
+			)
+			serializer.is_valid(raise_exception=True)
+			objs = writer.update(
+				instances, serializer.validated_data, serializer.child.fields
+			)
+
+		return Response(self.get_serializer(objs, many=True).data)
@@ -0,0 +1,66 @@
+import csv
+import json
+
+from core.models import Recipe
+from recipe.readers import RecipeReader, recipe_values
+from recipe.selection import FieldSelection, RELATION_FIELDS
+
+
+def export_recipes(user, chunk_size=500):
+	"""Yield every recipe of `user` with its tags and ingredients
+
+	Recipes are read a page at a time by id (`id > last ORDER BY id LIMIT
+	chunk_size`, served by the (user, id) index) and their relations are
+	fetched per page, so memory stays bounded by `chunk_size` whatever the
+	library size, with or without server-side cursors. Rows come out in the
+	same shape as RecipeDetailSerializer.
+	"""
+	reader = RecipeReader(selection=FieldSelection(expand=RELATION_FIELDS))
+	recipes = recipe_values(Recipe.objects.filter(user=user).order_by('id'))
+
+	last = 0
+	while True:
+		chunk = list(recipes.filter(id__gt=last)[:chunk_size])
+		if not chunk:
+			return
+
+		yield from reader.build(chunk)
+		if len(chunk) < chunk_size:
+			return
+		last = chunk[-1]['id']
+
+
+def ndjson_lines(recipes):
+	for recipe in recipes:
+		yield json.dumps(recipe, ensure_ascii=False) + '\n'
+
+
+class Echo:
+	"""File-like object whose write() returns the line instead of storing it"""
+
+	def write(self, value):
+		return value
+
+
+def csv_lines(recipes):
+	writer = csv.writer(Echo())
+	yield writer.writerow(
+		('id', 'title', 'time_minutes', 'link', 'ingredients', 'tags', 'price')
+	)
+
+	for recipe in recipes:
+		yield writer.writerow((
+			recipe['id'],
+			recipe['title'],
+			recipe['time_minutes'],
+			recipe['link'],
+			';'.join(item['name'] for item in recipe['ingredients']),
+			';'.join(item['name'] for item in recipe['tags']),
+			recipe['price'],
+		))
+
+
+EXPORT_FORMATS = {
+	'ndjson': (ndjson_lines, 'application/x-ndjson'),
+	'csv': (csv_lines, 'text/csv'),
+}
@@ -0,0 +1,98 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.models import Recipe
+from core.search import search_recipes
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+
+
+def params_to_ints(value, param):
+	"""Convert a comma separated query param such as '1,2,3' to unique ints"""
+	try:
+		ids = {int(part) for part in value.split(',') if part.strip()}
+	except ValueError:
+		raise ValidationError(
+				{param: 'Must be a comma separated list of ids.'}
+			)
+
+	return sorted(ids)
+
+
+class RecipeRelationFilter(BaseFilterBackend):
+	"""Filter recipes by tag and ingredient ids inside the database
+
+	`?tags=1,2` and `?ingredients=3,4` keep recipes linked to any of the ids,
+	or to all of them with `?match=all`. Both params together are ANDed.
+	"Any" matching runs as a subquery on the through table, so a recipe
+	linked to several of the ids is still returned once without DISTINCT.
+	"All" matching joins the through table once per id, which lets the
+	database start from the rarest id instead of grouping every link.
+	"""
+
+	match_param = 'match'
+
+	relations = (
+		('tags', Recipe.tags.through, 'tag_id'),
+		('ingredients', Recipe.ingredients.through, 'ingredient_id'),
+	)
+
+	def get_match(self, request):
+		match = request.query_params.get(self.match_param, MATCH_ANY)
+
+		if match not in (MATCH_ANY, MATCH_ALL):
+			raise ValidationError(
+					{self.match_param: f'Must be "{MATCH_ANY}" or "{MATCH_ALL}".'}
+				)
+
+		return match
+
+	def filter_relation(self, queryset, param, through, column, ids, match):
+		if match == MATCH_ALL:
+			for pk in ids:
+				queryset = queryset.filter(**{param: pk})
+
+			return queryset
+
+		links = through.objects.filter(**{f'{column}__in': ids})
+
+		return queryset.filter(id__in=links.values('recipe_id'))
+
+	def filter_queryset(self, request, queryset, view):
+		match = self.get_match(request)
+
+		for param, through, column in self.relations:
+			value = request.query_params.get(param)
+			if not value:
+				continue
+
+			ids = params_to_ints(value, param)
+			queryset = self.filter_relation(
+					queryset, param, through, column, ids, match
+				)
+
+		return queryset
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+	"""`?search=` full text search over title, tag and ingredient names
+
+	Recipes must match every word and are annotated with `search_rank`;
+	the view pages them by `ordering` so the best matches come first.
+	"""
+
+	search_param = 'search'
+	ordering = ('-search_rank', '-id')
+
+	def get_search_text(self, request):
+		return request.query_params.get(self.search_param, '').strip()
+
+	def filter_queryset(self, request, queryset, view):
+		text = self.get_search_text(request)
+		if not text:
+			return queryset
+
+		return search_recipes(queryset, request.user, text) \
+			.order_by(*self.ordering)
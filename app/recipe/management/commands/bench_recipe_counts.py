@@ -0,0 +1,95 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.benchmark import measure, rolled_back, seed_library
+from core.models import Recipe
+from recipe.views import TagsViewSet
+
+
+SOURCES = ('annotate', 'counter')
+
+
+class Command(BaseCommand):
+	help = 'Compare counting tag usage per request with the stored counter'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--sizes', default='10000,100000',
+			help='Comma separated recipe counts to benchmark'
+		)
+		parser.add_argument('--tags', type=int, default=2000)
+		parser.add_argument('--page-size', type=int, default=100)
+		parser.add_argument('--repeat', type=int, default=20)
+
+	def handle(self, *args, **options):
+		sizes = [int(size) for size in options['sizes'].split(',')]
+		results = []
+
+		for size in sizes:
+			with rolled_back():
+				results.append(self.run_size(size, options))
+
+		self.report(results)
+
+	def run_size(self, size, options):
+		user = get_user_model().objects.create_user(
+			f'bench-{size}@bench.local', 'password1234'
+		)
+		tag_ids, _, recipe_ids = seed_library(user, size, tags=options['tags'])
+
+		with connection.cursor() as cursor:
+			cursor.execute('ANALYZE')
+
+		cases = {
+			'with counts': {'with_counts': '1'},
+			'assigned only': {'assigned_only': '1', 'with_counts': '1'},
+		}
+
+		row = {'size': size, 'cases': {}}
+		for source in SOURCES:
+			for name, params in cases.items():
+				queryset = self.tags(user, params, source)[:options['page_size']]
+				row['cases'][f'{name} ({source})'] = measure(
+					lambda: list(queryset.all()), options['repeat']
+				)
+
+		# What keeping the counter costs each write that links tags
+		recipe = Recipe.objects.get(pk=recipe_ids[0])
+		links = tag_ids[:3]
+		start = time.perf_counter()
+		for _ in range(options['repeat']):
+			recipe.tags.set(links)
+			recipe.tags.clear()
+		row['relink'] = (time.perf_counter() - start) * 1000 / options['repeat']
+
+		return row
+
+	def tags(self, user, params, source):
+		request = Request(APIRequestFactory().get('/', params))
+		request.user = user
+		view = TagsViewSet(request=request, action='list')
+
+		with override_settings(RECIPE_COUNT_SOURCE=source):
+			return view.get_queryset()
+
+	def report(self, results):
+		self.stdout.write('\nrecipes      case                           p50 ms   p99 ms')
+		for row in results:
+			for name, stats in row['cases'].items():
+				self.stdout.write(
+					f"{row['size']:<12} {name:<30} {stats['p50']:>7.2f}  "
+					f"{stats['p99']:>7.2f}"
+				)
+
+		self.stdout.write('\nrecipes      set + clear 3 tags ms')
+		for row in results:
+			self.stdout.write(f"{row['size']:<12} {row['relink']:>7.2f}")
+
+		self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.benchmark import measure, rolled_back, seed_library
+from core.models import Tag, Ingredient, Recipe
+from recipe.filters import RecipeRelationFilter
+
+
+class Command(BaseCommand):
+	help = 'Time ?tags= and ?ingredients= filtering as a library grows'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--sizes', default='1000,10000,100000',
+			help='Comma separated recipe counts to benchmark'
+		)
+		parser.add_argument('--matches', type=int, default=20)
+		parser.add_argument('--repeat', type=int, default=20)
+
+	def handle(self, *args, **options):
+		sizes = [int(size) for size in options['sizes'].split(',')]
+		results = []
+
+		for size in sizes:
+			with rolled_back():
+				results.append(self.run_size(size, options))
+
+		self.report(results)
+
+	def run_size(self, size, options):
+		user = get_user_model().objects.create_user(
+			f'bench-{size}@bench.local', 'password1234'
+		)
+		seed_library(user, size)
+
+		# A tag and an ingredient on a fixed number of recipes, so any growth
+		# in query time comes from the library size and not the result size.
+		recipe_ids = Recipe.objects.filter(user=user) \
+								   .values_list('id', flat=True)[:options['matches']]
+		tag = Tag.objects.create(user=user, name='Selective')
+		ingredient = Ingredient.objects.create(user=user, name='Selective')
+		for recipe in Recipe.objects.filter(id__in=list(recipe_ids)):
+			recipe.tags.add(tag)
+			recipe.ingredients.add(ingredient)
+
+		with connection.cursor() as cursor:
+			cursor.execute('ANALYZE')
+
+		popular_tags = Tag.objects.filter(user=user).order_by('id') \
+								  .values_list('id', flat=True)[:2]
+
+		cases = {
+			'tags': {'tags': str(tag.id)},
+			'tags+ingredients': {
+				'tags': str(tag.id),
+				'ingredients': str(ingredient.id),
+			},
+			'tags all': {
+				'tags': ','.join(str(pk) for pk in list(popular_tags) + [tag.id]),
+				'match': 'all',
+			},
+		}
+
+		row = {'size': size}
+		for name, params in cases.items():
+			queryset = self.filtered(user, params)
+			row[name] = measure(lambda: list(queryset.all()), options['repeat'])
+
+		self.stdout.write(f'\nPlan for {size} recipes:')
+		for name, params in cases.items():
+			self.stdout.write(f'{name}:')
+			self.stdout.write(self.filtered(user, params).explain())
+
+		return row
+
+	def filtered(self, user, params):
+		request = Request(APIRequestFactory().get('/', params))
+		queryset = Recipe.objects.filter(user=user).order_by('-id')
+
+		return RecipeRelationFilter().filter_queryset(request, queryset, None)
+
+	def report(self, results):
+		self.stdout.write('\nrecipes      case                 p50 ms   p99 ms   growth')
+		base = results[0]
+		for row in results:
+			for name, stats in row.items():
+				if name == 'size':
+					continue
+				growth = stats['p50'] / base[name]['p50']
+				self.stdout.write(
+					f"{row['size']:<12} {name:<20} {stats['p50']:>7.2f}  "
+					f"{stats['p99']:>7.2f}  {growth:>6.2f}x "
+					f"(size {row['size'] / base['size']:.0f}x)"
+				)
+
+		self.stdout.write(self.style.SUCCESS('Done'))
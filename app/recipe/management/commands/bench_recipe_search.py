@@ -0,0 +1,103 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.benchmark import measure, rolled_back, seed_library
+from core.models import Recipe
+from core.search import reindex_recipes
+from recipe.filters import RecipeSearchFilter
+
+
+class Command(BaseCommand):
+	help = 'Time ?search= over a seeded library and report index build cost'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--sizes', default='10000,100000',
+			help='Comma separated recipe counts to benchmark'
+		)
+		parser.add_argument('--matches', type=int, default=20)
+		parser.add_argument('--page-size', type=int, default=100)
+		parser.add_argument('--repeat', type=int, default=20)
+
+	def handle(self, *args, **options):
+		sizes = [int(size) for size in options['sizes'].split(',')]
+		results = []
+
+		for size in sizes:
+			with rolled_back():
+				results.append(self.run_size(size, options))
+
+		self.report(results)
+
+	def run_size(self, size, options):
+		user = get_user_model().objects.create_user(
+			f'bench-{size}@bench.local', 'password1234'
+		)
+		_, _, recipe_ids = seed_library(user, size)
+
+		# A word on a fixed number of recipes, so any growth in query time
+		# comes from the library size and not the result size.
+		rare_ids = recipe_ids[:options['matches']]
+		Recipe.objects.filter(id__in=rare_ids).update(title='saffron risotto')
+
+		# seed_library bypasses signals, so build the index in one go.
+		start = time.perf_counter()
+		reindex_recipes(recipe_ids)
+		build = time.perf_counter() - start
+
+		with connection.cursor() as cursor:
+			cursor.execute('ANALYZE')
+
+		cases = {
+			'rare word': 'saffron',
+			'common word': 'chicken',
+			'two words': 'spicy chicken',
+			'tag name': 'tag 1',
+		}
+
+		row = {'size': size, 'build': build, 'cases': {}}
+		for name, text in cases.items():
+			queryset = self.searched(user, text)[:options['page_size']]
+			row['cases'][name] = measure(
+				lambda: list(queryset.all()), options['repeat']
+			)
+
+		self.stdout.write(f'\nPlan for {size} recipes:')
+		for name, text in cases.items():
+			self.stdout.write(f'{name}:')
+			self.stdout.write(
+				self.searched(user, text)[:options['page_size']].explain()
+			)
+
+		return row
+
+	def searched(self, user, text):
+		request = Request(APIRequestFactory().get('/', {'search': text}))
+		request.user = user
+		queryset = Recipe.objects.filter(user=user)
+
+		return RecipeSearchFilter().filter_queryset(request, queryset, None)
+
+	def report(self, results):
+		self.stdout.write('\nrecipes      index build s')
+		for row in results:
+			self.stdout.write(f"{row['size']:<12} {row['build']:>12.1f}")
+
+		self.stdout.write('\nrecipes      case                 p50 ms   p99 ms   growth')
+		base = results[0]['cases']
+		for row in results:
+			for name, stats in row['cases'].items():
+				growth = stats['p50'] / base[name]['p50']
+				self.stdout.write(
+					f"{row['size']:<12} {name:<20} {stats['p50']:>7.2f}  "
+					f"{stats['p99']:>7.2f}  {growth:>6.2f}x "
+					f"(size {row['size'] / results[0]['size']:.0f}x)"
+				)
+
+		self.stdout.write(self.style.SUCCESS('Done'))
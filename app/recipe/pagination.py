@@ -0,0 +1,156 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+	"""Cursor pagination that seeks on the full ordering key
+
+	The cursor holds the ordering values of the last row served, and the
+	next page is fetched with `WHERE key > cursor ORDER BY key LIMIT n`, so
+	page N reads the same number of index entries as page 1. The ordering
+	must end in a unique column so every row has a distinct position. A view
+	can swap the ordering per request through `get_pagination_ordering()`.
+	"""
+
+	ordering = ('-id',)
+	page_size = 100
+	page_size_query_param = 'page_size'
+	max_page_size = 1000
+	cursor_query_param = 'cursor'
+	invalid_cursor_message = 'Invalid cursor'
+
+	def paginate_queryset(self, queryset, request, view=None):
+		self.ordering = self.get_ordering(view)
+		self.page_size = self.get_page_size(request)
+		self.base_url = request.build_absolute_uri()
+		reverse, position = self.decode_cursor(request)
+
+		ordering = self.reversed_ordering() if reverse else self.ordering
+		queryset = queryset.order_by(*ordering)
+		if position is not None:
+			try:
+				queryset = queryset.filter(self.seek(ordering, position))
+			except (TypeError, ValueError):
+				raise NotFound(self.invalid_cursor_message)
+
+		rows = list(queryset[:self.page_size + 1])
+		has_more = len(rows) > self.page_size
+		rows = rows[:self.page_size]
+
+		if reverse:
+			rows.reverse()
+			self.has_next, self.has_previous = True, has_more
+		else:
+			self.has_next, self.has_previous = has_more, position is not None
+
+		self.first = self.get_position(rows[0]) if rows else position
+		self.last = self.get_position(rows[-1]) if rows else position
+
+		return rows
+
+	def get_ordering(self, view):
+		get_ordering = getattr(view, 'get_pagination_ordering', None)
+		ordering = get_ordering() if get_ordering else None
+
+		return tuple(ordering or self.ordering)
+
+	def get_page_size(self, request):
+		try:
+			return _positive_int(
+				request.query_params[self.page_size_query_param],
+				strict=True,
+				cutoff=self.max_page_size
+			)
+		except (KeyError, ValueError):
+			return self.page_size
+
+	def reversed_ordering(self):
+		return tuple(
+			field[1:] if field.startswith('-') else f'-{field}'
+			for field in self.ordering
+		)
+
+	def seek(self, ordering, position):
+		"""Build `key > position` in the ordering's direction
+
+		For ('-name', 'id') this is `name <= v0 AND (name < v0 OR
+		(name = v0 AND id > v1))`. The leading range repeats the first
+		comparison so the database can use it as an index bound instead of
+		filtering every row before the cursor.
+		"""
+		names = [field.lstrip('-') for field in ordering]
+		seek = Q()
+		for i, field in enumerate(ordering):
+			lookup = 'lt' if field.startswith('-') else 'gt'
+			term = Q(**{f'{names[i]}__{lookup}': position[i]})
+			for name, value in zip(names[:i], position[:i]):
+				term &= Q(**{name: value})
+			seek |= term
+
+		bound = 'lte' if ordering[0].startswith('-') else 'gte'
+
+		return Q(**{f'{names[0]}__{bound}': position[0]}) & seek
+
+	def get_position(self, row):
+		names = [field.lstrip('-') for field in self.ordering]
+		if isinstance(row, dict):
+			return [row[name] for name in names]
+
+		return [getattr(row, name) for name in names]
+
+	def decode_cursor(self, request):
+		encoded = request.query_params.get(self.cursor_query_param)
+		if encoded is None:
+			return False, None
+
+		try:
+			cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+			reverse, position = bool(cursor['r']), list(cursor['p'])
+		except (TypeError, ValueError, KeyError):
+			raise NotFound(self.invalid_cursor_message)
+
+		if len(position) != len(self.ordering):
+			raise NotFound(self.invalid_cursor_message)
+
+		return reverse, position
+
+	def encode_cursor(self, reverse, position):
+		cursor = json.dumps({'r': int(reverse), 'p': position})
+		encoded = urlsafe_b64encode(cursor.encode('utf-8')).decode('ascii')
+
+		return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+	def get_next_link(self):
+		if not self.has_next:
+			return None
+
+		return self.encode_cursor(False, self.last)
+
+	def get_previous_link(self):
+		if not self.has_previous:
+			return None
+
+		return self.encode_cursor(True, self.first)
+
+	def get_paginated_response(self, data):
+		return Response(OrderedDict([
+			('next', self.get_next_link()),
+			('previous', self.get_previous_link()),
+			('results', data)
+		]))
+
+
+class NamePagination(KeysetPagination):
+	ordering = ('-name', 'id')
+
+
+class RecipePagination(KeysetPagination):
+	ordering = ('-id',)
@@ -0,0 +1,125 @@
+"""Read-only fast path for recipe output
+
+RecipeReader builds what RecipeSerializer and RecipeDetailSerializer would
+return, but from `.values()` rows and one query per relation instead of
+model instances and DRF's per-field machinery. The field accessors are put
+together once from the serializers, so the two cannot drift apart silently;
+recipe/tests/test_fast_reads.py checks the rendered bytes are identical.
+A recipe.selection.FieldSelection narrows both the columns read and the
+relations fetched.
+"""
+import json
+from collections import defaultdict
+from functools import lru_cache
+from operator import itemgetter
+
+from django.core.files.storage import default_storage
+
+from core.metrics import timed
+from core.models import Recipe
+from recipe.selection import FieldSelection, RELATION_FIELDS
+from recipe.serializers import RecipeSerializer
+
+
+RELATIONS = {
+	'ingredients': (Recipe.ingredients.through, 'ingredient'),
+	'tags': (Recipe.tags.through, 'tag'),
+}
+
+
+def recipe_values(queryset, selection=None):
+	"""The rows RecipeReader reads, keeping annotations used for ordering"""
+	columns = (selection or FieldSelection()).columns
+
+	return queryset.values(*columns, *queryset.query.annotations)
+
+
+def fetch_related(through, name, recipe_ids, with_names=False):
+	"""Map recipe id -> related ids, or {'id', 'name'} dicts, in one query
+
+	Related objects come in id order, the same order the serializers'
+	prefetches use.
+	"""
+	related = defaultdict(list)
+	columns = ('recipe_id', f'{name}_id')
+	if with_names:
+		columns += (f'{name}__name',)
+	rows = through.objects.filter(recipe_id__in=recipe_ids) \
+						  .order_by('recipe_id', f'{name}_id') \
+						  .values_list(*columns)
+
+	if with_names:
+		for recipe_id, pk, label in rows:
+			related[recipe_id].append({'id': pk, 'name': label})
+	else:
+		for recipe_id, pk in rows:
+			related[recipe_id].append(pk)
+
+	return related
+
+
+@lru_cache(maxsize=None)
+def field_converters():
+	"""{name: converter} for the serializer fields that need one
+
+	Plain columns are returned as read; only fields whose representation
+	differs from the database value (the price's fixed decimal places) keep
+	their DRF to_representation.
+	"""
+	serializer = RecipeSerializer()
+
+	return {'price': serializer.fields['price'].to_representation}
+
+
+class RecipeReader:
+
+	def __init__(self, request=None, selection=None):
+		self.selection = selection or FieldSelection()
+		self.build_url = request.build_absolute_uri if request else None
+
+	def variants(self, raw):
+		urls = {}
+		for name, path in (json.loads(raw) if raw else {}).items():
+			url = default_storage.url(path)
+			urls[name] = self.build_url(url) if self.build_url else url
+
+		return urls
+
+	def getters(self, related):
+		"""(name, row -> value) for each output field, in serializer order"""
+		getters = []
+		converters = field_converters()
+		for name in self.selection.fields:
+			converter = converters.get(name)
+			if name in RELATION_FIELDS:
+				links = related[name]
+				getters.append(
+					(name, lambda row, links=links: links.get(row['id'], []))
+				)
+			elif name == 'image_variants':
+				getters.append(
+					(name, lambda row: self.variants(row['image_variants']))
+				)
+			elif converter:
+				getters.append((
+					name,
+					lambda row, name=name, converter=converter: converter(row[name])
+				))
+			else:
+				getters.append((name, itemgetter(name)))
+
+		return getters
+
+	def build(self, rows):
+		"""Serializer output for `rows` of recipe_values(), in order"""
+		ids = [row['id'] for row in rows]
+		if not ids:
+			return []
+
+		getters = self.getters({
+			name: fetch_related(*RELATIONS[name], ids, with_names=expanded)
+			for name, expanded in self.selection.relations
+		})
+
+		with timed('serializer'):
+			return [{name: get(row) for name, get in getters} for row in rows]
@@ -0,0 +1,111 @@
+"""Tags and ingredients referenced by id or by name in recipe writes
+
+A recipe payload may list `tags` and `ingredients` as ids (`3`, `"3"`,
+`{"id": 3}`) or names (`"Soup"`, `{"name": "42"}`). Parsing does no
+queries; RecipeSerializer resolves each relation in one lookup scoped to
+the user and creates the missing names in one upsert (core.names).
+"""
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from rest_framework import serializers
+
+from core.names import BATCH_SIZE, name_keys, upsert_names
+from core.search import chunks
+
+
+ID = 'id'
+NAME = 'name'
+
+
+class NameOrIdRelatedField(serializers.RelatedField):
+	"""One tag or ingredient reference, parsed to (ID, pk) or (NAME, name)"""
+
+	default_error_messages = {
+		'invalid': 'Expected an id, a name, {{"id": ...}} or {{"name": ...}}.',
+		'max_length': 'Names are at most {max_length} characters.',
+	}
+
+	max_length = 255
+
+	def get_queryset(self):
+		# Only the user's own objects are offered in the browsable API.
+		request = self.context.get('request')
+		queryset = super().get_queryset()
+		if request is None or not request.user.is_authenticated:
+			return queryset.none()
+
+		return queryset.filter(user=request.user)
+
+	def to_internal_value(self, data):
+		if isinstance(data, dict):
+			if ID in data:
+				return self.id_ref(data[ID])
+			if isinstance(data.get(NAME), str):
+				return self.name_ref(data[NAME])
+			self.fail('invalid')
+
+		if isinstance(data, str) and not data.strip().isdigit():
+			return self.name_ref(data)
+
+		return self.id_ref(data)
+
+	def id_ref(self, pk):
+		if isinstance(pk, int) and not isinstance(pk, bool):
+			return (ID, pk)
+		if isinstance(pk, str) and pk.strip().isdigit():
+			return (ID, int(pk))
+
+		self.fail('invalid')
+
+	def name_ref(self, name):
+		name = name.strip()
+		if not name:
+			self.fail('invalid')
+		if len(name) > self.max_length:
+			self.fail('max_length', max_length=self.max_length)
+
+		return (NAME, name)
+
+	def to_representation(self, value):
+		return value.pk
+
+
+def resolve_related(model, user, refs):
+	"""Objects for `refs` in order without repeats, creating missing names
+
+	Unknown ids, including other users' objects, raise a ValidationError.
+	"""
+	refs = list(dict.fromkeys(refs))
+	names = [value for kind, value in refs if kind == NAME]
+	keys = name_keys(names) if names else {}
+	by_id, by_name = {}, {}
+
+	for batch in chunks(refs, BATCH_SIZE):
+		ids = [value for kind, value in batch if kind == ID]
+		batch_keys = [keys[value] for kind, value in batch if kind == NAME]
+		objs = model.objects.filter(user=user) \
+							.annotate(lower_name=Lower('name')) \
+							.filter(Q(id__in=ids) | Q(lower_name__in=batch_keys)) \
+							.order_by('id')
+		for obj in objs:
+			by_id[obj.pk] = obj
+			by_name.setdefault(obj.lower_name, obj)
+
+	missing = [value for kind, value in refs if kind == ID and value not in by_id]
+	if missing:
+		raise serializers.ValidationError(
+			[f'Invalid pk "{pk}" - object does not exist.' for pk in missing]
+		)
+
+	new = [name for name in names if keys[name] not in by_name]
+	if new:
+		found, _ = upsert_names(model, user, new, keys)
+		by_name.update((keys[name], obj) for name, obj in found.items())
+
+	objs = [
+		by_id[value] if kind == ID else by_name[keys[value]]
+		for kind, value in refs
+	]
+
+	return list(dict.fromkeys(objs))
@@ -0,0 +1,70 @@
+"""Sparse fieldsets and relation expansion for recipe reads
+
+`?fields=id,title,tags` keeps only those fields of the recipe output and
+`?expand=tags,ingredients` renders those relations as {'id', 'name'}
+objects instead of ids. The list expands nothing by default and the detail
+view expands everything; an explicit `?expand=` overrides either. Both read
+paths use the selection to load only the columns and relations it needs.
+"""
+from rest_framework.exceptions import ValidationError
+
+from recipe.serializers import RecipeSerializer
+
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+ALL_FIELDS = RecipeSerializer.Meta.fields
+
+RELATION_FIELDS = ('ingredients', 'tags')
+
+
+def parse_names(value, param, choices):
+	"""Comma separated names from `value`, validated and in `choices` order"""
+	names = {part.strip() for part in value.split(',') if part.strip()}
+	unknown = names.difference(choices)
+	if unknown:
+		raise ValidationError({
+			param: f'Unknown: {", ".join(sorted(unknown))}. '
+				   f'Choose from: {", ".join(choices)}.'
+		})
+
+	return tuple(name for name in choices if name in names)
+
+
+class FieldSelection:
+	"""The recipe fields and expanded relations a read should return"""
+
+	def __init__(self, fields=ALL_FIELDS, expand=()):
+		self.fields = tuple(fields)
+		self.expand = frozenset(expand)
+
+	@classmethod
+	def from_request(cls, request, detail=False):
+		params = request.query_params
+		fields = ALL_FIELDS
+		if params.get(FIELDS_PARAM):
+			fields = parse_names(params[FIELDS_PARAM], FIELDS_PARAM, ALL_FIELDS)
+
+		expand = RELATION_FIELDS if detail else ()
+		if EXPAND_PARAM in params:
+			expand = parse_names(params[EXPAND_PARAM], EXPAND_PARAM,
+								 RELATION_FIELDS)
+
+		return cls(fields, expand)
+
+	@property
+	def relations(self):
+		"""(name, expanded) for each requested relation"""
+		return tuple(
+			(name, name in self.expand)
+			for name in self.fields if name in RELATION_FIELDS
+		)
+
+	@property
+	def columns(self):
+		"""Recipe columns the selected fields read; id is always loaded"""
+		return ('id',) + tuple(
+			name for name in self.fields
+			if name != 'id' and name not in RELATION_FIELDS
+		)
@@ -1,9 +1,49 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
 from rest_framework import serializers
 
+from core.metrics import TimedSerializerMixin
 from core.models import Tag, Ingredient, Recipe
+from recipe.bulk import BulkWriter
+from recipe.relations import NameOrIdRelatedField, resolve_related
 
 
-class TagSerializer(serializers.ModelSerializer):
+class ImageVariantsField(serializers.ReadOnlyField):
+	"""{variant name: url} for the resized copies of the recipe image"""
+
+	def __init__(self, **kwargs):
+		kwargs['source'] = 'variants'
+		super().__init__(**kwargs)
+
+	def to_representation(self, variants):
+		request = self.context.get('request')
+		urls = {}
+		for name, path in variants.items():
+			url = default_storage.url(path)
+			urls[name] = request.build_absolute_uri(url) if request else url
+
+		return urls
+
+
+class RecipeCountMixin:
+	"""Adds a read-only `recipe_count` read from the context's attribute"""
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+
+		source = self.context.get('recipe_count_source')
+		if source:
+			# DRF rejects a source equal to the field name.
+			options = {} if source == 'recipe_count' else {'source': source}
+			self.fields['recipe_count'] = serializers.IntegerField(
+					read_only=True,
+					**options
+				)
+
+
+class TagSerializer(RecipeCountMixin,
+					TimedSerializerMixin,
+					serializers.ModelSerializer):
 
 	class Meta:
 		model = Tag
@@ -11,42 +51,107 @@ class TagSerializer(serializers.ModelSerializer):
 		read_only_fields = ('id',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(RecipeCountMixin,
+						   TimedSerializerMixin,
+						   serializers.ModelSerializer):
 
 	class Meta:
 		model = Ingredient
 		fields = ('id', 'name')
 		read_only_fields = ('id',)
 
-class RecipeSerializer(serializers.ModelSerializer):
 
-	ingredients = serializers.PrimaryKeyRelatedField(
+RELATED_SERIALIZERS = {
+	'ingredients': IngredientSerializer,
+	'tags': TagSerializer,
+}
+
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+
+	ingredients = NameOrIdRelatedField(
 			many=True,
 			queryset=Ingredient.objects.all()
 		)
 
-	tags = serializers.PrimaryKeyRelatedField(
+	tags = NameOrIdRelatedField(
 			many=True,
 			queryset=Tag.objects.all()
 		)
 
+	image_variants = ImageVariantsField()
+
 	class Meta:
 		model = Recipe
 		fields = (
 					'id', 'title', 'time_minutes', 'link', 'ingredients', 
-				  	'tags', 'price'
+				  	'tags', 'price', 'image_variants'
 				)
 		read_only_fields = ('id',)
 
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+
+		# A recipe.selection.FieldSelection in the context trims the output
+		# for reads
+		selection = self.context.get('selection')
+		if selection is not None:
+			self.select_fields(selection)
+
+	def create(self, validated_data):
+		user = validated_data.pop('user')
+		with transaction.atomic():
+			item = self.resolve_relations(user, validated_data)
+			return BulkWriter(Recipe, user).create(
+					[item], self.fields, check=False
+				)[0]
+
+	def update(self, instance, validated_data):
+		with transaction.atomic():
+			item = self.resolve_relations(instance.user, validated_data)
+			return BulkWriter(Recipe, instance.user).update(
+					[instance], [item], self.fields, check=False
+				)[0]
+
+	def resolve_relations(self, user, validated_data):
+		"""Swap tag and ingredient references for ids, one lookup each"""
+		item = dict(validated_data)
+		for name, model in (('ingredients', Ingredient), ('tags', Tag)):
+			if name in item:
+				try:
+					objs = resolve_related(model, user, item[name])
+				except serializers.ValidationError as exc:
+					raise serializers.ValidationError({name: exc.detail})
+				item[name] = [obj.pk for obj in objs]
+
+		return item
+
+	def select_fields(self, selection):
+		for name in set(self.fields).difference(selection.fields):
+			self.fields.pop(name)
+
+		for name, expanded in selection.relations:
+			if expanded:
+				self.fields[name] = RELATED_SERIALIZERS[name](
+						many=True,
+						read_only=True
+					)
+			else:
+				self.fields[name] = serializers.PrimaryKeyRelatedField(
+						many=True,
+						read_only=True
+					)
+
 
 class RecipeDetailSerializer(RecipeSerializer):
 	ingredients = IngredientSerializer(many=True, read_only=True)
 	tags = TagSerializer(many=True, read_only=True)
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+	image_variants = ImageVariantsField()
 
 	class Meta:
 		model = Recipe
-		fields = ('id', 'image')
+		fields = ('id', 'image', 'image_variants')
 		read_only_fields = ('id',)
\ No newline at end of file
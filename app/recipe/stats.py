@@ -0,0 +1,97 @@
+"""Summary statistics of a user's recipe library
+
+Everything is aggregated in the database in three queries whatever the
+library size: one for the totals and the cooking time histogram, one each
+for the most used tags and ingredients.
+"""
+from decimal import Decimal
+
+from django.db.models import Avg, Count, Max, Min, Q
+
+from core.counts import uses_counter
+from core.models import Ingredient, Recipe, Tag
+
+
+# Upper bounds (exclusive) of the time_minutes buckets; the last bucket
+# has no upper bound.
+TIME_BUCKETS = (15, 30, 60, 120)
+
+TOP_LIMIT = 10
+
+CENTS = Decimal('0.01')
+
+
+def time_buckets():
+	"""(min, max) minutes of each histogram bucket, max None for the last"""
+	bounds = (0,) + TIME_BUCKETS
+
+	return list(zip(bounds, TIME_BUCKETS + (None,)))
+
+
+def price(value):
+	# Rendered like RecipeSerializer's price; SQLite averages as a float.
+	return None if value is None else str(Decimal(str(value)).quantize(CENTS))
+
+
+def top_used(model, user, limit=TOP_LIMIT):
+	"""{'id', 'name', 'recipe_count'} of the most used rows, unused left out"""
+	queryset = model.objects.filter(user=user)
+	if not uses_counter():
+		# An alias, as the counter column already has the natural name
+		queryset = queryset.annotate(linked_recipes=Count('recipe'))
+		count = 'linked_recipes'
+	else:
+		count = 'recipe_count'
+
+	rows = queryset.filter(**{f'{count}__gt': 0}) \
+				   .order_by(f'-{count}', 'name', 'id') \
+				   .values_list('id', 'name', count)[:limit]
+
+	return [
+		{'id': pk, 'name': name, 'recipe_count': total}
+		for pk, name, total in rows
+	]
+
+
+def library_stats(user):
+	buckets = time_buckets()
+	histogram = {}
+	for i, (low, high) in enumerate(buckets):
+		# The first bucket is open below, so every recipe is counted once.
+		condition = Q(time_minutes__gte=low) if i else Q()
+		if high is not None:
+			condition &= Q(time_minutes__lt=high)
+		histogram[f'bucket_{i}'] = Count('id', filter=condition)
+
+	totals = Recipe.objects.filter(user=user).aggregate(
+		recipes=Count('id'),
+		avg_price=Avg('price'),
+		min_price=Min('price'),
+		max_price=Max('price'),
+		avg_time=Avg('time_minutes'),
+		min_time=Min('time_minutes'),
+		max_time=Max('time_minutes'),
+		**histogram
+	)
+
+	avg_time = totals['avg_time']
+
+	return {
+		'recipes': totals['recipes'],
+		'price': {
+			'avg': price(totals['avg_price']),
+			'min': price(totals['min_price']),
+			'max': price(totals['max_price']),
+		},
+		'time_minutes': {
+			'avg': None if avg_time is None else round(float(avg_time), 1),
+			'min': totals['min_time'],
+			'max': totals['max_time'],
+			'histogram': [
+				{'min': low, 'max': high, 'count': totals[f'bucket_{i}']}
+				for i, (low, high) in enumerate(buckets)
+			],
+		},
+		'top_tags': top_used(Tag, user),
+		'top_ingredients': top_used(Ingredient, user),
+	}
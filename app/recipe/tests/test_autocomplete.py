@@ -0,0 +1,149 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.autocomplete import (
+	AutocompleteCache, PrefixTrie, TOO_LARGE, autocomplete_cache
+)
+
+
+TAGS_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+INGREDIENTS_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+
+
+class AutocompleteApiTests(TestCase):
+
+	def setUp(self):
+		caches['default'].clear()
+		autocomplete_cache.clear()
+
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+		self.tags = {
+			name: Tag.objects.create(user=self.user, name=name)
+			for name in ('Soup', 'sour', 'Sweet', 'Salad', 'Dessert')
+		}
+		for uses, name in ((3, 'Sweet'), (1, 'Soup'), (2, 'sour')):
+			for i in range(uses):
+				recipe = Recipe.objects.create(
+						user=self.user,
+						title=f'{name} {i}',
+						time_minutes=5,
+						price=1
+					)
+				recipe.tags.add(self.tags[name])
+
+	def names(self, res):
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+		return [item['name'] for item in res.data]
+
+	def test_prefix_ranked_by_usage(self):
+		res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 'S'})
+
+		self.assertEqual(
+			self.names(res),
+			['Sweet', 'sour', 'Soup', 'Salad']
+		)
+		self.assertEqual(res.data[0], {
+			'id': self.tags['Sweet'].id,
+			'name': 'Sweet',
+		})
+
+	def test_prefix_is_case_insensitive(self):
+		res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 'SOu'})
+
+		self.assertEqual(self.names(res), ['sour', 'Soup'])
+
+	def test_evicts_least_recent_tries_over_the_node_budget(self):
+		other = get_user_model().objects.create_user(
+				'other@test.com',
+				'password1234'
+			)
+		Tag.objects.create(user=other, name='Sweet')
+		cache = AutocompleteCache(max_nodes=25)
+
+		self.assertEqual(cache.trie(Tag, self.user).nodes, 21)
+		cache.trie(Tag, other)
+
+		self.assertEqual(cache.nodes, 6)
+		self.assertEqual(list(cache._entries), [(Tag._meta.label, other.pk)])
+		with patch.object(cache, 'max_nodes', 5):
+			cache.clear()
+			self.assertIs(cache.trie(Tag, self.user), TOO_LARGE)
+		self.assertEqual(cache.nodes, 0)
+
+	def test_limit(self):
+		res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 's', 'limit': 2})
+
+		self.assertEqual(self.names(res), ['Sweet', 'sour'])
+
+	def test_invalid_params(self):
+		for params in ({}, {'prefix': ' '}, {'prefix': 's', 'limit': 'x'}):
+			res = self.client.get(TAGS_AUTOCOMPLETE_URL, params)
+			self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_limited_to_user(self):
+		user2 = get_user_model().objects.create_user(
+				'test2@test.com',
+				'password1234'
+			)
+		Tag.objects.create(user=user2, name='Stew')
+		Ingredient.objects.create(user=user2, name='Salt')
+		Ingredient.objects.create(user=self.user, name='Sugar')
+
+		res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 'st'})
+		self.assertEqual(self.names(res), [])
+
+		res = self.client.get(INGREDIENTS_AUTOCOMPLETE_URL, {'prefix': 's'})
+		self.assertEqual(self.names(res), ['Sugar'])
+
+	def test_repeat_lookups_skip_the_database(self):
+		self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 's'})
+
+		with self.assertNumQueries(0):
+			res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 'sw'})
+
+		self.assertEqual(self.names(res), ['Sweet'])
+
+	def test_writes_rebuild_the_trie(self):
+		self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 's'})
+		Tag.objects.create(user=self.user, name='Spicy')
+		self.tags['Salad'].delete()
+
+		res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 's'})
+
+		self.assertEqual(self.names(res), ['Sweet', 'sour', 'Soup', 'Spicy'])
+
+	def test_large_libraries_use_the_database(self):
+		with patch.object(autocomplete_cache, 'max_names', 2):
+			res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 'sO'})
+
+		self.assertEqual(self.names(res), ['sour', 'Soup'])
+
+
+class PrefixTrieTests(TestCase):
+
+	def test_keeps_rank_order_and_bound(self):
+		entries = [{'id': i, 'name': name} for i, name in enumerate(
+			('Bread', 'basil', 'Bay leaf', 'beef', 'Apple')
+		)]
+		trie = PrefixTrie(entries, keep=2)
+
+		self.assertEqual(trie.search('b', 10), entries[:2])
+		self.assertEqual(trie.search('BA', 1), entries[1:2])
+		self.assertEqual(trie.search('bay ', 10), entries[2:3])
+		self.assertEqual(trie.search('c', 10), [])
+		self.assertEqual(trie.nodes, 24)
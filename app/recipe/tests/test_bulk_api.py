@@ -0,0 +1,246 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, RecipeSearchTerm, Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def sample_recipe(user, **params):
+	defaults = {
+		'title': 'Test Title',
+		'time_minutes': 5,
+		'price': 2.00
+	}
+	defaults.update(params)
+
+	return Recipe.objects.create(user=user, **defaults)
+
+
+class BulkApiTests(TestCase):
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+	def test_bulk_create_tags(self):
+		payload = [{'name': f'Tag {i}'} for i in range(20)]
+
+		res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(Tag.objects.filter(user=self.user).count(), 20)
+		self.assertEqual(
+				sorted(tag['name'] for tag in res.data),
+				sorted(item['name'] for item in payload)
+			)
+		self.assertTrue(all(tag['id'] for tag in res.data))
+
+	def test_bulk_create_validates_whole_batch(self):
+		payload = [{'name': 'Salt'}, {'name': ''}]
+
+		res = self.client.post(INGREDIENTS_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertFalse(Ingredient.objects.exists())
+
+	def test_bulk_create_requires_list(self):
+		res = self.client.post(TAGS_BULK_URL, {'name': 'Vegan'}, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_bulk_create_recipes_with_links(self):
+		tag = Tag.objects.create(user=self.user, name='Soup')
+		salt = Ingredient.objects.create(user=self.user, name='Salt')
+		pepper = Ingredient.objects.create(user=self.user, name='Pepper')
+		payload = [
+			{
+				'title': 'Tinola',
+				'time_minutes': 30,
+				'price': '5.00',
+				'tags': [tag.id],
+				'ingredients': [salt.id, pepper.id]
+			},
+			{'title': 'Rice', 'time_minutes': 20, 'price': '1.00'},
+		]
+
+		res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		tinola = Recipe.objects.get(title='Tinola')
+		self.assertEqual(list(tinola.tags.all()), [tag])
+		self.assertEqual(set(tinola.ingredients.all()), {salt, pepper})
+		self.assertEqual(res.data[0]['id'], tinola.id)
+		self.assertEqual(
+				sorted(res.data[0]['ingredients']),
+				sorted([salt.id, pepper.id])
+			)
+		self.assertEqual(res.data[1]['tags'], [])
+
+	def test_bulk_create_rejects_other_users_links(self):
+		user2 = get_user_model().objects.create_user(
+				'test2@test.com',
+				'password1234'
+			)
+		tag = Tag.objects.create(user=user2, name='Private')
+		payload = [{
+			'title': 'Tinola',
+			'time_minutes': 30,
+			'price': '5.00',
+			'tags': [tag.id]
+		}]
+
+		res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertFalse(Recipe.objects.exists())
+
+	def test_bulk_create_validates_links_in_one_query(self):
+		tags = [Tag.objects.create(user=self.user, name=f'T{i}') for i in range(5)]
+		payload = [
+			{
+				'title': f'Recipe {i}',
+				'time_minutes': 5,
+				'price': '2.00',
+				'tags': [tag.id for tag in tags]
+			}
+			for i in range(10)
+		]
+
+		res = self.client.post(
+				RECIPES_BULK_URL,
+				payload + [dict(payload[0], tags=[0])],
+				format='json'
+			)
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(len(res.data['tags']), 1)
+
+	def test_bulk_update_recipes(self):
+		recipe1 = sample_recipe(self.user, title='Old 1')
+		recipe2 = sample_recipe(self.user, title='Old 2')
+		old_tag = Tag.objects.create(user=self.user, name='Old')
+		new_tag = Tag.objects.create(user=self.user, name='New')
+		recipe1.tags.add(old_tag)
+		recipe2.tags.add(old_tag)
+
+		payload = [
+			{'id': recipe1.id, 'title': 'New 1', 'tags': [new_tag.id]},
+			{'id': recipe2.id, 'price': '9.50'},
+		]
+
+		res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		recipe1.refresh_from_db()
+		recipe2.refresh_from_db()
+		self.assertEqual(recipe1.title, 'New 1')
+		self.assertEqual(list(recipe1.tags.all()), [new_tag])
+		self.assertEqual(str(recipe2.price), '9.50')
+		self.assertEqual(recipe2.title, 'Old 2')
+		self.assertEqual(list(recipe2.tags.all()), [old_tag])
+		self.assertEqual(res.data[1]['tags'], [old_tag.id])
+
+	def test_bulk_update_other_users_rows(self):
+		user2 = get_user_model().objects.create_user(
+				'test2@test.com',
+				'password1234'
+			)
+		recipe = sample_recipe(user2)
+
+		res = self.client.patch(
+				RECIPES_BULK_URL,
+				[{'id': recipe.id, 'title': 'Mine now'}],
+				format='json'
+			)
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		recipe.refresh_from_db()
+		self.assertEqual(recipe.title, 'Test Title')
+
+	def test_bulk_delete(self):
+		user2 = get_user_model().objects.create_user(
+				'test2@test.com',
+				'password1234'
+			)
+		mine = [sample_recipe(self.user) for _ in range(3)]
+		theirs = sample_recipe(user2)
+
+		res = self.client.delete(
+				RECIPES_BULK_URL,
+				[mine[0].id, mine[1].id, theirs.id],
+				format='json'
+			)
+
+		self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+		self.assertEqual(list(Recipe.objects.filter(user=self.user)), [mine[2]])
+		self.assertTrue(Recipe.objects.filter(id=theirs.id).exists())
+
+	def test_bulk_delete_recipes_is_set_based(self):
+		tag = Tag.objects.create(user=self.user, name='Soup')
+		salt = Ingredient.objects.create(user=self.user, name='Salt')
+		payload = [
+			{
+				'title': f'Recipe {i}',
+				'time_minutes': 5,
+				'price': '2.00',
+				'tags': [tag.id],
+				'ingredients': [salt.id]
+			}
+			for i in range(101)
+		]
+		ids = [recipe['id'] for recipe in
+			   self.client.post(RECIPES_BULK_URL, payload, format='json').data]
+
+		with self.assertNumQueries(12):
+			res = self.client.delete(RECIPES_BULK_URL, ids[:100], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+		self.assertEqual(list(Recipe.objects.values_list('id', flat=True)),
+						 ids[100:])
+		self.assertEqual(Tag.objects.get(id=tag.id).recipe_count, 1)
+		self.assertEqual(Ingredient.objects.get(id=salt.id).recipe_count, 1)
+		self.assertEqual(
+			set(RecipeSearchTerm.objects.values_list('recipe_id', flat=True)),
+			{ids[100]}
+		)
+
+	def test_bulk_delete_tags_reindexes_recipes(self):
+		tags = [Tag.objects.create(user=self.user, name=f'Tag{i}')
+				for i in range(100)]
+		recipe = sample_recipe(self.user, title='Adobo')
+		recipe.tags.set(tags[:2])
+
+		with self.assertNumQueries(11):
+			res = self.client.delete(
+					TAGS_BULK_URL,
+					[tag.id for tag in tags],
+					format='json'
+				)
+
+		self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+		self.assertFalse(Tag.objects.exists())
+		self.assertEqual(
+			list(RecipeSearchTerm.objects.values_list('term', flat=True)),
+			['adobo']
+		)
+
+	def test_bulk_write_invalidates_cache(self):
+		self.client.get(TAGS_URL)
+
+		self.client.post(TAGS_BULK_URL, [{'name': 'Vegan'}], format='json')
+		res = self.client.get(TAGS_URL)
+
+		self.assertEqual(len(res.data['results']), 1)
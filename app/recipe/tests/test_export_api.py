@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.serializers import RecipeDetailSerializer
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportTests(TestCase):
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+		self.recipes = []
+		for i in range(5):
+			recipe = Recipe.objects.create(
+					user=self.user,
+					title=f'Recipe {i}',
+					time_minutes=5 + i,
+					price=2.50
+				)
+			recipe.tags.add(Tag.objects.create(user=self.user, name=f'Tag {i}'))
+			recipe.ingredients.add(
+				Ingredient.objects.create(user=self.user, name=f'Salt {i}'),
+				Ingredient.objects.create(user=self.user, name=f'Pepper {i}')
+			)
+			self.recipes.append(recipe)
+
+	def read(self, res):
+		return b''.join(res.streaming_content).decode('utf-8')
+
+	def test_auth_required(self):
+		res = APIClient().get(EXPORT_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+	def test_export_ndjson_matches_detail_serializer(self):
+		res = self.client.get(EXPORT_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+		self.assertTrue(res.streaming)
+
+		rows = [json.loads(line) for line in self.read(res).splitlines()]
+		expected = json.loads(json.dumps(
+			RecipeDetailSerializer(self.recipes, many=True).data
+		))
+		for row in rows + expected:
+			row['ingredients'].sort(key=lambda item: item['id'])
+		self.assertEqual(rows, expected)
+
+	def test_export_csv(self):
+		res = self.client.get(EXPORT_URL, {'type': 'csv'})
+
+		self.assertEqual(res['Content-Type'], 'text/csv')
+		rows = list(csv.DictReader(io.StringIO(self.read(res))))
+		self.assertEqual(len(rows), 5)
+		self.assertEqual(rows[0]['title'], 'Recipe 0')
+		self.assertEqual(rows[0]['ingredients'], 'Salt 0;Pepper 0')
+		self.assertEqual(rows[0]['price'], '2.50')
+
+	def test_export_limited_to_user(self):
+		user2 = get_user_model().objects.create_user(
+				'test2@test.com',
+				'password1234'
+			)
+		self.client.force_authenticate(user2)
+
+		res = self.client.get(EXPORT_URL)
+
+		self.assertEqual(self.read(res), '')
+
+	def test_export_reads_in_chunks(self):
+		# A recipe page, a tag and an ingredient query per chunk; the short
+		# last page ends the export without another query.
+		with patch('recipe.views.RecipeViewSet.export_chunk_size', 2):
+			with self.assertNumQueries(3 * 3):
+				res = self.client.get(EXPORT_URL)
+				self.read(res)
+
+	def test_invalid_type(self):
+		res = self.client.get(EXPORT_URL, {'type': 'xml'})
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
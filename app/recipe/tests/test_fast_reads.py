@@ -0,0 +1,185 @@
+import json
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import renderers
+from core.models import Ingredient, Recipe, Tag
+from recipe.views import RecipeViewSet
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+# Characters JSON encoders tend to disagree on
+AWKWARD_TEXT = 'Tinola "quoted" \\ back\nline\ttab \x01 \u2028\u2029 ñ 🍲'
+
+
+def detail_url(recipe_id):
+	return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class FastReadParityTests(TestCase):
+	"""The fast read path renders exactly the bytes the serializers do"""
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+		tags = [
+			Tag.objects.create(user=self.user, name=name)
+			for name in ('Soup', AWKWARD_TEXT, 'Quick')
+		]
+		ingredients = [
+			Ingredient.objects.create(user=self.user, name=name)
+			for name in ('Ginger', 'Chicken', 'Sayote  ')
+		]
+
+		self.recipes = []
+		specs = [
+			(AWKWARD_TEXT, 'https://example.com/tinola?a=1&b=2', '0.50'),
+			('Chicken soup', '', '999.99'),
+			('Plain rice', '', '10'),
+			('Garlic chicken', '', '7.25'),
+		]
+		for i, (title, link, price) in enumerate(specs):
+			recipe = Recipe.objects.create(
+					user=self.user,
+					title=title,
+					time_minutes=5 + i,
+					price=price,
+					link=link
+				)
+			recipe.tags.add(*tags[i:])
+			recipe.ingredients.add(*ingredients[:i])
+			self.recipes.append(recipe)
+
+		Recipe.objects.filter(pk=self.recipes[0].pk).update(
+			image='uploads/recipe/photo.jpg',
+			image_variants=json.dumps({
+				'thumb': 'uploads/recipe/photo_thumb.jpg',
+				'medium_webp': 'uploads/recipe/photo_medium_webp.webp',
+			})
+		)
+
+	def get(self, url, fast, data=None):
+		"""Fast reads with the fast renderer, or serializers with DRF's"""
+		caches['default'].clear()
+		orjson = renderers.orjson if fast else None
+		with patch.object(RecipeViewSet, 'fast_reads', fast), \
+				patch.object(renderers, 'orjson', orjson):
+			res = self.client.get(url, data)
+
+		self.assertEqual(res.status_code, 200)
+
+		return res.content
+
+	def assertParity(self, url, data=None):
+		fast = self.get(url, True, data)
+		slow = self.get(url, False, data)
+
+		self.assertEqual(fast, slow)
+
+		return fast
+
+	def test_list(self):
+		content = self.assertParity(RECIPES_URL)
+
+		self.assertIn(b'\\u2028', content)
+		self.assertIn('ñ 🍲'.encode('utf-8'), content)
+		self.assertIn(b'"price":"0.50"', content)
+
+	def test_list_pages(self):
+		first = self.assertParity(RECIPES_URL, {'page_size': 2})
+
+		next_url = json.loads(first.decode('utf-8'))['next']
+		self.assertParity(next_url)
+
+	def test_list_filtered_and_searched(self):
+		tag = Tag.objects.get(name='Quick')
+
+		self.assertParity(RECIPES_URL, {'tags': str(tag.id)})
+		self.assertParity(RECIPES_URL, {'search': 'chicken'})
+
+	def test_sparse_fields_and_expansion(self):
+		recipe = self.recipes[2]
+		selections = (
+			{'fields': 'title,price'},
+			{'fields': 'tags,id,image_variants'},
+			{'fields': 'id,ingredients', 'expand': 'ingredients'},
+			{'expand': 'tags,ingredients'},
+			{'expand': ''},
+		)
+
+		for data in selections:
+			self.assertParity(RECIPES_URL, data)
+			self.assertParity(detail_url(recipe.id), data)
+
+	def test_empty_list(self):
+		self.assertParity(RECIPES_URL, {'search': 'nothing'})
+
+	def test_detail(self):
+		for recipe in self.recipes:
+			self.assertParity(detail_url(recipe.id))
+
+	def test_detail_not_found(self):
+		user2 = get_user_model().objects.create_user(
+				'test2@test.com',
+				'password1234'
+			)
+		other = Recipe.objects.create(
+				user=user2,
+				title='Other',
+				time_minutes=5,
+				price=1
+			)
+
+		for fast in (True, False):
+			with patch.object(RecipeViewSet, 'fast_reads', fast):
+				res = self.client.get(detail_url(other.id))
+				malformed = self.client.get(detail_url('abc'))
+			self.assertEqual(res.status_code, 404)
+			self.assertEqual(malformed.status_code, 404)
+
+	def test_fast_list_queries(self):
+		caches['default'].clear()
+
+		with self.assertNumQueries(3):
+			self.client.get(RECIPES_URL)
+
+
+class FastJSONRendererTests(TestCase):
+
+	data = [
+		{'id': 1, 'text': AWKWARD_TEXT, 'price': '1.00', 'nested': {'a': []}},
+		{'id': 2, 'none': None, 'flag': True, 'big': 2 ** 70},
+	]
+
+	def render(self, **kwargs):
+		return renderers.FastJSONRenderer().render(self.data, **kwargs)
+
+	@skipIf(renderers.orjson is None, 'orjson is not installed')
+	def test_orjson_matches_json_renderer(self):
+		self.assertEqual(self.render(), JSONRenderer().render(self.data))
+
+	def test_fallback_without_orjson(self):
+		with patch.object(renderers, 'orjson', None):
+			self.assertEqual(self.render(), JSONRenderer().render(self.data))
+
+	def test_indent_uses_json_renderer(self):
+		media_type = 'application/json; indent=4'
+
+		self.assertEqual(
+			self.render(accepted_media_type=media_type),
+			JSONRenderer().render(self.data, accepted_media_type=media_type)
+		)
@@ -0,0 +1,117 @@
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.views import RecipeViewSet
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+	return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class FieldSelectionTests(TestCase):
+	"""?fields= and ?expand= on the recipe list and detail"""
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+		self.tag = Tag.objects.create(user=self.user, name='Soup')
+		self.ingredient = Ingredient.objects.create(user=self.user, name='Ginger')
+		self.recipe = Recipe.objects.create(
+				user=self.user,
+				title='Tinola',
+				time_minutes=30,
+				price=5,
+				link='https://example.com/tinola'
+			)
+		self.recipe.tags.add(self.tag)
+		self.recipe.ingredients.add(self.ingredient)
+
+	def get(self, url, data=None, fast=True):
+		caches['default'].clear()
+		with patch.object(RecipeViewSet, 'fast_reads', fast):
+			return self.client.get(url, data)
+
+	def test_fields_keep_serializer_order(self):
+		for fast in (True, False):
+			res = self.get(RECIPES_URL, {'fields': 'price, title,id'}, fast)
+
+			self.assertEqual(res.status_code, status.HTTP_200_OK)
+			self.assertEqual(
+				list(res.data['results'][0]),
+				['id', 'title', 'price']
+			)
+
+	def test_expand_on_list(self):
+		res = self.get(RECIPES_URL, {'expand': 'tags'})
+
+		result = res.data['results'][0]
+		self.assertEqual(result['tags'], [{'id': self.tag.id, 'name': 'Soup'}])
+		self.assertEqual(result['ingredients'], [self.ingredient.id])
+
+	def test_detail_expands_unless_told_otherwise(self):
+		res = self.get(detail_url(self.recipe.id))
+		self.assertEqual(res.data['tags'], [{'id': self.tag.id, 'name': 'Soup'}])
+
+		res = self.get(detail_url(self.recipe.id), {'expand': ''})
+		self.assertEqual(res.data['tags'], [self.tag.id])
+		self.assertEqual(res.data['ingredients'], [self.ingredient.id])
+
+	def test_unknown_names_rejected(self):
+		for fast in (True, False):
+			res = self.get(RECIPES_URL, {'fields': 'title,owner'}, fast)
+			self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+			self.assertIn('owner', res.data['fields'])
+
+			res = self.get(
+					detail_url(self.recipe.id),
+					{'expand': 'price'},
+					fast
+				)
+			self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+			self.assertIn('expand', res.data)
+
+	def test_unrequested_relations_are_not_queried(self):
+		with self.assertNumQueries(1):
+			res = self.get(RECIPES_URL, {'fields': 'id,title'})
+		self.assertEqual(
+			json.loads(res.content.decode('utf-8'))['results'],
+			[{'id': self.recipe.id, 'title': 'Tinola'}]
+		)
+
+		with self.assertNumQueries(2):
+			self.get(RECIPES_URL, {'fields': 'id,tags'})
+
+		with self.assertNumQueries(2):
+			self.get(RECIPES_URL, {'fields': 'title,tags'}, fast=False)
+
+	def test_projection_is_trimmed(self):
+		for fast in (True, False):
+			caches['default'].clear()
+			with patch.object(RecipeViewSet, 'fast_reads', fast), \
+					CaptureQueriesContext(connection) as queries:
+				self.client.get(detail_url(self.recipe.id), {'fields': 'title'})
+
+			recipe_sql = queries.captured_queries[0]['sql']
+			self.assertIn('"title"', recipe_sql)
+			self.assertNotIn('"link"', recipe_sql)
+			self.assertNotIn('"image_variants"', recipe_sql)
+			self.assertEqual(len(queries), 1)
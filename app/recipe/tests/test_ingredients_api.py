@@ -46,7 +46,7 @@ class PrivateIngredientApiTests(TestCase):
 		serializer = IngredientSerializer(ingredient, many=True)
 
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
-		self.assertEqual(res.data, serializer.data)
+		self.assertEqual(res.data['results'], serializer.data)
 
 	def test_ingredients_limited_to_user(self):
 
@@ -67,9 +67,9 @@ class PrivateIngredientApiTests(TestCase):
 
 		res = self.client.get(INGREDIENTS_URL)
 
-		self.assertEqual(len(res.data), 2)
+		self.assertEqual(len(res.data['results']), 2)
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
-		self.assertEqual(res.data, serializer.data)
+		self.assertEqual(res.data['results'], serializer.data)
 
 	def test_create_ingredient(self):
 		payload = {'name': 'Onion'}
@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class NameUpsertApiTests(TestCase):
+	"""Creating a tag or ingredient that exists returns the existing one"""
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+	def test_create_is_idempotent(self):
+		first = self.client.post(TAGS_URL, {'name': 'Vegan'})
+		again = self.client.post(TAGS_URL, {'name': 'vEGAN'})
+
+		self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(again.status_code, status.HTTP_200_OK)
+		self.assertEqual(again.data, {'id': first.data['id'], 'name': 'Vegan'})
+		self.assertEqual(Tag.objects.count(), 1)
+
+	def test_non_ascii_names_matched_as_the_database_folds_them(self):
+		# SQLite's lower() leaves 'É' alone, so only the database knows
+		# both spellings share a key.
+		first = self.client.post(TAGS_URL, {'name': 'Éclair'})
+		again = self.client.post(TAGS_URL, {'name': 'ÉCLAIR'})
+		bulk = self.client.post(TAGS_BULK_URL, [{'name': 'ÉCLAIR'}],
+								format='json')
+		recipe = self.client.post(RECIPES_URL, {
+			'title': 'Dessert',
+			'time_minutes': 30,
+			'price': '5.00',
+			'tags': ['ÉCLAIR', 'Éclair'],
+			'ingredients': [],
+		}, format='json')
+
+		self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(again.status_code, status.HTTP_200_OK)
+		self.assertEqual(again.data['id'], first.data['id'])
+		self.assertEqual(bulk.data[0]['id'], first.data['id'])
+		self.assertEqual(recipe.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(
+			list(Recipe.objects.get().tags.values_list('id', flat=True)),
+			[first.data['id']]
+		)
+		self.assertEqual(Tag.objects.count(), 1)
+
+	def test_names_are_unique_per_user(self):
+		user2 = get_user_model().objects.create_user(
+				'test2@test.com',
+				'password1234'
+			)
+		other = Ingredient.objects.create(user=user2, name='Salt')
+
+		res = self.client.post(INGREDIENTS_URL, {'name': 'salt'})
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		self.assertNotEqual(res.data['id'], other.id)
+
+	def test_bulk_create_upserts(self):
+		existing = Tag.objects.create(user=self.user, name='Quick')
+
+		res = self.client.post(TAGS_BULK_URL, [
+			{'name': 'quick'}, {'name': 'Soup'}, {'name': 'SOUP'},
+		], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		ids = [item['id'] for item in res.data]
+		self.assertEqual(ids[0], existing.id)
+		self.assertEqual(ids[1], ids[2])
+		self.assertEqual(Tag.objects.count(), 2)
+
+	def test_bulk_rename_onto_taken_name(self):
+		Tag.objects.create(user=self.user, name='Quick')
+		soup = Tag.objects.create(user=self.user, name='Soup')
+
+		res = self.client.patch(TAGS_BULK_URL, [
+			{'id': soup.id, 'name': 'QUICK'},
+		], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		soup.refresh_from_db()
+		self.assertEqual(soup.name, 'Soup')
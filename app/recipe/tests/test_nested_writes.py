@@ -0,0 +1,131 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+	return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class NestedWriteTests(TestCase):
+	"""Recipe writes take tags and ingredients by id or by name"""
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+		self.soup = Tag.objects.create(user=self.user, name='Soup')
+		self.ginger = Ingredient.objects.create(user=self.user, name='Ginger')
+
+	def payload(self, **kwargs):
+		payload = {
+			'title': 'Tinola',
+			'time_minutes': 30,
+			'price': '5.00',
+			'tags': [],
+			'ingredients': [],
+		}
+		payload.update(kwargs)
+
+		return payload
+
+	def post(self, **kwargs):
+		return self.client.post(RECIPES_URL, self.payload(**kwargs), format='json')
+
+	def test_create_by_name_and_id(self):
+		res = self.post(
+			tags=['soup', 'Quick', {'name': '42'}, str(self.soup.id)],
+			ingredients=[{'id': self.ginger.id}, 'Chicken', 'chicken']
+		)
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		recipe = Recipe.objects.get(id=res.data['id'])
+		quick = Tag.objects.get(user=self.user, name='Quick')
+		answer = Tag.objects.get(user=self.user, name='42')
+		chicken = Ingredient.objects.get(user=self.user, name='Chicken')
+
+		self.assertEqual(res.data['tags'], [self.soup.id, quick.id, answer.id])
+		self.assertEqual(res.data['ingredients'], [self.ginger.id, chicken.id])
+		self.assertEqual(
+			set(recipe.tags.values_list('id', flat=True)),
+			{self.soup.id, quick.id, answer.id}
+		)
+		quick.refresh_from_db()
+		self.assertEqual(quick.recipe_count, 1)
+
+	def test_other_users_ids_rejected(self):
+		user2 = get_user_model().objects.create_user(
+				'test2@test.com',
+				'password1234'
+			)
+		other = Tag.objects.create(user=user2, name='Theirs')
+
+		res = self.post(tags=['Brand new', other.id])
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertIn('tags', res.data)
+		self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+		self.assertFalse(Tag.objects.filter(name='Brand new').exists())
+
+	def test_invalid_references(self):
+		for tags in ([''], [True], [{'title': 'x'}], [{'id': 'x'}], ['x' * 256]):
+			res = self.post(tags=tags)
+			self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_update_by_name(self):
+		recipe = Recipe.objects.create(
+				user=self.user,
+				title='Tinola',
+				time_minutes=30,
+				price=5
+			)
+		recipe.tags.add(self.soup)
+
+		res = self.client.patch(
+				detail_url(recipe.id),
+				{'tags': ['Quick', 'SOUP']},
+				format='json'
+			)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		quick = Tag.objects.get(user=self.user, name='Quick')
+		self.assertEqual(
+			set(recipe.tags.values_list('id', flat=True)),
+			{self.soup.id, quick.id}
+		)
+
+	def test_create_queries_do_not_grow_with_references(self):
+		counts = []
+		for size in (2, 20):
+			Tag.objects.bulk_create([
+				Tag(user=self.user, name=f'Existing {size}-{i}') for i in range(size)
+			])
+			ids = list(Tag.objects.filter(name__startswith=f'Existing {size}-')
+								  .values_list('id', flat=True))
+			names = [f'New {size}-{i}' for i in range(size)]
+
+			with CaptureQueriesContext(connection) as queries:
+				res = self.post(
+					title='Recipe',
+					tags=ids + names,
+					ingredients=[f'Ingredient {size}-{i}' for i in range(size)]
+				)
+			self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+			self.assertEqual(len(res.data['tags']), size * 2)
+			counts.append(len(queries))
+
+		self.assertEqual(counts[0], counts[1])
@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class KeysetPaginationTests(TestCase):
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+	def walk(self, url, params, link='next'):
+		pages = []
+		res = self.client.get(url, params)
+		while True:
+			self.assertEqual(res.status_code, status.HTTP_200_OK)
+			pages.append(res.data['results'])
+			if not res.data[link]:
+				return pages
+			res = self.client.get(res.data[link])
+
+	def test_tags_paginated_by_name_then_id(self):
+		# Rows must neither repeat nor drop across pages.
+		for name in ['Vegan', 'Dessert', 'Keto', 'Quick', 'Paleo', 'Spicy']:
+			Tag.objects.create(user=self.user, name=name)
+
+		pages = self.walk(TAGS_URL, {'page_size': 2})
+
+		expected = list(
+			Tag.objects.order_by('-name', 'id').values_list('id', flat=True)
+		)
+		self.assertEqual(len(pages), 3)
+		self.assertEqual([tag['id'] for page in pages for tag in page], expected)
+
+	def test_recipes_paginated_newest_first(self):
+		for i in range(5):
+			Recipe.objects.create(
+					user=self.user,
+					title=f'Recipe {i}',
+					time_minutes=5,
+					price=2.00
+				)
+
+		pages = self.walk(RECIPES_URL, {'page_size': 2})
+
+		expected = list(
+			Recipe.objects.order_by('-id').values_list('id', flat=True)
+		)
+		self.assertEqual([len(page) for page in pages], [2, 2, 1])
+		self.assertEqual(
+				[recipe['id'] for page in pages for recipe in page],
+				expected
+			)
+
+	def test_previous_link_returns_earlier_page(self):
+		for name in ['A', 'B', 'C', 'D', 'E']:
+			Tag.objects.create(user=self.user, name=name)
+
+		first = self.client.get(TAGS_URL, {'page_size': 2})
+		second = self.client.get(first.data['next'])
+		back = self.client.get(second.data['previous'])
+
+		self.assertIsNone(first.data['previous'])
+		self.assertEqual(back.data['results'], first.data['results'])
+		self.assertIsNone(back.data['previous'])
+
+	def test_page_cost_constant(self):
+		for i in range(30):
+			Tag.objects.create(user=self.user, name=f'Tag {i:02}')
+
+		res = self.client.get(TAGS_URL, {'page_size': 5})
+		counts = []
+		while res.data['next']:
+			with CaptureQueriesContext(connection) as ctx:
+				res = self.client.get(res.data['next'])
+			counts.append(len(ctx.captured_queries))
+
+		self.assertEqual(set(counts), {1})
+
+	def test_invalid_cursor(self):
+		res = self.client.get(TAGS_URL, {'cursor': 'not-a-cursor'})
+
+		self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -75,7 +75,7 @@ class PrivateTestRecipeApi(TestCase):
 		serializer = RecipeSerializer(recipes, many=True)
 
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
-		self.assertEqual(res.data, serializer.data)
+		self.assertEqual(res.data['results'], serializer.data)
 
 	def test_recipes_limited_to_user(self):
 		user2 = get_user_model().objects.create_user(
@@ -92,8 +92,8 @@ class PrivateTestRecipeApi(TestCase):
 		serializer = RecipeSerializer(recipes, many=True)
 
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
-		self.assertEqual(res.data, serializer.data)
-		self.assertEqual(len(res.data), 2)
+		self.assertEqual(res.data['results'], serializer.data)
+		self.assertEqual(len(res.data['results']), 2)
 
 	def test_view_recipe_detail(self):
 		tag = sample_tag(user=self.user)
@@ -250,23 +250,23 @@ class PrivateTestRecipeApi(TestCase):
 		serializer2 = RecipeSerializer(recipe2)
 		serializer3 = RecipeSerializer(recipe3)
 
-		self.assertIn(serializer1.data, res.data)
-		self.assertIn(serializer2.data, res.data)
-		self.assertNotIn(serializer3.data, res.data)
+		self.assertIn(serializer1.data, res.data['results'])
+		self.assertIn(serializer2.data, res.data['results'])
+		self.assertNotIn(serializer3.data, res.data['results'])
 
 	def test_filter_recipes_by_ingredients(self):
 		recipe1 = sample_recipe(user=self.user, title='Spaghetti Bolognese')
 		recipe2 = sample_recipe(user=self.user, title='Tuna Carbonara')
 
-		ingredient1 = sample_tag(user=self.user, name='Ketchup')
-		ingredient2 = sample_tag(user=self.user, name='Tuna')
+		ingredient1 = sample_ingredient(user=self.user, name='Ketchup')
+		ingredient2 = sample_ingredient(user=self.user, name='Tuna')
 
-		recipe1.tags.add(ingredient1)
-		recipe2.tags.add(ingredient2)
+		recipe1.ingredients.add(ingredient1)
+		recipe2.ingredients.add(ingredient2)
 
 		recipe3 = sample_recipe(user=self.user, title='Tinola')
-		ingredient3 = sample_tag(user=self.user, name='Chicken')
-		recipe3.tags.add(ingredient3)
+		ingredient3 = sample_ingredient(user=self.user, name='Chicken')
+		recipe3.ingredients.add(ingredient3)
 
 		res = self.client.get(
 					RECIPES_URL, 
@@ -277,11 +277,48 @@ class PrivateTestRecipeApi(TestCase):
 		serializer2 = RecipeSerializer(recipe2)
 		serializer3 = RecipeSerializer(recipe3)
 		
-		self.assertIn(serializer1.data, res.data)
-		self.assertIn(serializer2.data, res.data)
-		self.assertNotIn(serializer3.data, res.data)
+		self.assertIn(serializer1.data, res.data['results'])
+		self.assertIn(serializer2.data, res.data['results'])
+		self.assertNotIn(serializer3.data, res.data['results'])
+
+		self.assertEqual(len(res.data['results']), 2)
+
+	def test_filter_recipes_no_duplicates(self):
+		recipe = sample_recipe(user=self.user)
+		tag1 = sample_tag(user=self.user, name='Pasta')
+		tag2 = sample_tag(user=self.user, name='Italian')
+		recipe.tags.add(tag1, tag2)
+
+		res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
 
-		self.assertEqual(len(res), 2)
+		self.assertEqual(len(res.data['results']), 1)
+
+	def test_filter_recipes_match_all(self):
+		recipe1 = sample_recipe(user=self.user, title='Carbonara')
+		recipe2 = sample_recipe(user=self.user, title='Ramen')
+		pasta = sample_tag(user=self.user, name='Pasta')
+		italian = sample_tag(user=self.user, name='Italian')
+		egg = sample_ingredient(user=self.user, name='Egg')
+		recipe1.tags.add(pasta, italian)
+		recipe1.ingredients.add(egg)
+		recipe2.tags.add(pasta)
+		recipe2.ingredients.add(egg)
+
+		res = self.client.get(RECIPES_URL, {
+				'tags': f'{pasta.id},{italian.id}',
+				'ingredients': f'{egg.id}',
+				'match': 'all'
+			})
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data['results'], [RecipeSerializer(recipe1).data])
+
+	def test_filter_recipes_invalid_params(self):
+		res = self.client.get(RECIPES_URL, {'tags': 'one,two'})
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+		res = self.client.get(RECIPES_URL, {'tags': '1', 'match': 'some'})
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
 
 class RecipeImageUpload(TestCase):
@@ -0,0 +1,154 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class RecipeCountApiTests(TestCase):
+	"""?with_counts= and ?assigned_only= on tag and ingredient lists"""
+
+	def setUp(self):
+		caches['default'].clear()
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+		self.soup = Tag.objects.create(user=self.user, name='Soup')
+		self.quick = Tag.objects.create(user=self.user, name='Quick')
+		self.unused = Tag.objects.create(user=self.user, name='Unused')
+		self.ginger = Ingredient.objects.create(user=self.user, name='Ginger')
+		Ingredient.objects.create(user=self.user, name='Salt')
+
+		for title in ('Tinola', 'Sinigang'):
+			recipe = Recipe.objects.create(
+					user=self.user,
+					title=title,
+					time_minutes=30,
+					price=5
+				)
+			recipe.tags.add(self.soup)
+			recipe.ingredients.add(self.ginger)
+		recipe.tags.add(self.quick)
+
+	def counts(self, url, **params):
+		caches['default'].clear()
+		res = self.client.get(url, params)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+		return {item['name']: item.get('recipe_count') for item in res.data['results']}
+
+	def test_counts_are_opt_in(self):
+		self.assertEqual(
+			self.counts(TAGS_URL),
+			{'Soup': None, 'Quick': None, 'Unused': None}
+		)
+
+	def test_both_sources_agree(self):
+		for source in ('annotate', 'counter'):
+			with override_settings(RECIPE_COUNT_SOURCE=source):
+				self.assertEqual(
+					self.counts(TAGS_URL, with_counts='1'),
+					{'Soup': 2, 'Quick': 1, 'Unused': 0}
+				)
+				self.assertEqual(
+					self.counts(TAGS_URL, assigned_only='1', with_counts='1'),
+					{'Soup': 2, 'Quick': 1}
+				)
+				self.assertEqual(
+					self.counts(INGREDIENTS_URL, assigned_only='true'),
+					{'Ginger': None}
+				)
+
+	def test_annotated_counts_in_one_query(self):
+		with self.assertNumQueries(1):
+			self.client.get(TAGS_URL, {'with_counts': '1'})
+
+
+class RecipeCounterTests(TestCase):
+	"""The denormalized recipe_count follows every way links change"""
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.tag = Tag.objects.create(user=self.user, name='Soup')
+		self.other = Tag.objects.create(user=self.user, name='Quick')
+		self.recipe = Recipe.objects.create(
+				user=self.user,
+				title='Tinola',
+				time_minutes=30,
+				price=5
+			)
+
+	def assertCounts(self, tag, other):
+		self.tag.refresh_from_db()
+		self.other.refresh_from_db()
+		self.assertEqual(
+			(self.tag.recipe_count, self.other.recipe_count),
+			(tag, other)
+		)
+
+	def test_add_remove_and_clear(self):
+		self.recipe.tags.add(self.tag, self.other)
+		self.assertCounts(1, 1)
+
+		self.recipe.tags.remove(self.other)
+		self.assertCounts(1, 0)
+
+		self.recipe.tags.set([self.other])
+		self.assertCounts(0, 1)
+
+		self.recipe.tags.clear()
+		self.assertCounts(0, 0)
+
+	def test_reverse_side(self):
+		second = Recipe.objects.create(
+				user=self.user,
+				title='Sinigang',
+				time_minutes=30,
+				price=5
+			)
+		self.tag.recipe_set.add(self.recipe, second)
+		self.assertCounts(2, 0)
+
+		self.tag.recipe_set.clear()
+		self.assertCounts(0, 0)
+
+	def test_recipe_delete(self):
+		self.recipe.tags.add(self.tag)
+		self.recipe.delete()
+
+		self.assertCounts(0, 0)
+
+	def test_bulk_writes(self):
+		client = APIClient()
+		client.force_authenticate(self.user)
+
+		res = client.post(RECIPES_BULK_URL, [
+			{'title': 'A', 'time_minutes': 5, 'price': '1.00',
+			 'tags': [self.tag.id], 'ingredients': []},
+			{'title': 'B', 'time_minutes': 5, 'price': '1.00',
+			 'tags': [self.tag.id, self.other.id], 'ingredients': []},
+		], format='json')
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		self.assertCounts(2, 1)
+
+		res = client.patch(RECIPES_BULK_URL, [
+			{'id': res.data[1]['id'], 'tags': [self.other.id]},
+		], format='json')
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertCounts(1, 1)
@@ -0,0 +1,166 @@
+import tempfile
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+API_ROOT_URL = reverse('recipe:api-root')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+	return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def image_upload_url(recipe_id):
+	return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+class RecipeQueryCountTests(TestCase):
+	"""Every endpoint in recipe/urls.py runs a constant number of queries"""
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+	def create_recipes(self, count, fan_out=3):
+		recipes = []
+		for i in range(count):
+			recipe = Recipe.objects.create(
+					user=self.user,
+					title=f'Recipe {i}',
+					time_minutes=5,
+					price=2.00
+				)
+			for j in range(fan_out):
+				recipe.tags.add(
+					Tag.objects.create(user=self.user, name=f'Tag {i}-{j}')
+				)
+				recipe.ingredients.add(
+					Ingredient.objects.create(
+						user=self.user,
+						name=f'Ingredient {i}-{j}'
+					)
+				)
+			recipes.append(recipe)
+
+		return recipes
+
+	def count_queries(self, method, url, data=None, **kwargs):
+		with CaptureQueriesContext(connection) as ctx:
+			res = getattr(self.client, method)(url, data, **kwargs)
+
+		self.assertLess(res.status_code, 400)
+
+		return len(ctx.captured_queries)
+
+	def assertConstantQueries(self, method, url_for, sizes=(1, 10)):
+		counts = []
+		for size in sizes:
+			Recipe.objects.all().delete()
+			Tag.objects.all().delete()
+			Ingredient.objects.all().delete()
+			recipes = self.create_recipes(size)
+			counts.append(self.count_queries(method, url_for(recipes)))
+
+		self.assertEqual(len(set(counts)), 1, counts)
+
+		return counts[0]
+
+	def test_api_root_queries(self):
+		with self.assertNumQueries(0):
+			res = self.client.get(API_ROOT_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+	def test_tag_list_queries(self):
+		count = self.assertConstantQueries('get', lambda _: TAGS_URL)
+
+		self.assertEqual(count, 1)
+
+	def test_ingredient_list_queries(self):
+		count = self.assertConstantQueries('get', lambda _: INGREDIENTS_URL)
+
+		self.assertEqual(count, 1)
+
+	def test_recipe_list_queries(self):
+		count = self.assertConstantQueries('get', lambda _: RECIPES_URL)
+
+		self.assertEqual(count, 3)
+
+	def test_recipe_detail_queries(self):
+		count = self.assertConstantQueries(
+				'get',
+				lambda recipes: detail_url(recipes[0].id)
+			)
+
+		self.assertEqual(count, 3)
+
+	def test_create_tag_and_ingredient_queries(self):
+		# The database folds the name's case, then one upsert
+		with self.assertNumQueries(2):
+			self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+		with self.assertNumQueries(2):
+			self.client.post(INGREDIENTS_URL, {'name': 'Salt'})
+
+	def test_create_recipe_queries(self):
+		recipe = self.create_recipes(1)[0]
+		payload = {
+			'title': 'Spaghetti',
+			'time_minutes': 5,
+			'price': 2.00,
+			'tags': [tag.id for tag in recipe.tags.all()],
+			'ingredients': [ing.id for ing in recipe.ingredients.all()]
+		}
+
+		counts = []
+		for _ in range(2):
+			counts.append(self.count_queries('post', RECIPES_URL, payload))
+
+		self.assertEqual(counts[0], counts[1])
+
+	def test_update_recipe_queries(self):
+		self.assertConstantQueries(
+				'patch',
+				lambda recipes: detail_url(recipes[0].id)
+			)
+
+	def test_delete_recipe_queries(self):
+		self.assertConstantQueries(
+				'delete',
+				lambda recipes: detail_url(recipes[-1].id)
+			)
+
+	def test_upload_image_queries(self):
+		recipe = self.create_recipes(1)[0]
+
+		with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+			Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+			ntf.seek(0)
+			with self.assertNumQueries(2):
+				res = self.client.post(
+						image_upload_url(recipe.id),
+						{'image': ntf},
+						format='multipart'
+					)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		recipe.refresh_from_db()
+		recipe.image.delete()
@@ -0,0 +1,126 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def sample_recipe(user, **params):
+	defaults = {
+		'title': 'Test Title',
+		'time_minutes': 5,
+		'price': 2.00
+	}
+	defaults.update(params)
+
+	return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeSearchApiTests(TestCase):
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+	def search(self, text, **params):
+		res = self.client.get(RECIPES_URL, dict(params, search=text))
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+		return res
+
+	def titles(self, res):
+		return [recipe['title'] for recipe in res.data['results']]
+
+	def test_search_title_tags_and_ingredients_ranked(self):
+		by_title = sample_recipe(self.user, title='Garlic Rice')
+		by_tag = sample_recipe(self.user, title='Fried Rice')
+		by_tag.tags.add(Tag.objects.create(user=self.user, name='Garlic'))
+		by_ingredient = sample_recipe(self.user, title='Plain Rice')
+		by_ingredient.ingredients.add(
+			Ingredient.objects.create(user=self.user, name='Garlic')
+		)
+		sample_recipe(self.user, title='Fish Sinigang')
+
+		res = self.search('garlic rice')
+
+		self.assertEqual(
+			self.titles(res),
+			[by_title.title, by_tag.title, by_ingredient.title]
+		)
+
+	def test_search_without_words_matches_nothing(self):
+		sample_recipe(self.user, title='Chicken Adobo')
+
+		res = self.search('!!!')
+
+		self.assertEqual(self.titles(res), [])
+
+	def test_search_limited_to_user(self):
+		user2 = get_user_model().objects.create_user(
+				'test2@test.com',
+				'password1234'
+			)
+		sample_recipe(user2, title='Chicken Curry')
+		mine = sample_recipe(self.user, title='Chicken Adobo')
+
+		res = self.search('chicken')
+
+		self.assertEqual(self.titles(res), [mine.title])
+
+	def test_search_combines_with_tag_filter(self):
+		tag = Tag.objects.create(user=self.user, name='Quick')
+		quick = sample_recipe(self.user, title='Chicken Salad')
+		quick.tags.add(tag)
+		sample_recipe(self.user, title='Chicken Stew')
+
+		res = self.search('chicken', tags=str(tag.id))
+
+		self.assertEqual(self.titles(res), [quick.title])
+
+	def test_search_pages_by_rank(self):
+		for i in range(5):
+			sample_recipe(self.user, title=f'Soup {i}')
+		best = sample_recipe(self.user, title='Soup')
+		best.tags.add(Tag.objects.create(user=self.user, name='Soup'))
+
+		first = self.search('soup', page_size=2)
+		second = self.client.get(first.data['next'])
+		rest = self.client.get(second.data['next'])
+
+		titles = self.titles(first) + self.titles(second) + self.titles(rest)
+		self.assertEqual(titles[0], 'Soup')
+		self.assertEqual(len(titles), 6)
+		self.assertEqual(len(set(titles)), 6)
+		self.assertIsNone(rest.data['next'])
+
+	def test_bulk_writes_indexed(self):
+		payload = [{'title': 'Beef Pares', 'time_minutes': 30, 'price': '5.00'}]
+		res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+		self.client.patch(
+			RECIPES_BULK_URL,
+			[{'id': res.data[0]['id'], 'title': 'Beef Mami'}],
+			format='json'
+		)
+
+		self.assertEqual(self.titles(self.search('mami')), ['Beef Mami'])
+		self.assertEqual(self.titles(self.search('pares')), [])
+
+	def test_blank_search_lists_everything(self):
+		sample_recipe(self.user)
+
+		res = self.search('  ')
+
+		self.assertEqual(len(res.data['results']), 1)
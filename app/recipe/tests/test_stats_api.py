@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+STATS_URL = reverse('recipe:recipe-stats')
+
+
+class RecipeStatsApiTests(TestCase):
+
+	def setUp(self):
+		caches['default'].clear()
+		self.user = get_user_model().objects.create_user(
+				'test@test.com',
+				'password1234'
+			)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+		self.soup = Tag.objects.create(user=self.user, name='Soup')
+		self.quick = Tag.objects.create(user=self.user, name='Quick')
+		Tag.objects.create(user=self.user, name='Unused')
+		self.ginger = Ingredient.objects.create(user=self.user, name='Ginger')
+
+		for minutes, price in ((10, '1.00'), (20, '2.50'), (45, '4.00'),
+							   (200, '10.00')):
+			recipe = Recipe.objects.create(
+					user=self.user,
+					title=f'Recipe {minutes}',
+					time_minutes=minutes,
+					price=price
+				)
+			recipe.tags.add(self.soup)
+		recipe.tags.add(self.quick)
+		recipe.ingredients.add(self.ginger)
+
+		user2 = get_user_model().objects.create_user(
+				'test2@test.com',
+				'password1234'
+			)
+		Recipe.objects.create(user=user2, title='Other', time_minutes=5, price=99)
+
+	def test_stats(self):
+		res = self.client.get(STATS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data['recipes'], 4)
+		self.assertEqual(
+			res.data['price'],
+			{'avg': '4.38', 'min': '1.00', 'max': '10.00'}
+		)
+		times = res.data['time_minutes']
+		self.assertEqual((times['avg'], times['min'], times['max']),
+						 (68.8, 10, 200))
+		self.assertEqual(
+			[bucket['count'] for bucket in times['histogram']],
+			[1, 1, 1, 0, 1]
+		)
+		self.assertEqual(times['histogram'][-1], {
+			'min': 120, 'max': None, 'count': 1,
+		})
+		self.assertEqual(res.data['top_tags'], [
+			{'id': self.soup.id, 'name': 'Soup', 'recipe_count': 4},
+			{'id': self.quick.id, 'name': 'Quick', 'recipe_count': 1},
+		])
+		self.assertEqual(res.data['top_ingredients'], [
+			{'id': self.ginger.id, 'name': 'Ginger', 'recipe_count': 1},
+		])
+
+	def test_counter_source_matches(self):
+		expected = self.client.get(STATS_URL).data
+
+		caches['default'].clear()
+		with override_settings(RECIPE_COUNT_SOURCE='counter'):
+			res = self.client.get(STATS_URL)
+
+		self.assertEqual(res.data, expected)
+
+	def test_fixed_queries_and_cached(self):
+		with self.assertNumQueries(3):
+			self.client.get(STATS_URL)
+
+		with self.assertNumQueries(0):
+			res = self.client.get(STATS_URL)
+		self.assertEqual(res['X-Cache'], 'HIT')
+
+	def test_writes_invalidate(self):
+		self.client.get(STATS_URL)
+		self.ginger.name = 'Fresh ginger'
+		self.ginger.save()
+
+		res = self.client.get(STATS_URL)
+
+		self.assertEqual(res['X-Cache'], 'MISS')
+		self.assertEqual(res.data['top_ingredients'][0]['name'], 'Fresh ginger')
+
+	def test_empty_library(self):
+		user = get_user_model().objects.create_user(
+				'empty@test.com',
+				'password1234'
+			)
+		self.client.force_authenticate(user)
+
+		res = self.client.get(STATS_URL)
+
+		self.assertEqual(res.data['recipes'], 0)
+		self.assertEqual(res.data['price']['avg'], None)
+		self.assertEqual(res.data['time_minutes']['avg'], None)
+		self.assertEqual(res.data['top_tags'], [])
@@ -46,7 +46,7 @@ class PrivateTagsApiTests(TestCase):
 		res = self.client.get(TAGS_URL)
 		
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
-		self.assertEqual(res.data, serializer.data)
+		self.assertEqual(res.data['results'], serializer.data)
 
 
 	def test_tags_limited_to_user(self):
@@ -65,7 +65,7 @@ class PrivateTagsApiTests(TestCase):
 		res = self.client.get(TAGS_URL)
 		
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
-		self.assertEqual(res.data, serializer.data)
+		self.assertEqual(res.data['results'], serializer.data)
 
 	def test_create_tags_success(self):
 		payload = {'name': 'Vegan'}
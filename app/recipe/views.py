@@ -1,25 +1,119 @@
+from django.db.models import Count, Prefetch
+from django.http import StreamingHttpResponse
+
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.pagination import _positive_int
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 
+from core.authentication import CachedTokenAuthentication
+from core.cache import CachedResponseMixin
+from core.counts import uses_counter
+from core.images import schedule_recipe_image
 from core.models import Tag, Ingredient, Recipe
+from core.names import upsert_names
+from core.renderers import FastJSONRenderer
+from recipe.autocomplete import DEFAULT_LIMIT, MAX_LIMIT, autocomplete_cache
+from recipe.bulk import BulkModelMixin, NamedBulkWriter
+from recipe.export import EXPORT_FORMATS, export_recipes
+from recipe.filters import RecipeRelationFilter, RecipeSearchFilter
+from recipe.pagination import NamePagination, RecipePagination
+from recipe.readers import RecipeReader, recipe_values
+from recipe.selection import FieldSelection
+from recipe.stats import library_stats
 from recipe.serializers import IngredientSerializer, RecipeImageSerializer, \
 							   RecipeDetailSerializer, RecipeSerializer, TagSerializer
 
 
-class BaseRecipeViewSet(viewsets.GenericViewSet,
+class BaseRecipeViewSet(CachedResponseMixin,
+					 BulkModelMixin,
+					 viewsets.GenericViewSet,
 					 mixins.ListModelMixin,
 					 mixins.CreateModelMixin):
-	authentication_classes = (TokenAuthentication,)
+	authentication_classes = (CachedTokenAuthentication,)
 	permission_classes = (IsAuthenticated,)
+	renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+	pagination_class = NamePagination
+	bulk_writer_class = NamedBulkWriter
 
 	def get_queryset(self):
-		return self.queryset.filter(user=self.request.user).order_by("-name")
+		queryset = self.queryset.filter(user=self.request.user) \
+								.order_by("-name", "id")
 
-	def perform_create(self, serializer):
-		serializer.save(user=self.request.user)
+		if self.action == 'list':
+			with_counts = self.query_flag('with_counts')
+			assigned_only = self.query_flag('assigned_only')
+			source = self.get_recipe_count_source()
+
+			if source == 'linked_recipes' and (with_counts or assigned_only):
+				queryset = queryset.annotate(linked_recipes=Count('recipe'))
+			if assigned_only:
+				queryset = queryset.filter(**{f'{source}__gt': 0})
+
+		return queryset
+
+	def query_flag(self, name):
+		return self.request.query_params.get(name, '').lower() \
+			in ('1', 'true', 'yes')
+
+	def get_recipe_count_source(self):
+		"""Attribute holding the recipe count: an annotation or the counter"""
+		if uses_counter():
+			return 'recipe_count'
+
+		return 'linked_recipes'
+
+	def get_serializer_context(self):
+		context = super().get_serializer_context()
+		if self.action == 'list' and self.query_flag('with_counts'):
+			context['recipe_count_source'] = self.get_recipe_count_source()
+
+		return context
+
+	def list(self, request, *args, **kwargs):
+		return self.cached_response(super().list, request, *args, **kwargs)
+
+	@action(methods=['GET'], detail=False)
+	def autocomplete(self, request):
+		"""Names starting with ?prefix=, ignoring case, most used first"""
+		prefix = request.query_params.get('prefix', '').strip()
+		if not prefix:
+			raise ValidationError({'prefix': 'This parameter is required.'})
+
+		try:
+			limit = _positive_int(
+					request.query_params.get('limit', DEFAULT_LIMIT),
+					strict=True,
+					cutoff=MAX_LIMIT
+				)
+		except ValueError:
+			raise ValidationError({'limit': 'Must be a positive integer.'})
+
+		return Response(autocomplete_cache.complete(
+				self.queryset.model,
+				request.user,
+				prefix,
+				limit
+			))
+
+	def create(self, request, *args, **kwargs):
+		"""Create by name, or return the user's existing one in any case"""
+		serializer = self.get_serializer(data=request.data)
+		serializer.is_valid(raise_exception=True)
+
+		name = serializer.validated_data['name']
+		found, created = upsert_names(self.queryset.model, request.user, [name])
+		obj = found[name]
+
+		return Response(
+				self.get_serializer(obj).data,
+				status=status.HTTP_201_CREATED if obj.pk in created
+					else status.HTTP_200_OK
+			)
 
 
 class TagsViewSet(BaseRecipeViewSet):
@@ -32,33 +126,114 @@ class IngredientsViewSet(BaseRecipeViewSet):
 	queryset = Ingredient.objects.all()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedResponseMixin, BulkModelMixin, viewsets.ModelViewSet):
 	model = Recipe
 	queryset = Recipe.objects.all()
 	serializer_class = RecipeSerializer
 	permission_classes = (IsAuthenticated,)
-	authentication_classes = (TokenAuthentication,)
-
-	def _params_to_int(self, qs):
-		return [int(qs_str) for qs_str in qs.split(",")]
+	authentication_classes = (CachedTokenAuthentication,)
+	renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+	filter_backends = (RecipeRelationFilter, RecipeSearchFilter)
+	pagination_class = RecipePagination
+	export_chunk_size = 500
+	# Serve list and retrieve through recipe.readers instead of the
+	# serializers; the output is identical.
+	fast_reads = True
 
 	def get_queryset(self):
-		tags = self.request.query_params.get('tags')
-		ingredients = self.request.query_params.get('ingredients')
+		queryset = self.queryset.filter(user=self.request.user).order_by('-id')
+
+		if self.action in ('list', 'retrieve'):
+			if self.fast_reads:
+				return queryset
+
+			selection = self.get_selection()
+			return self._prefetch_selected(
+					queryset.only(*selection.columns),
+					selection
+				)
 
-		queryset = self.queryset
+		return queryset
 
-		if tags:
-			tags_ids = self._params_to_int(tags)
+	def get_selection(self):
+		"""The ?fields= and ?expand= of a list or retrieve, parsed once"""
+		if not hasattr(self, '_selection'):
+			self._selection = FieldSelection.from_request(
+					self.request,
+					detail=self.action == 'retrieve'
+				)
+
+		return self._selection
+
+	def _prefetch_selected(self, queryset, selection):
+		"""Prefetch exactly the relations the selection renders"""
+		related = {'tags': Tag, 'ingredients': Ingredient}
+		prefetches = []
+		for name, expanded in selection.relations:
+			columns = ('id', 'name') if expanded else ('id',)
+			prefetches.append(Prefetch(
+				name,
+				queryset=related[name].objects.only(*columns).order_by('id')
+			))
+
+		return queryset.prefetch_related(*prefetches)
+
+	def get_serializer_context(self):
+		context = super().get_serializer_context()
+		if self.action in ('list', 'retrieve'):
+			context['selection'] = self.get_selection()
+
+		return context
+
+	def get_pagination_ordering(self):
+		"""Search results page by rank, everything else newest first"""
+		search = RecipeSearchFilter()
+		if search.get_search_text(self.request):
+			return search.ordering
+
+		return None
+
+	def list(self, request, *args, **kwargs):
+		handler = self.fast_list if self.fast_reads else super().list
+
+		return self.cached_response(handler, request, *args, **kwargs)
+
+	def retrieve(self, request, *args, **kwargs):
+		handler = self.fast_retrieve if self.fast_reads else super().retrieve
+
+		return self.cached_response(handler, request, *args, **kwargs)
 
-			queryset.filter(tags__id__in=tags_ids)
+	def fast_list(self, request, *args, **kwargs):
+		selection = self.get_selection()
+		rows = recipe_values(
+				self.filter_queryset(self.get_queryset()),
+				selection
+			)
+		page = self.paginate_queryset(rows)
+		data = RecipeReader(request, selection).build(
+				rows if page is None else page
+			)
+
+		if page is None:
+			return Response(data)
 
-		if ingredients:
-			ingredient_ids = self._params_to_int(ingredients)
-			
-			queryset.filter(ingredients__id__in=ingredient_ids)
+		return self.get_paginated_response(data)
+
+	def fast_retrieve(self, request, *args, **kwargs):
+		# Only object-independent permissions apply, so no instance is built
+		# for check_object_permissions().
+		lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+		selection = self.get_selection()
+		rows = recipe_values(
+				self.filter_queryset(self.get_queryset()),
+				selection
+			)
+		row = get_object_or_404(
+				rows,
+				**{self.lookup_field: kwargs[lookup_url_kwarg]}
+			)
 
-		return queryset.filter(user=self.request.user)
+		return Response(RecipeReader(request, selection).build([row])[0])
 
 	def get_serializer_class(self):
 		if self.action == 'retrieve':
@@ -73,6 +248,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
 	@action(methods=['POST'], detail=True, url_path='upload-image')
 	def upload_image(self, request, pk=None):
+		"""Store the upload and hand resizing off to the image pipeline"""
 		recipe = self.get_object()
 		serializer = self.get_serializer(
 				recipe,
@@ -80,7 +256,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
 			)
 
 		if serializer.is_valid():
-			serializer.save()
+			stale_variants = recipe.variants.values()
+			serializer.save(image_variants='')
+			schedule_recipe_image(recipe, stale_variants)
 			return Response(
 					serializer.data,
 					status=status.HTTP_200_OK
@@ -91,3 +269,29 @@ class RecipeViewSet(viewsets.ModelViewSet):
 				status=status.HTTP_400_BAD_REQUEST
 			)
 
+	@action(methods=['GET'], detail=False)
+	def stats(self, request):
+		"""Price, cooking time and tag/ingredient usage across the library"""
+		return self.cached_response(self.stats_response, request)
+
+	def stats_response(self, request):
+		return Response(library_stats(request.user))
+
+	@action(methods=['GET'], detail=False)
+	def export(self, request):
+		"""Stream the user's whole library as NDJSON (default) or ?type=csv"""
+		export_type = request.query_params.get('type', 'ndjson')
+		if export_type not in EXPORT_FORMATS:
+			raise ValidationError(
+					{'type': f'Must be one of: {", ".join(EXPORT_FORMATS)}.'}
+				)
+
+		lines, content_type = EXPORT_FORMATS[export_type]
+		response = StreamingHttpResponse(
+				lines(export_recipes(request.user, self.export_chunk_size)),
+				content_type=content_type
+			)
+		response['Content-Disposition'] = \
+			f'attachment; filename="recipes.{export_type}"'
+
+		return response
@@ -0,0 +1,103 @@
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher, identify_hasher
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.hashers import TunedArgon2PasswordHasher
+
+try:
+	import argon2
+except ImportError:
+	argon2 = None
+
+
+TOKEN_URL = reverse('user:token')
+
+PAYLOAD = {'email': 'test@test.com', 'password': 'password1234'}
+
+
+class TokenReuseTests(TestCase):
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(**PAYLOAD)
+		self.client = APIClient()
+		self.token = Token.objects.create(user=self.user)
+
+	def post(self, data, key=None):
+		self.client.credentials(
+			**({'HTTP_AUTHORIZATION': f'Token {key}'} if key else {})
+		)
+
+		return self.client.post(TOKEN_URL, data)
+
+	def test_presented_token_is_reused_without_hashing(self):
+		with patch.object(get_user_model(), 'check_password') as check:
+			res = self.post(
+				{'email': 'TEST@test.com', 'password': 'ignored'},
+				self.token.key
+			)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data, {'token': self.token.key})
+		check.assert_not_called()
+
+	def test_token_of_another_email_is_not_reused(self):
+		get_user_model().objects.create_user('other@test.com', 'password1234')
+
+		res = self.post(
+			{'email': 'other@test.com', 'password': 'wrong'},
+			self.token.key
+		)
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_invalid_token_falls_back_to_password(self):
+		res = self.post(PAYLOAD, 'not-a-token')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data, {'token': self.token.key})
+
+
+class HashUpgradeTests(TestCase):
+
+	def login(self):
+		res = APIClient().post(TOKEN_URL, PAYLOAD)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+		return get_user_model().objects.get(email=PAYLOAD['email']).password
+
+	def test_old_hashes_upgraded_on_login(self):
+		with override_settings(PASSWORD_HASHERS=[
+					'django.contrib.auth.hashers.MD5PasswordHasher']):
+			user = get_user_model().objects.create_user(**PAYLOAD)
+		self.assertTrue(user.password.startswith('md5$'))
+
+		with override_settings(PASSWORD_HASHERS=[
+					'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+					'django.contrib.auth.hashers.MD5PasswordHasher']):
+			password = self.login()
+
+		self.assertEqual(identify_hasher(password).algorithm, 'pbkdf2_sha256')
+
+	@skipIf(argon2 is None, 'argon2-cffi is not installed')
+	def test_argon2_cost_changes_rehash(self):
+		hashers = ['core.hashers.TunedArgon2PasswordHasher']
+		cheap = {'ARGON2_TIME_COST': 1, 'ARGON2_MEMORY_COST': 1024}
+		tuned = {'ARGON2_TIME_COST': 3, 'ARGON2_MEMORY_COST': 2048}
+
+		with override_settings(PASSWORD_HASHERS=hashers, PASSWORD_HASHING=cheap):
+			user = get_user_model().objects.create_user(**PAYLOAD)
+		self.assertIn('m=1024,t=1', user.password)
+
+		with override_settings(PASSWORD_HASHERS=hashers, PASSWORD_HASHING=tuned):
+			self.assertIsInstance(get_hasher(), TunedArgon2PasswordHasher)
+			password = self.login()
+
+		self.assertIn('m=2048,t=3', password)